@@ -1,12 +1,14 @@
 import json
 
 from Poem.api import serializers
-from Poem.api.internal_views.utils import sync_webapi
+from Poem.api.internal_views.utils import sync_webapi, sync_requested
 from Poem.api.views import NotFound
 from Poem.helpers.history_helpers import create_profile_history
+from Poem.helpers.webapi_helpers import invalidate_webapi_cache
 from Poem.poem import models as poem_models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
@@ -70,6 +72,8 @@ class ListAggregations(APIView):
 
                     create_profile_history(aggr, data, request.user)
 
+                    invalidate_webapi_cache(connection.tenant.name)
+
                     return Response(
                         serializer.data, status=status.HTTP_201_CREATED
                     )
@@ -180,6 +184,8 @@ class ListAggregations(APIView):
 
                             create_profile_history(aggr, data, request.user)
 
+                            invalidate_webapi_cache(connection.tenant.name)
+
                             return Response(status=status.HTTP_201_CREATED)
 
                         else:
@@ -205,7 +211,8 @@ class ListAggregations(APIView):
     def get(self, request, aggregation_name=None):
         sync_webapi(
             settings.WEBAPI_AGGREGATION, poem_models.Aggregation,
-            request.tenant.name
+            request.tenant.name,
+            force=sync_requested(request)
         )
 
         if aggregation_name:
@@ -263,6 +270,8 @@ class ListAggregations(APIView):
                         )
                     ).delete()
                     aggregation.delete()
+                    invalidate_webapi_cache(connection.tenant.name)
+
                     return Response(status=status.HTTP_204_NO_CONTENT)
 
                 else:
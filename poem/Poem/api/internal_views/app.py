@@ -1,8 +1,10 @@
-import configparser
+import copy
 
 import pkg_resources
 from Poem.api import serializers
 from Poem.api.internal_views.users import get_all_groups, get_groups_for_user
+from Poem.helpers.config_helpers import poem_config
+from Poem.helpers.session_helpers import session_payloads
 from Poem.helpers.tenant_helpers import CombinedTenant
 from Poem.poem.saml2.config import tenant_from_request, saml_login_string
 from Poem.poem_super_admin.models import WebAPIKey
@@ -46,27 +48,48 @@ class IsSessionActive(APIView):
 
         return perm
 
-    def _get_token(self, name):
-        obj = None
+    @staticmethod
+    def _with_tokens(entry):
+        """
+        Returns payload with WEB-API tokens filled in; tokens are read for
+        every request, so that they are never kept in the cache.
+        """
+        names = list(entry["tenants"].values())
+        if entry["token"]:
+            names.append(entry["token"])
 
-        try:
-            obj = WebAPIKey.objects.get(name=name)
+        tokens = dict(
+            WebAPIKey.objects.filter(name__in=names).values_list(
+                "name", "token"
+            )
+        ) if names else dict()
 
-        except WebAPIKey.DoesNotExist:
-            pass
+        payload = copy.deepcopy(entry["payload"])
+        if entry["token"]:
+            payload["userdetails"]["token"] = tokens.get(entry["token"], "")
 
-        if obj is not None:
-            return obj.token
-        else:
-            return ''
+        for tenant, name in entry["tenants"].items():
+            if name not in tokens:
+                raise WebAPIKey.DoesNotExist(
+                    "WebAPIKey matching query does not exist."
+                )
+
+            payload["tenantdetails"]["tenants"][tenant] = tokens[name]
+
+        return payload
 
     def get(self, request, istenant):
+        entry = session_payloads.get(request, istenant)
+        if entry is not None:
+            return Response(self._with_tokens(entry))
+
         userdetails = dict()
 
         user = get_user_model().objects.get(id=self.request.user.id)
         serializer = serializers.UsersSerializer(user)
         userdetails.update(serializer.data)
 
+        token = None
         rw_user = False
         if istenant == 'true':
             if user.is_superuser:
@@ -79,12 +102,10 @@ class IsSessionActive(APIView):
             rw_user = len(groups["metricprofiles"]) > 0
 
             if self._have_rwperm(groups):
-                token = self._get_token(f"WEB-API-{request.tenant.name}")
+                token = f"WEB-API-{request.tenant.name}"
 
             else:
-                token = self._get_token(f"WEB-API-{request.tenant.name}-RO")
-
-            userdetails['token'] = token
+                token = f"WEB-API-{request.tenant.name}-RO"
 
         tenantdetails = {"combined": request.tenant.combined}
 
@@ -94,33 +115,27 @@ class IsSessionActive(APIView):
             tenants = ct.tenants()
 
             for tenant in tenants:
-                token = WebAPIKey.objects.get(name=f"WEB-API-{tenant}-RO")
-                tenants_dict.update({tenant: token.token})
+                tenants_dict.update({tenant: f"WEB-API-{tenant}-RO"})
 
-        tenantdetails.update({"tenants": tenants_dict})
+        tenantdetails.update({"tenants": dict()})
 
-        return Response({
-            'active': True,
-            'userdetails': userdetails,
-            "tenantdetails": tenantdetails
-        })
+        # names of WEB-API keys are cached instead of their tokens
+        entry = {
+            "payload": {
+                'active': True,
+                'userdetails': userdetails,
+                "tenantdetails": tenantdetails
+            },
+            "token": token,
+            "tenants": tenants_dict
+        }
+        session_payloads.set(request, istenant, entry)
 
+        return Response(self._with_tokens(entry))
 
-def get_use_service_titles(tenant):
-    config = configparser.ConfigParser()
-    config.read(filenames=settings.CONFIG_FILE)
-
-    try:
-        if config.get(
-                f"GENERAL_{tenant.upper()}", "useservicetitles"
-        ) == "True":
-            return True
 
-        else:
-            return False
-
-    except configparser.NoOptionError:
-        return False
+def get_use_service_titles(tenant):
+    return poem_config().tenant(tenant).use_service_titles
 
 
 class GetConfigOptions(APIView):
@@ -0,0 +1,42 @@
+from Poem.helpers.apikey_helpers import verified_keys
+from Poem.helpers.catalogue_helpers import catalogue_cache
+from Poem.helpers.domain_helpers import tenant_domains
+from Poem.helpers.saml_helpers import sp_configs
+from Poem.helpers.session_helpers import session_payloads
+from Poem.helpers.tenant_helpers import data_feeds
+from Poem.helpers.webapi_helpers import webapi, webapi_cache
+from django_tenants.utils import get_public_schema_name
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .utils import error_response
+
+
+class GetCacheStats(APIView):
+    """
+    Statistics of in-process caches, and latency of WEB-API requests, of the
+    process which is handling the request.
+    """
+    authentication_classes = (SessionAuthentication,)
+
+    def get(self, request):
+        if request.tenant.schema_name == get_public_schema_name() and \
+                request.user.is_superuser:
+            return Response({
+                "apikeys": verified_keys.stats(),
+                "catalogue": catalogue_cache.stats(),
+                "datafeeds": data_feeds.stats(),
+                "domains": tenant_domains.stats(),
+                "saml": sp_configs.stats(),
+                "sessions": session_payloads.stats(),
+                "webapi": webapi_cache.stats(),
+                "webapi_latency": webapi.stats()
+            })
+
+        else:
+            return error_response(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to view cache statistics."
+            )
@@ -1,95 +1,159 @@
 import datetime
 
 from Poem.api.internal_views.utils import one_value_inline, \
-    two_value_inline
+    two_value_inline, VersionsPagination, requested_ordering
 from Poem.api.views import NotFound
+from Poem.helpers.streaming_helpers import streaming_requested, \
+    iterate_in_chunks, streaming_list_response
 from Poem.helpers.versioned_comments import new_comment
 from Poem.poem_super_admin import models as admin_models
+from django.db.models.functions import Collate
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 
+class HistoryPagination(VersionsPagination):
+    ordering_fields = ("name", "date_created")
+
+
 class ListVersions(APIView):
     authentication_classes = (SessionAuthentication,)
 
+    @staticmethod
+    def _versions(obj):
+        # related objects are fetched together with versions, so that the
+        # number of queries does not grow with the number of versions
+        if obj == 'probe':
+            return admin_models.ProbeHistory.objects.select_related(
+                'package'
+            )
+
+        else:
+            return admin_models.MetricTemplateHistory.objects.select_related(
+                'mtype', 'probekey__package'
+            ).prefetch_related('tags')
+
+    @staticmethod
+    def _repr_ordering(obj):
+        """
+        Ordering in database giving the same order as sorting versions by
+        their string representation.
+        """
+        if obj == 'probe':
+            return (
+                Collate('name', 'C'), Collate('package__version', 'C'), 'id'
+            )
+
+        else:
+            return (
+                Collate('name', 'C'),
+                Collate('probekey__name', 'C').asc(nulls_first=True),
+                Collate('probekey__package__version', 'C'), 'id'
+            )
+
+    @staticmethod
+    def _version(obj, ver):
+        if obj == 'probe':
+            version = ver.package.version
+            fields = {
+                'name': ver.name,
+                'version': ver.package.version,
+                'package': ver.package.__str__(),
+                'description': ver.description,
+                'comment': ver.comment,
+                'repository': ver.repository,
+                'docurl': ver.docurl
+            }
+        else:
+            if ver.probekey:
+                probekey = ver.probekey.__str__()
+                version = ver.probekey.__str__().split(' ')[1][1:-1]
+            else:
+                probekey = ''
+                version = datetime.datetime.strftime(
+                    ver.date_created, '%Y%m%d-%H%M%S'
+                )
+            fields = {
+                'name': ver.name,
+                'mtype': ver.mtype.name,
+                'tags': [tag.name for tag in ver.tags.all()],
+                'probeversion': probekey,
+                'description': ver.description,
+                'parent': one_value_inline(ver.parent),
+                'probeexecutable': one_value_inline(
+                    ver.probeexecutable
+                ),
+                'config': two_value_inline(ver.config),
+                'attribute': two_value_inline(ver.attribute),
+                'dependency': two_value_inline(ver.dependency),
+                'flags': two_value_inline(ver.flags),
+                'parameter': two_value_inline(ver.parameter)
+            }
+
+        return dict(
+            id=ver.id,
+            object_repr=ver.__str__(),
+            fields=fields,
+            user=ver.version_user,
+            date_created=datetime.datetime.strftime(
+                ver.date_created, '%Y-%m-%d %H:%M:%S'
+            ),
+            comment=new_comment(ver.version_comment),
+            version=version
+        )
+
     def get(self, request, obj, name=None):
-        history_model = {
-            'probe': admin_models.ProbeHistory,
-            'metrictemplate': admin_models.MetricTemplateHistory
-        }
+        vers = self._versions(obj)
 
         if name:
-            history_instance = history_model[obj].objects.filter(name=name)
+            instance = vers.model.objects.filter(name=name).values_list(
+                'object_id', flat=True
+            ).first()
 
-            if history_instance.count() == 0:
+            if instance is None:
                 raise NotFound(status=404, detail='Version not found')
 
-            else:
-                instance = history_instance[0].object_id
+            vers = vers.filter(object_id=instance)
 
-                vers = history_model[obj].objects.filter(
-                    object_id=instance
-                ).order_by('-date_created')
+        if HistoryPagination.requested(request):
+            paginator = HistoryPagination()
+            if not name:
+                paginator.ordering = ('name', 'id')
 
-        else:
-            vers = history_model[obj].objects.all()
-
-        results = []
-        for ver in vers:
-            if obj == 'probe':
-                version = ver.package.version
-                fields = {
-                    'name': ver.name,
-                    'version': ver.package.version,
-                    'package': ver.package.__str__(),
-                    'description': ver.description,
-                    'comment': ver.comment,
-                    'repository': ver.repository,
-                    'docurl': ver.docurl
-                }
-            else:
-                if ver.probekey:
-                    probekey = ver.probekey.__str__()
-                    version = ver.probekey.__str__().split(' ')[1][1:-1]
-                else:
-                    probekey = ''
-                    version = datetime.datetime.strftime(
-                        ver.date_created, '%Y%m%d-%H%M%S'
-                    )
-                fields = {
-                    'name': ver.name,
-                    'mtype': ver.mtype.name,
-                    'tags': [tag.name for tag in ver.tags.all()],
-                    'probeversion': probekey,
-                    'description': ver.description,
-                    'parent': one_value_inline(ver.parent),
-                    'probeexecutable': one_value_inline(
-                        ver.probeexecutable
-                    ),
-                    'config': two_value_inline(ver.config),
-                    'attribute': two_value_inline(ver.attribute),
-                    'dependency': two_value_inline(ver.dependency),
-                    'flags': two_value_inline(ver.flags),
-                    'parameter': two_value_inline(ver.parameter)
-                }
-
-            results.append(dict(
-                id=ver.id,
-                object_repr=ver.__str__(),
-                fields=fields,
-                user=ver.version_user,
-                date_created=datetime.datetime.strftime(
-                    ver.date_created, '%Y-%m-%d %H:%M:%S'
-                ),
-                comment=new_comment(ver.version_comment),
-                version=version
-            ))
+            page = paginator.paginate_queryset(vers, request, view=self)
+
+            return paginator.get_paginated_response(
+                [self._version(obj, ver) for ver in page]
+            )
+
+        ordering = requested_ordering(
+            request, HistoryPagination.ordering_fields
+        )
+
+        if streaming_requested(request):
+            if not ordering:
+                ordering = ('-id',) if name else self._repr_ordering(obj)
+
+            return streaming_list_response(
+                self._version(obj, ver) for ver in
+                iterate_in_chunks(vers.order_by(*ordering))
+            )
+
+        if ordering:
+            return Response(
+                [self._version(obj, ver) for ver in vers.order_by(*ordering)]
+            )
 
         if name:
-            results = sorted(results, key=lambda k: k['id'], reverse=True)
+            results = [
+                self._version(obj, ver) for ver in vers.order_by('-id')
+            ]
         else:
-            results = sorted(results, key=lambda k: k['object_repr'])
+            results = sorted(
+                [self._version(obj, ver) for ver in vers],
+                key=lambda k: k['object_repr']
+            )
 
         return Response(results)
 
@@ -0,0 +1,44 @@
+from Poem.api.views import NotFound
+from Poem.poem_super_admin.models import Job
+from django_tenants.utils import get_public_schema_name
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .utils import error_response
+
+
+class ListJobs(APIView):
+    authentication_classes = (SessionAuthentication,)
+
+    def get(self, request, job_id):
+        if request.user.is_superuser:
+            try:
+                job = Job.objects.get(id=job_id)
+
+                if job.schema_name != request.tenant.schema_name and \
+                        request.tenant.schema_name != get_public_schema_name():
+                    raise Job.DoesNotExist
+
+                return Response({
+                    "id": job.id,
+                    "name": job.name,
+                    "status": job.status,
+                    "user": job.user,
+                    "status_code": job.status_code,
+                    "result": job.result,
+                    "error": job.error,
+                    "date_created": job.date_created,
+                    "date_started": job.date_started,
+                    "date_finished": job.date_finished
+                })
+
+            except Job.DoesNotExist:
+                raise NotFound(status=404, detail="Job not found.")
+
+        else:
+            return error_response(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to view jobs."
+            )
@@ -1,11 +1,13 @@
 from Poem.api import serializers
-from Poem.api.internal_views.utils import sync_webapi
+from Poem.api.internal_views.utils import sync_webapi, sync_requested
 from Poem.api.views import NotFound
 from Poem.helpers.history_helpers import create_profile_history
 from Poem.helpers.metrics_helpers import sync_metrics
+from Poem.helpers.webapi_helpers import invalidate_webapi_cache
 from Poem.poem import models as poem_models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
@@ -117,6 +119,8 @@ class ListMetricProfiles(APIView):
                                 "deleted": f"{msg} been deleted"
                             })
 
+                        invalidate_webapi_cache(connection.tenant.name)
+
                         return Response(
                             data=data, status=status.HTTP_201_CREATED
                         )
@@ -148,7 +152,8 @@ class ListMetricProfiles(APIView):
     def get(self, request, profile_name=None):
         sync_webapi(
             settings.WEBAPI_METRIC, poem_models.MetricProfiles,
-            request.tenant.name
+            request.tenant.name,
+            force=sync_requested(request)
         )
 
         if profile_name:
@@ -302,6 +307,8 @@ class ListMetricProfiles(APIView):
                                         "deleted": f"{msg} been deleted"
                                     })
 
+                                invalidate_webapi_cache(connection.tenant.name)
+
                                 return Response(
                                     status=status.HTTP_201_CREATED, data=data
                                 )
@@ -384,6 +391,8 @@ class ListMetricProfiles(APIView):
 
                                 data.update({"deleted": f"{msg} been deleted"})
 
+                            invalidate_webapi_cache(connection.tenant.name)
+
                             return Response(
                                 data=data, status=status.HTTP_204_NO_CONTENT
                             )
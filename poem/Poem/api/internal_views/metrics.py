@@ -6,9 +6,10 @@ from Poem.api.internal_views.utils import one_value_inline, two_value_inline, \
     inline_metric_for_db
 from Poem.api.views import NotFound, ListMetricOverrides
 from Poem.helpers.history_helpers import create_history
+from Poem.helpers.jobs_helpers import enqueue_job, run_in_background
 from Poem.helpers.metrics_helpers import import_metrics, \
     update_metric_in_schema, get_metrics_in_profiles, \
-    delete_metrics_from_profile
+    delete_metrics_from_profile, get_probes_for_metrics, get_metric_templates
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from django.contrib.contenttypes.models import ContentType
@@ -50,24 +51,19 @@ class ListMetric(APIView):
         else:
             metrics = poem_models.Metric.objects.all()
 
+        metrics = list(metrics.select_related("group"))
+        mts = get_metric_templates(metrics)
+
         profiles4metrics = get_metrics_in_profiles(request.tenant)
 
         results = []
         for metric in metrics:
-            if metric.probeversion:
-                metric_probe = metric.probeversion.split(" (")
-                probe_name = metric_probe[0]
-                probe_version = metric_probe[1][:-1]
-
-                mt = admin_models.MetricTemplateHistory.objects.get(
-                    name=metric.name, probekey__name=probe_name,
-                    probekey__package__version=probe_version
+            if metric.name not in mts:
+                raise admin_models.MetricTemplateHistory.DoesNotExist(
+                    "MetricTemplateHistory matching query does not exist."
                 )
 
-            else:
-                mt = admin_models.MetricTemplateHistory.objects.get(
-                    name=metric.name
-                )
+            mt = mts[metric.name]
 
             config = two_value_inline(metric.config)
             parent = one_value_inline(mt.parent)
@@ -390,73 +386,71 @@ class UpdateMetricsVersions(APIView):
             # updated metrics
             updated = []
             profile_warning = []
-            for metric in poem_models.Metric.objects.all():
-                if metric.probeversion:
-                    metric_probe = metric.probeversion.split(" (")
-                    probe_name = metric_probe[0].strip()
-                    probe_version = metric_probe[1][:-1].strip()
-                    probekey = admin_models.ProbeHistory.objects.filter(
-                        name=probe_name,
-                        package__version=probe_version
-                    )
-                    if len(probekey) == 1 and \
-                            probekey[0].package.name == package.name:
-                        mts_history = \
-                            admin_models.MetricTemplateHistory.objects.filter(
-                                name=metric.name,
-                                probekey__package__name=package.name
-                            )
-                        if len(mts_history) > 0:
-                            mts = admin_models.MetricTemplateHistory.objects.filter(
-                                object_id=mts_history[0].object_id
-                            )
-                            metrictemplate = None
-                            for mt in mts:
-                                if mt.probekey.package == package:
-                                    metrictemplate = mt
-                                    break
-
-                            if metrictemplate:
-                                if not dry_run:
-                                    update_metric_in_schema(
-                                        mt_id=metrictemplate.id,
-                                        name=metric.name,
-                                        pk_id=probekey[0].id,
-                                        schema=schema,
-                                        update_from_history=True,
-                                        user=user
-                                    )
-                                updated.append(metric.name)
+            tenant_metrics = poem_models.Metric.objects.filter(
+                probe_name__isnull=False
+            )
+            probes = get_probes_for_metrics(tenant_metrics)
+            for metric in tenant_metrics:
+                probekey = probes.get(
+                    (metric.probe_name, metric.package_version), None
+                )
+                if probekey and probekey.package.name == package.name:
+                    mts_history = \
+                        admin_models.MetricTemplateHistory.objects.filter(
+                            name=metric.name,
+                            probekey__package__name=package.name
+                        )
+                    if len(mts_history) > 0:
+                        mts = admin_models.MetricTemplateHistory.objects.filter(
+                            object_id=mts_history[0].object_id
+                        )
+                        metrictemplate = None
+                        for mt in mts:
+                            if mt.probekey.package == package:
+                                metrictemplate = mt
+                                break
+
+                        if metrictemplate:
+                            if not dry_run:
+                                update_metric_in_schema(
+                                    mt_id=metrictemplate.id,
+                                    name=metric.name,
+                                    pk_id=probekey.id,
+                                    schema=schema,
+                                    update_from_history=True,
+                                    user=user
+                                )
+                            updated.append(metric.name)
 
-                            else:
-                                if dry_run:
-                                    for key, value in metrics.items():
-                                        if metric.name == key:
-                                            if len(value) == 1:
-                                                profile_warning.append(
-                                                    'Metric {} is part of {} '
-                                                    'metric profile.'.format(
-                                                        metric.name, value[0]
-                                                    )
+                        else:
+                            if dry_run:
+                                for key, value in metrics.items():
+                                    if metric.name == key:
+                                        if len(value) == 1:
+                                            profile_warning.append(
+                                                'Metric {} is part of {} '
+                                                'metric profile.'.format(
+                                                    metric.name, value[0]
                                                 )
-
-                                            else:
-                                                profile_warning.append(
-                                                    'Metric {} is part of {} '
-                                                    'metric profiles.'.format(
-                                                        metric.name, ', '.join(
-                                                            value
-                                                        )
+                                            )
+
+                                        else:
+                                            profile_warning.append(
+                                                'Metric {} is part of {} '
+                                                'metric profiles.'.format(
+                                                    metric.name, ', '.join(
+                                                        value
                                                     )
                                                 )
+                                            )
 
-                                else:
-                                    metric.delete()
+                            else:
+                                metric.delete()
 
-                                deleted_not_in_package.append(metric.name)
+                            deleted_not_in_package.append(metric.name)
 
-                        else:
-                            warning_no_tbh.append(metric.name)
+                    else:
+                        warning_no_tbh.append(metric.name)
 
             msg = dict()
             if deleted_not_in_package:
@@ -582,6 +576,9 @@ class UpdateMetricsVersions(APIView):
         return Response(msg, status=status_code)
 
     def put(self, request):
+        if run_in_background(request):
+            return enqueue_job(request, UpdateMetricsVersions, "put")
+
         if request.user.is_superuser:
             msg, status_code, deleted = self._handle_metrics(
                 name=request.data['name'], version=request.data['version'],
@@ -4,14 +4,21 @@ from Poem.api import serializers
 from Poem.api.internal_views.utils import one_value_inline, two_value_inline, \
     inline_metric_for_db, sync_tags_webapi, WebApiException
 from Poem.api.views import NotFound
+from Poem.helpers.catalogue_helpers import catalogue_cache, \
+    invalidate_catalogue_cache
 from Poem.helpers.history_helpers import create_history, update_comment
+from Poem.helpers.jobs_helpers import enqueue_job, run_in_background
 from Poem.helpers.metrics_helpers import update_metrics, \
     get_metrics_in_profiles, delete_metrics_from_profile
+from Poem.helpers.streaming_helpers import streaming_requested, \
+    iterate_in_chunks, streaming_list_response
+from Poem.helpers.webapi_helpers import webapi_fan_out
 from Poem.poem.models import Metric, TenantHistory
 from Poem.poem_super_admin import models as admin_models
 from Poem.tenants.models import Tenant
 from django.contrib.contenttypes.models import ContentType
 from django.db import IntegrityError
+from django.db.models.functions import Collate
 from django_tenants.utils import get_public_schema_name, schema_context
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
@@ -24,113 +31,132 @@ from .utils import error_response
 class ListMetricTemplates(APIView):
     authentication_classes = (SessionAuthentication,)
 
-    def _get_metrics_per_tenant(self, schema_name):
-        with schema_context(schema_name):
-            metrics = [m.name for m in Metric.objects.all()]
+    @staticmethod
+    def _metrictemplates(name=None):
+        metrictemplates = admin_models.MetricTemplate.objects.all()
+        if name:
+            metrictemplates = metrictemplates.filter(name=name)
+
+        return metrictemplates.select_related(
+            "mtype", "probekey__package"
+        ).prefetch_related("tags", "probekey__package__repos__tag")
+
+    @staticmethod
+    def _metrictemplate(metrictemplate):
+        config = two_value_inline(metrictemplate.config)
+        parent = one_value_inline(metrictemplate.parent)
+        probeexecutable = one_value_inline(metrictemplate.probeexecutable)
+        attribute = two_value_inline(metrictemplate.attribute)
+        dependency = two_value_inline(metrictemplate.dependency)
+        flags = two_value_inline(metrictemplate.flags)
+        parameter = two_value_inline(metrictemplate.parameter)
+
+        ostag = []
+        if metrictemplate.probekey:
+            for repo in metrictemplate.probekey.package.repos.all():
+                ostag.append(repo.tag.name)
+
+        tags = []
+        for tag in metrictemplate.tags.all():
+            tags.append(tag.name)
+
+        if metrictemplate.probekey:
+            probeversion = metrictemplate.probekey.__str__()
+        else:
+            probeversion = ''
+
+        return {
+            "id": metrictemplate.id,
+            "name": metrictemplate.name,
+            "mtype": metrictemplate.mtype.name,
+            "ostag": ostag,
+            "tags": sorted(tags),
+            "probeversion": probeversion,
+            "description": metrictemplate.description,
+            "parent": parent,
+            "probeexecutable": probeexecutable,
+            "config": config,
+            "attribute": attribute,
+            "dependency": dependency,
+            "flags": flags,
+            "parameter": parameter
+        }
+
+    def _build_metrictemplates(self, name=None):
+        results = [
+            self._metrictemplate(metrictemplate)
+            for metrictemplate in self._metrictemplates(name=name)
+        ]
+
+        if name and not results:
+            return None
+
+        return sorted(results, key=lambda k: k['name'])
+
+    @staticmethod
+    def _build_metrictemplates_versions():
+        versions = dict()
+        for mt_name, version_name in \
+                admin_models.MetricTemplateHistory.objects.values_list(
+                    "object_id__name", "name"
+                ):
+            versions.setdefault(mt_name, set()).add(version_name)
 
-        return metrics
+        return versions
 
     def get(self, request, name=None):
-        public_tenant = None
-        tenants = dict()
         if name:
-            metrictemplates = admin_models.MetricTemplate.objects.filter(
-                name=name
+            results = catalogue_cache.get(
+                ("metrictemplate", name),
+                lambda: self._build_metrictemplates(name=name)
             )
-            if metrictemplates.count() == 0:
+            if not results:
                 raise NotFound(status=404, detail='Metric template not found')
 
+            del results[0]['ostag']
+            return Response(results[0])
+
+        if streaming_requested(request):
+            # built one by one, in the same order as sorted in Python
+            results = (
+                self._metrictemplate(metrictemplate) for metrictemplate in
+                iterate_in_chunks(
+                    self._metrictemplates().order_by(Collate("name", "C"))
+                )
+            )
+
         else:
-            public_tenant = Tenant.objects.get(
-                schema_name=get_public_schema_name()
+            results = catalogue_cache.get(
+                "metrictemplates", self._build_metrictemplates
             )
-            metrictemplates = admin_models.MetricTemplate.objects.all()
-
-            if request.tenant == public_tenant:
-                tenants_metrics = dict()
-                for tenant in Tenant.objects.all():
-                    if tenant != public_tenant:
-                        tenants_metrics.update({
-                            tenant.name: self._get_metrics_per_tenant(
-                                tenant.schema_name
-                            )
-                        })
-                for metrictemplate in metrictemplates:
-                    if request.tenant == public_tenant:
-                        mt_versions = [
-                            m.name for m in
-                            admin_models.MetricTemplateHistory.objects.filter(
-                                object_id=metrictemplate
-                            )
-                        ]
-
-                        tenants.update({
-                            metrictemplate.name: sorted([
-                                t for t, m in tenants_metrics.items() if
-                                len(
-                                    set(mt_versions).intersection(set(m))
-                                ) > 0
-                            ])
-                        })
-
-        results = []
-        for metrictemplate in metrictemplates:
-            config = two_value_inline(metrictemplate.config)
-            parent = one_value_inline(metrictemplate.parent)
-            probeexecutable = one_value_inline(metrictemplate.probeexecutable)
-            attribute = two_value_inline(metrictemplate.attribute)
-            dependency = two_value_inline(metrictemplate.dependency)
-            flags = two_value_inline(metrictemplate.flags)
-            parameter = two_value_inline(metrictemplate.parameter)
-
-            ostag = []
-            if metrictemplate.probekey:
-                for repo in metrictemplate.probekey.package.repos.all():
-                    ostag.append(repo.tag.name)
-
-            tags = []
-            for tag in metrictemplate.tags.all():
-                tags.append(tag.name)
-
-            if metrictemplate.probekey:
-                probeversion = metrictemplate.probekey.__str__()
-            else:
-                probeversion = ''
-
-            result_dict = {
-                "id": metrictemplate.id,
-                "name": metrictemplate.name,
-                "mtype": metrictemplate.mtype.name,
-                "ostag": ostag,
-                "tags": sorted(tags),
-                "probeversion": probeversion,
-                "description": metrictemplate.description,
-                "parent": parent,
-                "probeexecutable": probeexecutable,
-                "config": config,
-                "attribute": attribute,
-                "dependency": dependency,
-                "flags": flags,
-                "parameter": parameter
-            }
-
-            if not name and request.tenant == public_tenant:
-                if metrictemplate.name in tenants:
-                    tl = tenants[metrictemplate.name]
-                else:
-                    tl = list()
 
-                result_dict.update({"tenants": tl})
+        if request.tenant.schema_name == get_public_schema_name():
+            results = self._with_tenants(results)
 
-            results.append(result_dict)
+        if streaming_requested(request):
+            return streaming_list_response(results)
 
-        results = sorted(results, key=lambda k: k['name'])
+        return Response(list(results))
 
-        if name:
-            del results[0]['ostag']
-            return Response(results[0])
-        else:
-            return Response(results)
+    def _with_tenants(self, results):
+        tenants_metrics = dict()
+        for tenant_name, metric_name in \
+                admin_models.TenantMetric.objects.values_list(
+                    "tenant__name", "name"
+                ):
+            tenants_metrics.setdefault(metric_name, set()).add(tenant_name)
+
+        versions = catalogue_cache.get(
+            "metrictemplates_versions", self._build_metrictemplates_versions
+        )
+        for result in results:
+            tenants = set()
+            for version_name in versions.get(result["name"], set()):
+                tenants.update(tenants_metrics.get(version_name, set()))
+
+            result.update({"tenants": sorted(tenants)})
+
+            yield result
 
     def post(self, request):
         if request.tenant.schema_name == get_public_schema_name() and \
@@ -249,6 +275,10 @@ class ListMetricTemplates(APIView):
             )
 
     def put(self, request):
+        if run_in_background(request) and \
+                request.tenant.schema_name == get_public_schema_name():
+            return enqueue_job(request, ListMetricTemplates, "put")
+
         if request.tenant.schema_name == get_public_schema_name() and \
                 request.user.is_superuser:
             try:
@@ -398,6 +428,7 @@ class ListMetricTemplates(APIView):
                     admin_models.MetricTemplateHistory.objects.filter(
                         name=old_name, probekey=old_probekey
                     ).update(**new_data)
+                    invalidate_catalogue_cache()
 
                     history = admin_models.MetricTemplateHistory.objects.get(
                         name=request.data['name'], probekey=new_probekey
@@ -466,6 +497,12 @@ class ListMetricTemplates(APIView):
             )
 
     def delete(self, request, name=None):
+        if run_in_background(request) and \
+                request.tenant.schema_name == get_public_schema_name():
+            return enqueue_job(
+                request, ListMetricTemplates, "delete", name=name
+            )
+
         schemas = list(
             Tenant.objects.all().values_list('schema_name', flat=True)
         )
@@ -548,26 +585,46 @@ class ListPublicMetricTemplates(ListMetricTemplates):
 class ListAvailableMetricTemplates(APIView):
     authentication_classes = (SessionAuthentication,)
 
+    @staticmethod
+    def _build_latest_names():
+        """
+        Maps name of every metric template version to the name of the latest
+        version of the same metric template.
+        """
+        latest = dict()
+        versions = admin_models.MetricTemplateHistory.objects.all().order_by(
+            "object_id", "-date_created", "id"
+        ).values_list("object_id", "name")
+        for object_id, name in versions:
+            latest.setdefault(object_id, name)
+
+        latest_names = dict()
+        for object_id, name in versions:
+            latest_names.setdefault(name, latest[object_id])
+
+        return latest_names
+
     def get(self, request):
-        mts = admin_models.MetricTemplate.objects.all().values_list(
-            "name", flat=True
+        mts = catalogue_cache.get(
+            "metrictemplates_names",
+            lambda: list(
+                admin_models.MetricTemplate.objects.all().values_list(
+                    "name", flat=True
+                )
+            )
         )
         metrics = Metric.objects.all().values_list("name", flat=True)
 
         missing_metrics_names = set(metrics).difference(set(mts))
 
-        result = list(mts)
+        result = mts
         if len(missing_metrics_names) > 0:
+            latest_names = catalogue_cache.get(
+                "metrictemplates_latest_names", self._build_latest_names
+            )
             for m in missing_metrics_names:
-                mt_versions = admin_models.MetricTemplateHistory.objects.filter(
-                    name=m
-                )
-                all_versions = \
-                    admin_models.MetricTemplateHistory.objects.filter(
-                        object_id=mt_versions[0].object_id
-                    ).order_by("-date_created")
                 result = list(
-                    map(lambda x: x.replace(all_versions[0].name, m), result)
+                    map(lambda x: x.replace(latest_names[m], m), result)
                 )
 
         results = [{"name": mt} for mt in sorted(result)]
@@ -590,10 +647,41 @@ class ListMetricTemplatesForProbeVersion(APIView):
             )
 
 
+def _get_metrics_in_tenant_profiles(tenant):
+    with schema_context(tenant.schema_name):
+        return get_metrics_in_profiles(tenant)
+
+
+def _delete_metrics_from_tenant_profiles(tenant, profiles):
+    warnings = []
+    with schema_context(tenant.schema_name):
+        for key, value in profiles.items():
+            try:
+                delete_metrics_from_profile(key, value, tenant.name)
+
+            except Exception as e:
+                if len(value) > 1:
+                    noun = 'Metrics {}'.format(', '.join(value))
+                else:
+                    noun = 'Metric {}'.format(value[0])
+
+                warnings.append(
+                    '{}: {} not deleted from profile {}: {}'.format(
+                        tenant.schema_name, noun, key, str(e)
+                    )
+                )
+
+    return warnings
+
+
 class BulkDeleteMetricTemplates(APIView):
     authentication_classes = (SessionAuthentication,)
 
     def post(self, request):
+        if run_in_background(request) and \
+                request.tenant.schema_name == get_public_schema_name():
+            return enqueue_job(request, BulkDeleteMetricTemplates, "post")
+
         if request.tenant.schema_name == get_public_schema_name() and \
                 request.user.is_superuser:
             metrictemplates = dict(request.data)['metrictemplates']
@@ -604,20 +692,26 @@ class BulkDeleteMetricTemplates(APIView):
                 tenant.schema_name != get_public_schema_name()
             ]
 
-            warning_message = []
-            for tenant in tenants:
-                with schema_context(tenant.schema_name):
-                    try:
-                        mip = get_metrics_in_profiles(tenant)
-                    except Exception as e:
-                        warning_message.append(
-                            '{}: Metrics are not removed from metric profiles. '
-                            'Unable to get metric profiles: {}'.format(
-                                tenant.schema_name, str(e)
-                            )
+            tenant_warnings = dict(
+                [(tenant.schema_name, []) for tenant in tenants]
+            )
+            results = webapi_fan_out(
+                _get_metrics_in_tenant_profiles,
+                [(tenant,) for tenant in tenants]
+            )
+
+            delete_tasks = []
+            for tenant, (mip, exception) in zip(tenants, results):
+                if exception:
+                    tenant_warnings[tenant.schema_name].append(
+                        '{}: Metrics are not removed from metric profiles. '
+                        'Unable to get metric profiles: {}'.format(
+                            tenant.schema_name, str(exception)
                         )
-                        continue
+                    )
+                    continue
 
+                with schema_context(tenant.schema_name):
                     inter = set(metrictemplates).intersection(
                         set(list(mip.keys()))
                     )
@@ -644,24 +738,22 @@ class BulkDeleteMetricTemplates(APIView):
                                         profiles.update({p: [key]})
 
                     if profiles:
-                        for key, value in profiles.items():
-                            try:
-                                delete_metrics_from_profile(
-                                    key, value, tenant.name
-                                )
+                        delete_tasks.append((tenant, profiles))
 
-                            except Exception as e:
-                                if len(value) > 1:
-                                    noun = 'Metrics {}'.format(', '.join(value))
-                                else:
-                                    noun = 'Metric {}'.format(value[0])
+            results = webapi_fan_out(
+                _delete_metrics_from_tenant_profiles, delete_tasks
+            )
+            for (tenant, profiles), (warnings, exception) in zip(
+                    delete_tasks, results
+            ):
+                if exception:
+                    raise exception
 
-                                warning_message.append(
-                                    '{}: {} not deleted from '
-                                    'profile {}: {}'.format(
-                                        tenant.schema_name, noun, key, str(e)
-                                    )
-                                )
+                tenant_warnings[tenant.schema_name].extend(warnings)
+
+            warning_message = []
+            for tenant in tenants:
+                warning_message.extend(tenant_warnings[tenant.schema_name])
 
             response_message = dict()
             mt = admin_models.MetricTemplate.objects.filter(
@@ -730,44 +822,41 @@ class ListPublicMetricTemplateTypes(ListMetricTemplateTypes):
 class ListMetricTags(APIView):
     authentication_classes = (SessionAuthentication,)
 
+    @staticmethod
+    def _build_metrictags():
+        metrics = dict()
+        for tag_name, mt_name in \
+                admin_models.MetricTemplate.tags.through.objects.values_list(
+                    "metrictags__name", "metrictemplate__name"
+                ):
+            metrics.setdefault(tag_name, list()).append({"name": mt_name})
+
+        data = list()
+        for tag in admin_models.MetricTags.objects.all().order_by('name'):
+            data.append({
+                "id": tag.id,
+                "name": tag.name,
+                "metrics": sorted(
+                    metrics.get(tag.name, list()), key=lambda m: m["name"]
+                )
+            })
+
+        return data
+
     def get(self, request, name=None):
+        data = catalogue_cache.get("metrictags", self._build_metrictags)
+
         if name:
-            try:
-                tag = admin_models.MetricTags.objects.get(name=name)
-                metrics = admin_models.MetricTemplate.objects.filter(
-                    tags__name=tag.name
-                )
-                return Response({
-                    "id": tag.id,
-                    "name": tag.name,
-                    "metrics": sorted(
-                        [{"name": metric.name} for metric in metrics],
-                        key=lambda m: m["name"]
-                    )
-                })
+            for tag in data:
+                if tag["name"] == name:
+                    return Response(tag)
 
-            except admin_models.MetricTags.DoesNotExist:
-                return Response(
-                    {"detail": "Requested tag not found."},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            return Response(
+                {"detail": "Requested tag not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
         else:
-            tags = admin_models.MetricTags.objects.all().order_by('name')
-            data = list()
-            for tag in tags:
-                metrics = admin_models.MetricTemplate.objects.filter(
-                    tags__name=tag.name
-                )
-                data.append({
-                    "id": tag.id,
-                    "name": tag.name,
-                    "metrics": sorted(
-                        [{"name": metric.name} for metric in metrics],
-                        key=lambda m: m["name"]
-                    )
-                })
-
             return Response(data)
 
     def post(self, request):
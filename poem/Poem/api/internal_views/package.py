@@ -1,6 +1,7 @@
 from distutils.version import StrictVersion
 
 from Poem.api.views import NotFound
+from Poem.helpers.metrics_helpers import get_probes_for_metrics
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from django.db import IntegrityError, connection
@@ -33,7 +34,7 @@ def get_packages_for_api(packages):
             'name': package.name,
             'version': package.version,
             'use_present_version': package.use_present_version,
-            'repos': repos
+            'repos': sorted(repos)
         })
 
     return results
@@ -69,20 +70,18 @@ class ListPackages(APIView):
 
         else:
             if connection.schema_name != get_public_schema_name():
-                packages = set()
-                for metric in poem_models.Metric.objects.all():
-                    if metric.probeversion:
-                        metric_probe = metric.probeversion.split("(")
-                        probe_name = metric_probe[0].strip()
-                        probe_version = metric_probe[1][:-1].strip()
-                        probe = admin_models.ProbeHistory.objects.get(
-                            name=probe_name, package__version=probe_version
-                        )
-                        packages.add(probe.package)
+                probes = get_probes_for_metrics(
+                    poem_models.Metric.objects.filter(probe_name__isnull=False)
+                )
+                packages = admin_models.Package.objects.filter(
+                    id__in=set([probe.package_id for probe in probes.values()])
+                )
 
             else:
                 packages = admin_models.Package.objects.all()
 
+            packages = packages.prefetch_related("repos__tag")
+
             results = sorted(
                 get_packages_for_api(packages),
                 key=lambda k: k['name'].lower()
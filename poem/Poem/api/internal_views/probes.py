@@ -2,13 +2,19 @@ import datetime
 import json
 
 from Poem.api.views import NotFound
+from Poem.helpers.catalogue_helpers import invalidate_catalogue_cache
 from Poem.helpers.history_helpers import create_history, update_comment
+from Poem.helpers.jobs_helpers import enqueue_job, run_in_background
+from Poem.helpers.streaming_helpers import streaming_requested, \
+    iterate_in_chunks, streaming_list_response
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from Poem.tenants.models import Tenant
 from django.conf import settings
 from django.core.mail import EmailMessage
 from django.db import IntegrityError
+from django.db.models import Count
+from django.db.models.functions import Collate, Lower
 from django_tenants.utils import schema_context, get_public_schema_name
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
@@ -52,33 +58,42 @@ class ListProbes(APIView):
                 raise NotFound(status=404, detail='Probe not found')
 
         else:
-            probes = admin_models.Probe.objects.all()
-
-            results = []
-            for probe in probes:
-                # number of probe revisions
-                nv = admin_models.ProbeHistory.objects.filter(
-                    object_id=probe
-                ).count()
-
-                results.append(
-                    dict(
-                        name=probe.name,
-                        version=probe.package.version,
-                        package=probe.package.__str__(),
-                        docurl=probe.docurl,
-                        description=probe.description,
-                        comment=probe.comment,
-                        repository=probe.repository,
-                        nv=nv
+            # number of probe revisions is counted in the same query
+            probes = admin_models.Probe.objects.select_related(
+                'package'
+            ).annotate(nv=Count('probehistory'))
+
+            if streaming_requested(request):
+                return streaming_list_response(
+                    self._probe(probe) for probe in iterate_in_chunks(
+                        probes.order_by(Collate(Lower('name'), 'C'), 'id')
                     )
                 )
 
+            results = [self._probe(probe) for probe in probes]
+
             results = sorted(results, key=lambda k: k['name'].lower())
 
             return Response(results)
 
+    @staticmethod
+    def _probe(probe):
+        return dict(
+            name=probe.name,
+            version=probe.package.version,
+            package=probe.package.__str__(),
+            docurl=probe.docurl,
+            description=probe.description,
+            comment=probe.comment,
+            repository=probe.repository,
+            nv=probe.nv
+        )
+
     def put(self, request):
+        if run_in_background(request) and \
+                request.tenant.schema_name == get_public_schema_name():
+            return enqueue_job(request, ListProbes, "put")
+
         schemas = list(
             Tenant.objects.all().values_list('schema_name', flat=True)
         )
@@ -153,13 +168,15 @@ class ListProbes(APIView):
                         )
                     })
                     history.update(**new_data)
+                    invalidate_catalogue_cache()
 
                     # update Metric history in case probe name has changed:
                     if request.data['name'] != old_name:
                         for schema in schemas:
                             with schema_context(schema):
                                 metrics = poem_models.Metric.objects.filter(
-                                    probeversion=f"{old_name} ({old_version})"
+                                    probe_name=old_name,
+                                    package_version=old_version
                                 )
 
                                 for metric in metrics:
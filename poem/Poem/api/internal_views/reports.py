@@ -1,10 +1,12 @@
 from Poem.api import serializers
 from Poem.api.internal_views.users import get_groups_for_user
-from Poem.api.internal_views.utils import sync_webapi
+from Poem.api.internal_views.utils import sync_webapi, sync_requested
 from Poem.api.views import NotFound
+from Poem.helpers.webapi_helpers import invalidate_webapi_cache
 from Poem.poem import models as poem_models
 from Poem.users.models import CustUser
 from django.conf import settings
+from django.db import connection
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
@@ -60,6 +62,8 @@ class ListReports(APIView):
                 )
                 groupreports.reports.add(report)
 
+                invalidate_webapi_cache(connection.tenant.name)
+
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
 
             except poem_models.GroupOfReports.DoesNotExist:
@@ -81,7 +85,9 @@ class ListReports(APIView):
 
     def get(self, request, report_name=None):
         sync_webapi(
-            settings.WEBAPI_REPORTS, poem_models.Reports, request.tenant.name
+            settings.WEBAPI_REPORTS, poem_models.Reports,
+            request.tenant.name,
+            force=sync_requested(request)
         )
 
         if report_name:
@@ -154,6 +160,8 @@ class ListReports(APIView):
 
                 groupreport.reports.add(report)
 
+                invalidate_webapi_cache(connection.tenant.name)
+
                 return Response(status=status.HTTP_201_CREATED)
 
             else:
@@ -200,6 +208,8 @@ class ListReports(APIView):
 
                 report.delete()
 
+                invalidate_webapi_cache(connection.tenant.name)
+
                 return Response(status=status.HTTP_204_NO_CONTENT)
 
             except poem_models.Reports.DoesNotExist:
@@ -1,7 +1,8 @@
 import datetime
 
-from Poem.api.internal_views.utils import get_tenant_resources
+from Poem.api.internal_views.utils import get_tenants_resources
 from Poem.helpers.tenant_helpers import CombinedTenant
+from Poem.helpers.webapi_helpers import webapi_fan_out
 from Poem.tenants.models import Tenant
 from django_tenants.utils import get_public_schema_name, get_tenant_domain_model
 from rest_framework import status
@@ -34,6 +35,28 @@ class ListTenants(APIView):
         else:
             tenants = Tenant.objects.all()
 
+        tenants = list(tenants)
+        domains = dict()
+        for domain in get_tenant_domain_model().objects.filter(
+            tenant__in=tenants
+        ):
+            domains.setdefault(domain.tenant_id, domain.domain)
+
+        resources = get_tenants_resources(
+            [tenant.schema_name for tenant in tenants]
+        )
+
+        combined_tenants = [tenant for tenant in tenants if tenant.combined]
+        combined_from = dict(zip(
+            [tenant.name for tenant in combined_tenants],
+            [
+                result for result, exception in webapi_fan_out(
+                    lambda tenant: CombinedTenant(tenant).tenants(),
+                    [(tenant,) for tenant in combined_tenants]
+                )
+            ]
+        ))
+
         for tenant in tenants:
             if tenant.schema_name == get_public_schema_name():
                 tenant_name = 'SuperPOEM Tenant'
@@ -43,35 +66,31 @@ class ListTenants(APIView):
                 tenant_name = tenant.name
                 metric_key = 'metrics'
 
-            try:
-                domain = get_tenant_domain_model().objects.get(tenant=tenant)
-
-                data = get_tenant_resources(tenant.schema_name)
-
-                result = dict(
-                    name=tenant_name,
-                    schema_name=tenant.schema_name,
-                    domain_url=domain.domain,
-                    created_on=datetime.date.strftime(
-                        tenant.created_on, '%Y-%m-%d'
-                    ),
-                    nr_metrics=data[metric_key],
-                    nr_probes=data['probes'],
-                    combined=tenant.combined
-                )
-
-                if tenant.combined:
-                    combined = CombinedTenant(tenant)
-                    result.update({"combined_from": combined.tenants()})
-
-                results.append(result)
-
-            except get_tenant_domain_model().DoesNotExist:
+            if tenant.id not in domains:
                 return error_response(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail='Domain for tenant {} not found.'.format(tenant_name)
                 )
 
+            data = resources[tenant.schema_name]
+
+            result = dict(
+                name=tenant_name,
+                schema_name=tenant.schema_name,
+                domain_url=domains[tenant.id],
+                created_on=datetime.date.strftime(
+                    tenant.created_on, '%Y-%m-%d'
+                ),
+                nr_metrics=data[metric_key],
+                nr_probes=data['probes'],
+                combined=tenant.combined
+            )
+
+            if tenant.combined:
+                result.update({"combined_from": combined_from[tenant.name]})
+
+            results.append(result)
+
         if name:
             results = results[0]
 
@@ -1,10 +1,12 @@
 from Poem.api import serializers
-from Poem.api.internal_views.utils import sync_webapi
+from Poem.api.internal_views.utils import sync_webapi, sync_requested
 from Poem.api.views import NotFound
 from Poem.helpers.history_helpers import create_profile_history
+from Poem.helpers.webapi_helpers import invalidate_webapi_cache
 from Poem.poem import models as poem_models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
@@ -19,7 +21,8 @@ class ListThresholdsProfiles(APIView):
     def get(self, request, name=None):
         sync_webapi(
             settings.WEBAPI_THRESHOLDS, poem_models.ThresholdsProfiles,
-            request.tenant.name
+            request.tenant.name,
+            force=sync_requested(request)
         )
 
         if name:
@@ -105,6 +108,8 @@ class ListThresholdsProfiles(APIView):
 
                         create_profile_history(profile, data, request.user)
 
+                        invalidate_webapi_cache(connection.tenant.name)
+
                         return Response(status=status.HTTP_201_CREATED)
 
                     else:
@@ -180,6 +185,8 @@ class ListThresholdsProfiles(APIView):
 
                         create_profile_history(tp, data, request.user)
 
+                        invalidate_webapi_cache(connection.tenant.name)
+
                         return Response(
                             serializer.data, status=status.HTTP_201_CREATED
                         )
@@ -256,6 +263,8 @@ class ListThresholdsProfiles(APIView):
                         ).delete()
                         tp.delete()
 
+                        invalidate_webapi_cache(connection.tenant.name)
+
                         return Response(status=status.HTTP_204_NO_CONTENT)
 
                     else:
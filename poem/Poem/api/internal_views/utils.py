@@ -2,12 +2,16 @@ import json
 
 import requests
 from Poem.helpers.history_helpers import create_profile_history
+from Poem.helpers.webapi_helpers import get_webapi_data, webapi
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from Poem.poem_super_admin.models import WebAPIKey
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django_tenants.utils import schema_context, get_public_schema_name
+from django.core.cache import cache
+from django.db import connection, transaction
+from django_tenants.utils import get_public_schema_name
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 
 
@@ -72,91 +76,135 @@ def two_value_inline_dict(input_data):
     return results
 
 
-def sync_webapi(api, model, tenant):
+def sync_requested(request):
+    return request.query_params.get("sync", "") in ["true", "True", "1"]
+
+
+def _sync_key(model):
+    return "poem-syncwebapi-{}-{}".format(
+        connection.schema_name, model._meta.label_lower
+    )
+
+
+def _sync_due(model, force=False):
+    """
+    Returns True if entries of the model should be synced with WEB-API, i.e.
+    if they have not been synced by any of POEM processes in the last
+    WEBAPI_SYNC_INTERVAL seconds, or if sync is forced.
+    """
+    interval = settings.WEBAPI_SYNC_INTERVAL
+    if not interval:
+        return True
+
+    if force:
+        cache.set(_sync_key(model), True, interval)
+        return True
+
+    return cache.add(_sync_key(model), True, interval)
+
+
+def _webapi_entry_fields(entry):
+    info = entry["info"] if entry.get("info", False) else entry
+
+    return info["name"], info.get("description", "")
+
+
+def _create_initial_history(instance, entry):
+    if isinstance(instance, poem_models.MetricProfiles):
+        services = []
+        for service in entry["services"]:
+            for metric in service["metrics"]:
+                services.append(dict(service=service["service"], metric=metric))
+
+        create_profile_history(
+            instance, services, "poem", entry.get("description", "")
+        )
+
+    if isinstance(instance, poem_models.Aggregation):
+        aggr_data = {
+            "endpoint_group": entry["endpoint_group"],
+            "metric_operation": entry["metric_operation"],
+            "profile_operation": entry["profile_operation"],
+            "metric_profile": entry["metric_profile"]["name"],
+            "groups": entry["groups"]
+        }
+        create_profile_history(instance, aggr_data, "poem")
+
+    if isinstance(instance, poem_models.ThresholdsProfiles):
+        create_profile_history(instance, {"rules": entry["rules"]}, "poem")
+
+
+def _reconcile_webapi(api, model, tenant):
     token = WebAPIKey.objects.get(name=f"WEB-API-{tenant}")
 
-    headers = {'Accept': 'application/json', 'x-api-key': token.token}
-    response = requests.get(api, headers=headers, timeout=180)
-    response.raise_for_status()
-    data = response.json()['data']
-
-    data_api = set([p['id'] for p in data])
-    data_db = set(model.objects.all().values_list('apiid', flat=True))
-    entries_not_indb = data_api.difference(data_db)
-    entries_indb = data_api.intersection(data_db)
-
-    new_entries = []
-    for p in data:
-        if p['id'] in entries_not_indb:
-            if p.get('info', False):
-                new_entries.append(
-                    dict(name=p['info']['name'], description=p['info'].get(
-                        'description', ''
-                    ), apiid=p['id'], groupname='')
-                )
-            else:
-                new_entries.append(
-                    dict(name=p['name'], description=p.get('description', ''),
-                         apiid=p['id'], groupname='')
-                )
-
-    if new_entries:
-        for entry in new_entries:
-            instance = model.objects.create(**entry)
-
-            if isinstance(instance, poem_models.MetricProfiles):
-                services = []
-                description = ""
-                for item in data:
-                    if item['id'] == instance.apiid:
-                        for service in item['services']:
-                            for metric in service['metrics']:
-                                services.append(
-                                    dict(
-                                        service=service['service'],
-                                        metric=metric
-                                    )
-                                )
-                        description = item.get('description', '')
-                create_profile_history(instance, services, 'poem', description)
-
-            if isinstance(instance, poem_models.Aggregation):
-                for item in data:
-                    if item['id'] == instance.apiid:
-                        aggr_data = {
-                            'endpoint_group': item['endpoint_group'],
-                            'metric_operation': item['metric_operation'],
-                            'profile_operation': item['profile_operation'],
-                            'metric_profile': item['metric_profile']['name'],
-                            'groups': item['groups']
-                        }
-                create_profile_history(instance, aggr_data, 'poem')
-
-            if isinstance(instance, poem_models.ThresholdsProfiles):
-                for item in data:
-                    if item['id'] == instance.apiid:
-                        tp_data = {'rules': item['rules']}
-                create_profile_history(instance, tp_data, 'poem')
-
-    entries_deleted_onapi = data_db.difference(data_api)
-    for p in entries_deleted_onapi:
-        instance = model.objects.get(apiid=p)
-        poem_models.TenantHistory.objects.filter(
-            object_id=instance.id,
-            content_type=ContentType.objects.get_for_model(model)
-        ).delete()
-        instance.delete()
-
-    for p in data:
-        if p['id'] in entries_indb:
-            instance = model.objects.get(apiid=p['id'])
-            if p.get('info', False):
-                instance.name = p['info']['name']
-                instance.description = p['info'].get('description', '')
-            else:
-                instance.name = p['name']
-                instance.description = p.get('description', '')
-            instance.save()
+    # entries missing in WEB-API are deleted, so cached data is never used
+    # without asking WEB-API (with conditional request) whether it is current
+    data = dict(
+        (entry["id"], entry) for entry in get_webapi_data(
+            api, tenant, token.token, revalidate=True
+        )
+    )
+    instances = dict(
+        (instance.apiid, instance) for instance in
+        model.objects.only("id", "apiid", "name", "description")
+    )
+
+    with transaction.atomic():
+        new_instances = []
+        for apiid, entry in data.items():
+            if apiid not in instances:
+                name, description = _webapi_entry_fields(entry)
+                new_instances.append(model(
+                    name=name, description=description, apiid=apiid,
+                    groupname=""
+                ))
+
+        for instance in model.objects.bulk_create(new_instances):
+            _create_initial_history(instance, data[instance.apiid])
+
+        deleted = [
+            instance.id for apiid, instance in instances.items()
+            if apiid not in data
+        ]
+        if deleted:
+            poem_models.TenantHistory.objects.filter(
+                object_id__in=[str(pk) for pk in deleted],
+                content_type=ContentType.objects.get_for_model(model)
+            ).delete()
+            model.objects.filter(id__in=deleted).delete()
+
+        changed = []
+        for apiid, instance in instances.items():
+            if apiid in data:
+                name, description = _webapi_entry_fields(data[apiid])
+                if (instance.name, instance.description) != \
+                        (name, description):
+                    instance.name = name
+                    instance.description = description
+                    changed.append(instance)
+
+        if changed:
+            model.objects.bulk_update(changed, ["name", "description"])
+
+
+def sync_webapi(api, model, tenant, force=False):
+    """
+    Reconciles entries of the model with the ones in WEB-API: missing
+    entries are created, entries removed from WEB-API are deleted together
+    with their history, and only entries whose name or description has been
+    changed are updated. Sync is done at most once per WEBAPI_SYNC_INTERVAL
+    seconds for each tenant and model, unless it is forced.
+    """
+    if not _sync_due(model, force=force):
+        return
+
+    try:
+        _reconcile_webapi(api, model, tenant)
+
+    except Exception:
+        # failed sync should be retried with the next request
+        cache.delete(_sync_key(model))
+        raise
 
 
 class WebApiException(Exception):
@@ -177,7 +225,7 @@ def sync_tags_webapi():
         data2send.append({"name": mt.name, "tags": tags})
 
     try:
-        response = requests.put(
+        response = webapi.put(
             settings.WEBAPI_METRICSTAGS,
             headers={"x-api-key": token.token, "Accept": "application/json"},
             data=json.dumps(sorted(data2send, key=lambda d: d["name"]))
@@ -205,19 +253,114 @@ def sync_tags_webapi():
         raise WebApiException(error)
 
 
-def get_tenant_resources(schema_name):
-    with schema_context(schema_name):
+def get_tenants_resources(schema_names):
+    """
+    Returns number of metrics (metric templates for public schema) and of
+    distinct probes used by them for each of the given schemas, counted with
+    a single query across all the schemas. Schemas without the table (e.g.
+    not yet created or migrated) are counted as empty, as a single missing
+    table would fail the whole query.
+    """
+    if not schema_names:
+        return dict()
+
+    tables = dict()
+    for schema_name in schema_names:
+        if schema_name == get_public_schema_name():
+            tables[schema_name] = admin_models.MetricTemplate._meta.db_table
+
+        else:
+            tables[schema_name] = poem_models.Metric._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT table_schema, table_name "
+            "FROM information_schema.tables WHERE table_schema = ANY(%s)",
+            [list(tables)]
+        )
+        existing = set(cursor.fetchall())
+
+    queries = []
+    params = []
+    for schema_name, table_name in tables.items():
+        if (schema_name, table_name) not in existing:
+            continue
+
+        schema = connection.ops.quote_name(schema_name)
+        table = connection.ops.quote_name(table_name)
+        if schema_name == get_public_schema_name():
+            queries.append(
+                f"SELECT %s, COUNT(*), COUNT(DISTINCT probekey_id) "
+                f"FROM {schema}.{table}"
+            )
+
+        else:
+            queries.append(
+                f"SELECT %s, COUNT(*), "
+                f"COUNT(DISTINCT NULLIF(probeversion, '')) "
+                f"FROM {schema}.{table}"
+            )
+
+        params.append(schema_name)
+
+    rows = dict((schema_name, (0, 0)) for schema_name in tables)
+    if queries:
+        with connection.cursor() as cursor:
+            cursor.execute(" UNION ALL ".join(queries), params)
+            for schema_name, n_met, n_probe in cursor.fetchall():
+                rows[schema_name] = (n_met, n_probe)
+
+    resources = dict()
+    for schema_name, (n_met, n_probe) in rows.items():
         if schema_name == get_public_schema_name():
-            metrics = admin_models.MetricTemplate.objects.all()
-            probes = [metric.probekey for metric in metrics if metric.probekey]
             met_key = 'metric_templates'
+
         else:
-            metrics = poem_models.Metric.objects.all()
-            probes = [
-                metric.probeversion for metric in metrics if metric.probeversion
-            ]
             met_key = 'metrics'
-        n_met = metrics.count()
-        n_probe = len(set(probes))
 
-        return {met_key: n_met, 'probes': n_probe}
+        resources[schema_name] = {met_key: n_met, 'probes': n_probe}
+
+    return resources
+
+
+def get_tenant_resources(schema_name):
+    return get_tenants_resources([schema_name])[schema_name]
+
+
+class VersionsPagination(CursorPagination):
+    """
+    Cursor pagination of versions, newest first. Versions are paginated only
+    if limit or cursor query parameter is given, so that clients expecting
+    the whole list still get it.
+    """
+    ordering = ("-date_created", "-id")
+    ordering_fields = ("date_created",)
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = requested_ordering(request, self.ordering_fields)
+        return ordering if ordering else self.ordering
+
+    @staticmethod
+    def requested(request):
+        return "limit" in request.query_params or \
+            "cursor" in request.query_params
+
+
+def summary_requested(request):
+    return request.query_params.get("summary", "") in ["true", "True", "1"]
+
+
+def requested_ordering(request, fields):
+    """
+    Returns ordering asked for with ordering query parameter if it is one of
+    the given fields (optionally prefixed with "-"), with id as tiebreaker,
+    or None otherwise.
+    """
+    ordering = request.query_params.get("ordering", "")
+    if ordering.lstrip("-") not in fields:
+        return None
+
+    return ordering, "-id" if ordering.startswith("-") else "id"
@@ -16,12 +16,9 @@ class ListYumRepos(APIView):
     def get(self, request, name=None, tag=None):
         if name and tag:
             try:
-                ostag = [
-                    t for t in admin_models.OSTag.objects.all() if
-                    t.name.lower().replace(" ", "") == tag
-                ][0]
-
-                repo = admin_models.YumRepo.objects.get(name=name, tag=ostag)
+                repo = admin_models.YumRepo.objects.select_related(
+                    "tag"
+                ).get(name=name, tag__normalized_name=tag)
                 result = {
                     'id': repo.id,
                     'name': repo.name,
@@ -31,11 +28,11 @@ class ListYumRepos(APIView):
                 }
                 return Response(result)
 
-            except (IndexError, admin_models.YumRepo.DoesNotExist):
+            except admin_models.YumRepo.DoesNotExist:
                 return Response(status=status.HTTP_404_NOT_FOUND)
 
         elif not name and not tag:
-            repos = admin_models.YumRepo.objects.all()
+            repos = admin_models.YumRepo.objects.select_related("tag")
 
             results = []
             for repo in repos:
@@ -143,13 +140,10 @@ class ListYumRepos(APIView):
         if request.tenant.schema_name == get_public_schema_name() and \
                 request.user.is_superuser:
             if name and tag:
-                try:
-                    ostag = [
-                        t for t in admin_models.OSTag.objects.all() if
-                        t.name.lower().replace(" ", "") == tag
-                    ][0]
-
-                except IndexError:
+                ostag = admin_models.OSTag.objects.filter(
+                    normalized_name=tag
+                ).first()
+                if not ostag:
                     raise NotFound(status=404, detail='OS tag does not exist.')
 
                 try:
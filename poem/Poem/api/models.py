@@ -1,5 +1,10 @@
-from django.db import models
+import time
 
+from Poem.helpers.apikey_helpers import verified_keys, \
+    invalidate_verified_keys
+from django.db import connection, models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from rest_framework_api_key.crypto import KeyGenerator
 from rest_framework_api_key.models import AbstractAPIKey, BaseAPIKeyManager
 
@@ -43,6 +48,11 @@ class MyAPIKeyManager(BaseAPIKeyManager):
         return obj, key
 
     def is_valid(self, key):
+        schema_name = connection.schema_name
+        if verified_keys.get(self.model, schema_name, key):
+            return True
+
+        start = time.monotonic()
         queryset = self.get_usable_keys()
 
         try:
@@ -57,6 +67,11 @@ class MyAPIKeyManager(BaseAPIKeyManager):
         if api_key.has_expired:
             return False
 
+        verified_keys.set(
+            self.model, schema_name, key, api_key.expiry_date,
+            time.monotonic() - start
+        )
+
         return True
 
 
@@ -64,3 +79,9 @@ class MyAPIKey(AbstractAPIKey):
     objects = MyAPIKeyManager()
 
     token = models.CharField(max_length=100)
+
+
+@receiver(post_save, sender=MyAPIKey)
+@receiver(post_delete, sender=MyAPIKey)
+def apikey_changed(sender, **kwargs):
+    invalidate_verified_keys(connection.schema_name)
@@ -3,10 +3,13 @@ from unittest.mock import patch
 
 from Poem.api import views_internal as views
 from Poem.api.models import MyAPIKey
+from Poem.helpers.apikey_helpers import verified_keys
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin.models import WebAPIKey
 from Poem.tenants.models import Tenant
 from Poem.users.models import CustUser
+from django.test import override_settings
+from django.utils import timezone
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from django_tenants.utils import get_public_schema_name, schema_context, \
@@ -1632,3 +1635,108 @@ class ListAPIKeysAPIViewTests(TenantTestCase):
             'You do not have permission to delete API keys'
         )
         self.assertEqual(len(WebAPIKey.objects.all()), 8)
+
+
+class VerifiedKeyCacheTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                }
+            },
+            APIKEY_CACHE_TIMEOUT=60,
+            APIKEY_CACHE_SIZE=2
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.tenant.name = "TENANT"
+        self.tenant.save()
+        self.factory = TenantRequestFactory(self.tenant)
+        self.view = views.ListAPIKeys.as_view()
+        self.url = "/api/v2/internal/apikeys/"
+        mock_db()
+
+        self.superuser = CustUser.objects.get(username="testuser")
+        self.key = MyAPIKey.objects.get(name="EGI")
+
+        verified_keys.clear()
+
+    @patch.object(MyAPIKey, "is_valid", return_value=True)
+    def test_verified_key_not_hashed_again(self, mock_valid):
+        stats = verified_keys.stats()
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        self.assertEqual(mock_valid.call_count, 1)
+        self.assertEqual(verified_keys.stats()["hits"], stats["hits"] + 2)
+        self.assertEqual(verified_keys.stats()["misses"], stats["misses"] + 1)
+        self.assertGreater(verified_keys.stats()["hit_rate"], 0)
+        self.assertEqual(verified_keys.stats()["entries"], 1)
+
+    def test_invalid_key_not_cached(self):
+        self.assertFalse(MyAPIKey.objects.is_valid("wrong_token"))
+        self.assertFalse(MyAPIKey.objects.is_valid("wrong_token"))
+        self.assertEqual(verified_keys.stats()["entries"], 0)
+
+    def test_revoked_key_not_valid(self):
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        content, content_type = encode_data({
+            "id": self.key.id,
+            "name": "EGI",
+            "revoked": True,
+            "used_by": "poem"
+        })
+        request = self.factory.put(self.url, content, content_type=content_type)
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.superuser)
+        response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(MyAPIKey.objects.is_valid(self.key.token))
+
+    def test_deleted_key_not_valid(self):
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        request = self.factory.delete(self.url + "poem_EGI")
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.superuser)
+        response = self.view(request, "poem_EGI")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(MyAPIKey.objects.is_valid(self.key.token))
+
+    def test_expired_key_verified_again(self):
+        self.key.expiry_date = timezone.now() + datetime.timedelta(hours=1)
+        self.key.save()
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        misses = verified_keys.stats()["misses"]
+        with patch(
+            "Poem.helpers.apikey_helpers.timezone.now",
+            return_value=timezone.now() + datetime.timedelta(hours=2)
+        ):
+            MyAPIKey.objects.is_valid(self.key.token)
+        self.assertEqual(verified_keys.stats()["misses"], misses + 1)
+
+    def test_number_of_verified_keys_is_bounded(self):
+        for name in ["EGI", "EUDAT", "DELETABLE"]:
+            self.assertTrue(
+                MyAPIKey.objects.is_valid(MyAPIKey.objects.get(name=name).token)
+            )
+        self.assertEqual(verified_keys.stats()["entries"], 2)
+
+    @patch.object(MyAPIKey, "is_valid", return_value=True)
+    def test_not_cached_with_dummy_cache(self, mock_valid):
+        with self.settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }):
+            self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+            self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        self.assertEqual(mock_valid.call_count, 2)
+
+    def test_verified_key_not_valid_for_other_model(self):
+        self.assertFalse(
+            WebAPIKey.objects.filter(token=self.key.token).exists()
+        )
+        self.assertTrue(MyAPIKey.objects.is_valid(self.key.token))
+        self.assertFalse(WebAPIKey.objects.is_valid(self.key.token))
@@ -1,18 +1,26 @@
 import datetime
 import os
+import time
+import types
 from unittest.mock import patch
 
 import pkg_resources
 from Poem.api import views_internal as views
 from Poem.api.internal_views.app import get_use_service_titles
+from Poem.helpers.session_helpers import session_payloads
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin.models import WebAPIKey
 from Poem.users.models import CustUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import override_settings
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from django_tenants.utils import get_public_schema_name
 from rest_framework.test import force_authenticate
 
+from .utils_test import assert_num_queries
+
 
 class ListGroupsForUserAPIViewTests(TenantTestCase):
     def setUp(self):
@@ -486,6 +494,154 @@ class GetSessionDetailsAPIViewTests(TenantTestCase):
         )
 
 
+class SessionPayloadCacheTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                }
+            },
+            SESSION_CACHE_TIMEOUT=60
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.tenant.name = "TENANT"
+        self.tenant.save()
+        self.factory = TenantRequestFactory(self.tenant)
+        self.view = views.IsSessionActive.as_view()
+        self.url = "/api/v2/internal/sessionactive/"
+        self.user = CustUser.objects.create(username="testuser")
+        self.userprofile = poem_models.UserProfile.objects.create(
+            user=self.user
+        )
+        self.gm = poem_models.GroupOfMetrics.objects.create(
+            name="GROUP-metrics"
+        )
+        WebAPIKey.objects.create(
+            id=1, name="WEB-API-TENANT", token="mocked_token_rw",
+            prefix="prefix1"
+        )
+        WebAPIKey.objects.create(
+            id=2, name="WEB-API-TENANT-RO", token="mocked_token_ro",
+            prefix="prefix2"
+        )
+        cache.clear()
+        session_payloads.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def _request(self, session_key="session1"):
+        request = self.factory.get(self.url + "true")
+        request.tenant = self.tenant
+        request.session = SessionStore(session_key=session_key)
+        force_authenticate(request, user=self.user)
+        return request
+
+    def _get(self, session_key="session1"):
+        return self.view(self._request(session_key), "true")
+
+    def test_session_payload_cached(self):
+        response1 = self._get()
+        request = self._request()
+        # only WEB-API token is read
+        with assert_num_queries(self, 1):
+            response2 = self.view(request, "true")
+        self.assertEqual(response1.data, response2.data)
+        self.assertEqual(
+            response2.data["userdetails"]["token"], "mocked_token_ro"
+        )
+        self.assertEqual(session_payloads.stats()["hits"], 1)
+        self.assertEqual(session_payloads.stats()["misses"], 1)
+
+    def test_session_payload_not_shared_between_sessions(self):
+        self._get("session1")
+        self._get("session2")
+        self.assertEqual(session_payloads.stats()["hits"], 0)
+        self.assertEqual(session_payloads.stats()["misses"], 2)
+
+    def test_session_payload_not_cached_without_session(self):
+        request = self.factory.get(self.url + "true")
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.user)
+        self.view(request, "true")
+        self.view(request, "true")
+        self.assertEqual(session_payloads.stats()["hits"], 0)
+
+    def test_session_payload_invalidated_on_group_membership(self):
+        response = self._get()
+        self.assertEqual(response.data["userdetails"]["groups"]["metrics"], [])
+        self.userprofile.groupsofmetrics.add(self.gm)
+        response = self._get()
+        self.assertEqual(
+            response.data["userdetails"]["groups"]["metrics"],
+            ["GROUP-metrics"]
+        )
+        self.assertEqual(session_payloads.stats()["hits"], 0)
+
+    def test_session_payload_invalidated_on_user_change(self):
+        self._get()
+        self.user.first_name = "Name"
+        self.user.save()
+        response = self._get()
+        self.assertEqual(response.data["userdetails"]["first_name"], "Name")
+        self.user.last_login = datetime.datetime.now()
+        self.user.save(update_fields=["last_login"])
+        self._get()
+        self.assertEqual(session_payloads.stats()["hits"], 1)
+
+    def test_session_payload_with_changed_webapikey(self):
+        self._get()
+        key = WebAPIKey.objects.get(name="WEB-API-TENANT-RO")
+        key.token = "new_token_ro"
+        key.save()
+        response = self._get()
+        self.assertEqual(response.data["userdetails"]["token"], "new_token_ro")
+        self.assertEqual(session_payloads.stats()["hits"], 1)
+
+    def test_webapi_tokens_not_cached(self):
+        self._get()
+        key = session_payloads._key(
+            types.SimpleNamespace(
+                tenant=self.tenant, user=self.user,
+                session=SessionStore(session_key="session1")
+            ), "true"
+        )
+        entry = cache.get(key)
+        self.assertIsNotNone(entry)
+        self.assertNotIn("mocked_token_ro", str(entry))
+        self.assertNotIn("mocked_token_rw", str(entry))
+
+    @override_settings(SESSION_CACHE_TIMEOUT=0)
+    def test_session_payload_cache_disabled(self):
+        self._get()
+        self._get()
+        self.assertEqual(session_payloads.stats()["hits"], 0)
+        self.assertEqual(session_payloads.stats()["misses"], 0)
+
+    def test_session_payload_benchmark(self):
+        runs = 200
+        requests = [self._request(f"uncached{i}") for i in range(runs)]
+        start = time.perf_counter()
+        for request in requests:
+            self.view(request, "true")
+        uncached = (time.perf_counter() - start) / runs
+
+        self._get()
+        requests = [self._request() for _ in range(runs)]
+        start = time.perf_counter()
+        with assert_num_queries(self, runs):
+            for request in requests:
+                self.view(request, "true")
+        cached = (time.perf_counter() - start) / runs
+
+        # cached session check is a single cache read and a single query of
+        # WEB-API token
+        self.assertLess(cached, uncached)
+
+
 class GetIsTenantSchemaAPIViewTests(TenantTestCase):
     def setUp(self):
         self.factory = TenantRequestFactory(self.tenant)
@@ -0,0 +1,587 @@
+import collections
+import json
+import math
+import os
+import random
+import time
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from Poem.api import views, views_internal
+from Poem.helpers.dataset_helpers import generate_catalogue, \
+    generate_tenant_data
+from Poem.poem import models as poem_models
+from Poem.poem_super_admin import models as admin_models
+from Poem.tenants.models import Tenant
+from Poem.users.models import CustUser
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantRequestFactory
+from django_tenants.utils import get_public_schema_name, schema_context, \
+    get_tenant_domain_model
+from rest_framework import status
+from rest_framework.test import force_authenticate
+
+from .test_views import create_credentials, mock_db_for_metrics_tests, \
+    mock_db_for_metrics_scaling
+from .utils_test import executed_queries, rendered, streamed
+
+
+def _size(name, default):
+    return int(os.environ.get(f"POEM_BENCHMARK_{name}", default))
+
+
+# size of synthetic world, seeded twice (so that benchmarks are run on world
+# of this size and on world twice as large)
+TENANTS = _size("TENANTS", 3)
+TEMPLATES = _size("TEMPLATES", 60)
+VERSIONS = _size("VERSIONS", 3)
+PACKAGES = _size("PACKAGES", 6)
+
+# number of metrics listed by scaling benchmark, compared with 100 metrics
+SCALED = _size("SCALED", 10000)
+
+# number of metric templates listed by streaming memory benchmark, which is
+# only run if set (it needs at least 10000 to exceed several chunks)
+STREAMED = _size("STREAMED", 0)
+
+# if set, measurements are written as JSON to the file with this name
+REPORT = os.environ.get("POEM_BENCHMARK_REPORT", "")
+
+TOKEN = "token"
+USER = "user"
+PUBLIC = "public"
+
+
+Budget = collections.namedtuple(
+    "Budget", ["base", "per_template", "per_package"], defaults=[0, 0]
+)
+
+Endpoint = collections.namedtuple(
+    "Endpoint", ["url", "view", "auth", "budget", "args"], defaults=[()]
+)
+
+
+def seed_world(
+        batch, templates=TEMPLATES, versions=VERSIONS, packages=PACKAGES,
+        tenants=TENANTS
+):
+    """
+    Seeds synthetic world with packages (each with its own YUM repo and
+    probe), metric templates (all of them used as metrics by tenant), and
+    tenants using all the metrics. Objects are named after batch, so that
+    world can be grown by seeding it again with another batch. Returns the
+    seeded metrics.
+    """
+    rng = random.Random(batch)
+    catalogue = generate_catalogue(
+        rng, f"bench{batch}", probes=packages, versions=versions,
+        templates=templates
+    )
+    metrics = generate_tenant_data(
+        rng, f"bench{batch}", catalogue, metrics=templates, groups=2,
+        profiles=2
+    )
+
+    admin_models.DefaultPort.objects.bulk_create([
+        admin_models.DefaultPort(
+            name=f"BENCH{batch}_PORT_{i}", value=str(8000 + i)
+        ) for i in range(3)
+    ])
+    poem_models.MetricConfiguration.objects.bulk_create([
+        poem_models.MetricConfiguration(
+            name=f"bench{batch}-{i}",
+            globalattribute=json.dumps(
+                ["NAGIOS_ACTUAL_HOST_CERT /etc/nagios/globus/hostcert.pem"]
+            ),
+            hostattribute=json.dumps([f"bench{i}.host.name attr1 value"]),
+            metricparameter=json.dumps([
+                f"bench{i}.host.name {metrics[0].name} -r BENCH"
+            ] if metrics else [])
+        ) for i in range(3)
+    ])
+
+    with schema_context(get_public_schema_name()):
+        for i in range(tenants):
+            tenant = Tenant(
+                name=f"BENCH{batch}-{i}", schema_name=f"bench{batch}_{i}"
+            )
+            tenant.auto_create_schema = False
+            tenant.save()
+
+            get_tenant_domain_model().objects.create(
+                domain=f"bench{batch}-{i}.domain.url", tenant=tenant,
+                is_primary=True
+            )
+            admin_models.TenantMetric.objects.bulk_create([
+                admin_models.TenantMetric(
+                    tenant=tenant, metric_id=metric.id, name=metric.name
+                ) for metric in metrics
+            ])
+
+    return metrics
+
+
+def _probeversion():
+    return f"bench0-probe-0(1.{VERSIONS - 1}.0)"
+
+
+# query budgets of views: fixed number of queries, and the number of
+# queries allowed per metric template (i.e. tenant metric) and per package;
+# views whose budget grows with the world are the ones streaming responses
+# in chunks, all others have to be served in a fixed number of queries;
+# search path changes done by django-tenants are not counted
+ENDPOINTS = [
+    Endpoint("/api/v2/metrics", views.ListMetrics, TOKEN, Budget(4)),
+    Endpoint(
+        "/api/v2/metrics?stream=true", views.ListMetrics, TOKEN,
+        Budget(5, per_template=0.01)
+    ),
+    Endpoint(
+        "/api/v2/metrics/internal", views.ListMetrics, TOKEN, Budget(4),
+        ("internal",)
+    ),
+    Endpoint(
+        "/api/v2/metrictemplates", views.ListMetricTemplates, TOKEN,
+        Budget(3)
+    ),
+    Endpoint(
+        "/api/v2/metrictemplates?stream=true", views.ListMetricTemplates,
+        TOKEN, Budget(4, per_template=0.01)
+    ),
+    Endpoint(
+        "/api/v2/metrictemplates/internal", views.ListMetricTemplates, TOKEN,
+        Budget(3), ("internal",)
+    ),
+    Endpoint(
+        "/api/v2/metricoverrides", views.ListMetricOverrides, TOKEN,
+        Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/default_ports", views.ListDefaultPorts, TOKEN, Budget(2)
+    ),
+    Endpoint("/api/v2/probes", views.ProbeCandidateAPI, TOKEN, Budget(2)),
+    Endpoint(
+        "/api/v2/repos/rocky9", views.ListRepos, TOKEN, Budget(5),
+        ("rocky9",)
+    ),
+    Endpoint(
+        "/api/v2/repos_internal/rocky9", views.ListReposInternal, TOKEN,
+        Budget(6), ("rocky9",)
+    ),
+    Endpoint(
+        "/api/v2/internal/metric/", views_internal.ListMetric, USER,
+        Budget(3)
+    ),
+    Endpoint(
+        "/api/v2/internal/metric/bench0.Metric-0", views_internal.ListMetric,
+        USER, Budget(4), ("bench0.Metric-0",)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_metric/", views_internal.ListPublicMetric,
+        PUBLIC, Budget(3)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricsall/", views_internal.ListAllMetrics, USER,
+        Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_metricsall/",
+        views_internal.ListPublicAllMetrics, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/metrictemplates/",
+        views_internal.ListMetricTemplates, USER, Budget(4)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_metrictemplates/",
+        views_internal.ListPublicMetricTemplates, PUBLIC, Budget(4)
+    ),
+    Endpoint(
+        "/api/v2/internal/metrictemplates/bench0.Metric-0",
+        views_internal.ListMetricTemplates, USER, Budget(4),
+        ("bench0.Metric-0",)
+    ),
+    Endpoint(
+        f"/api/v2/internal/metricsforprobes/{_probeversion()}",
+        views_internal.ListMetricTemplatesForProbeVersion, USER, Budget(1),
+        (_probeversion(),)
+    ),
+    Endpoint(
+        f"/api/v2/internal/public_metricsforprobes/{_probeversion()}",
+        views_internal.ListPublicMetricTemplatesForProbeVersion, PUBLIC,
+        Budget(1), (_probeversion(),)
+    ),
+    Endpoint(
+        "/api/v2/internal/availmetrictemplates/",
+        views_internal.ListAvailableMetricTemplates, USER, Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/internal/mttypes/", views_internal.ListMetricTemplateTypes,
+        USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_mttypes/",
+        views_internal.ListPublicMetricTemplateTypes, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/metrictags/", views_internal.ListMetricTags, USER,
+        Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_metrictags/",
+        views_internal.ListPublicMetricTags, PUBLIC, Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/internal/default_ports/", views_internal.ListDefaultPorts,
+        USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_default_ports/",
+        views_internal.ListPublicDefaultPorts, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricconfiguration/",
+        views_internal.ListMetricConfiguration, USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/ostags/", views_internal.ListOSTags, USER,
+        Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_ostags/", views_internal.ListPublicOSTags,
+        PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/packages/", views_internal.ListPackages, USER,
+        Budget(5)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_packages/",
+        views_internal.ListPublicPackages, PUBLIC, Budget(5)
+    ),
+    Endpoint(
+        "/api/v2/internal/probes/", views_internal.ListProbes, USER,
+        Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_probes/", views_internal.ListPublicProbes,
+        PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/probes/bench0-probe-0", views_internal.ListProbes,
+        USER, Budget(2), ("bench0-probe-0",)
+    ),
+    Endpoint(
+        "/api/v2/internal/version/probe/", views_internal.ListVersions, USER,
+        Budget(1), ("probe",)
+    ),
+    Endpoint(
+        "/api/v2/internal/version/probe/bench0-probe-0",
+        views_internal.ListVersions, USER, Budget(2),
+        ("probe", "bench0-probe-0")
+    ),
+    Endpoint(
+        "/api/v2/internal/version/metrictemplate/",
+        views_internal.ListVersions, USER, Budget(2), ("metrictemplate",)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_version/metrictemplate/",
+        views_internal.ListPublicVersions, PUBLIC, Budget(2),
+        ("metrictemplate",)
+    ),
+    Endpoint(
+        "/api/v2/internal/version/metrictemplate/bench0.Metric-0",
+        views_internal.ListVersions, USER, Budget(3),
+        ("metrictemplate", "bench0.Metric-0")
+    ),
+    Endpoint(
+        "/api/v2/internal/yumrepos/", views_internal.ListYumRepos, USER,
+        Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/tenants/", views_internal.ListTenants, USER,
+        Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_tenants/", views_internal.ListPublicTenants,
+        PUBLIC, Budget(2)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricprofiles/", views_internal.ListMetricProfiles,
+        USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_metricprofiles/",
+        views_internal.ListPublicMetricProfiles, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricprofiles/BENCH0_PROFILE_0",
+        views_internal.ListMetricProfiles, USER, Budget(1),
+        ("BENCH0_PROFILE_0",)
+    ),
+    Endpoint(
+        "/api/v2/internal/aggregations/", views_internal.ListAggregations,
+        USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_aggregations/",
+        views_internal.ListPublicAggregations, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/thresholdsprofiles/",
+        views_internal.ListThresholdsProfiles, USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_thresholdsprofiles/",
+        views_internal.ListPublicThresholdsProfiles, PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/reports/", views_internal.ListReports, USER,
+        Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_reports/", views_internal.ListPublicReports,
+        PUBLIC, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricsgroup/BENCH0-0",
+        views_internal.ListMetricsInGroup, USER, Budget(2), ("BENCH0-0",)
+    ),
+    Endpoint(
+        "/api/v2/internal/metricprofilesgroup/BENCH0-0",
+        views_internal.ListMetricProfilesInGroup, USER, Budget(1),
+        ("BENCH0-0",)
+    ),
+    Endpoint(
+        "/api/v2/internal/tenantversion/metric/bench0.Metric-0",
+        views_internal.ListTenantVersions, USER, Budget(2),
+        ("metric", "bench0.Metric-0")
+    ),
+    Endpoint(
+        "/api/v2/internal/users/", views_internal.ListUsers, USER, Budget(1)
+    ),
+    Endpoint(
+        "/api/v2/internal/userprofile/poem",
+        views_internal.GetUserprofileForUsername, USER, Budget(2), ("poem",)
+    ),
+    Endpoint(
+        "/api/v2/internal/usergroups/", views_internal.ListGroupsForGivenUser,
+        USER, Budget(5)
+    ),
+    Endpoint(
+        "/api/v2/internal/public_usergroups/",
+        views_internal.ListPublicGroupsForGivenUser, PUBLIC, Budget(5)
+    )
+]
+
+
+def mock_tenants_resources(schemas):
+    return dict(
+        (schema, {"metrics": 0, "metric_templates": 0, "probes": 0})
+        for schema in schemas
+    )
+
+
+@patch("Poem.api.internal_views.utils._reconcile_webapi")
+@patch("Poem.api.internal_views.tenants.get_tenants_resources")
+@patch("Poem.api.views.get_metrics_from_profile")
+@patch("Poem.api.internal_views.metrics.get_metrics_in_profiles")
+class APIBenchmarkTests(TenantTestCase):
+    """
+    Measures the number of queries, wall time and peak memory of API views
+    on synthetic world, and on world twice as large, failing if any of the
+    views exceeds its query budget. Caches are disabled, so that the cost of
+    building responses is measured. WEB-API is not called, and tenants are
+    created without schemas.
+    """
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.factory = TenantRequestFactory(self.tenant)
+        self.token = create_credentials()
+        self.superuser = CustUser.objects.create_user(
+            username="poem", is_superuser=True
+        )
+        poem_models.UserProfile.objects.create(user=self.superuser)
+        self.metrics = seed_world(0)
+        self.world = {"templates": TEMPLATES, "packages": PACKAGES}
+
+    def _request(self, endpoint):
+        if endpoint.auth == TOKEN:
+            request = self.factory.get(
+                endpoint.url, **{"HTTP_X_API_KEY": self.token,
+                                 "HTTP_PROFILES": "[BENCH]"}
+            )
+
+        else:
+            request = self.factory.get(endpoint.url)
+            if endpoint.auth == USER:
+                force_authenticate(request, user=self.superuser)
+
+        request.tenant = self.tenant
+
+        return request
+
+    def _call(self, endpoint, request):
+        response = endpoint.view.as_view()(request, *endpoint.args)
+        if response.streaming:
+            content = streamed(response)
+
+        else:
+            content = rendered(response)
+
+        return response, content
+
+    def _measure(self, endpoint):
+        # the first call is not measured, it only warms up the view
+        response, content = self._call(endpoint, self._request(endpoint))
+        self.assertEqual(
+            response.status_code, status.HTTP_200_OK, endpoint.url
+        )
+
+        # requests are built before measuring, so that only queries issued
+        # by views are counted
+        request = self._request(endpoint)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            self._call(endpoint, request)
+            elapsed = time.perf_counter() - start
+
+        request = self._request(endpoint)
+        tracemalloc.start()
+        try:
+            self._call(endpoint, request)
+            peak = tracemalloc.get_traced_memory()[1]
+
+        finally:
+            tracemalloc.stop()
+
+        budget = endpoint.budget
+        return {
+            "queries": len(executed_queries(queries)),
+            "budget": math.floor(
+                budget.base +
+                budget.per_template * self.world["templates"] +
+                budget.per_package * self.world["packages"]
+            ),
+            "time_ms": round(elapsed * 1000, 3),
+            "peak_kib": round(peak / 1024, 1),
+            "size": len(content)
+        }
+
+    def _measure_all(self):
+        return dict(
+            (endpoint.url, self._measure(endpoint)) for endpoint in ENDPOINTS
+        )
+
+    def test_query_budgets(
+            self, mock_profiles4metrics, mock_profile_metrics, mock_resources,
+            mock_sync
+    ):
+        mock_profiles4metrics.return_value = {}
+        mock_profile_metrics.side_effect = \
+            lambda profile, tenant: set(m.name for m in self.metrics)
+        mock_resources.side_effect = mock_tenants_resources
+
+        report = {"world": [dict(self.world, versions=VERSIONS)]}
+        measurements = [self._measure_all()]
+
+        self.metrics += seed_world(1)
+        self.world = {"templates": 2 * TEMPLATES, "packages": 2 * PACKAGES}
+        report["world"].append(dict(self.world, versions=VERSIONS))
+        measurements.append(self._measure_all())
+
+        report["endpoints"] = dict(
+            (url, [measurement[url] for measurement in measurements])
+            for url in measurements[0]
+        )
+
+        if REPORT:
+            with open(REPORT, "w") as f:
+                json.dump(report, f, indent=2)
+
+        for url, results in report["endpoints"].items():
+            for world, result in zip(report["world"], results):
+                with self.subTest(url=url, world=world):
+                    self.assertLessEqual(
+                        result["queries"], result["budget"],
+                        f"{url} exceeds its query budget"
+                    )
+
+
+class ScalingBenchmarkTests(TenantTestCase):
+    """
+    Checks that number of queries of listing metrics does not grow with the
+    number of metrics. Number of metrics in larger world is set with
+    POEM_BENCHMARK_SCALED environment variable.
+    """
+    def setUp(self):
+        self.token = create_credentials()
+        self.view = views.ListMetrics.as_view()
+        self.factory = TenantRequestFactory(self.tenant)
+        self.url = "/api/v2/metrics"
+
+        mock_db_for_metrics_tests()
+
+    def _count_queries(self):
+        request = self.factory.get(self.url, **{"HTTP_X_API_KEY": self.token})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request)
+        return len(executed_queries(queries)), len(response.data)
+
+    def test_list_metrics_number_of_queries_does_not_depend_on_metrics(self):
+        mock_db_for_metrics_scaling(0, 100)
+        n_queries1, n_metrics1 = self._count_queries()
+        mock_db_for_metrics_scaling(100, SCALED)
+        n_queries2, n_metrics2 = self._count_queries()
+        self.assertEqual(n_metrics1, 105)
+        self.assertEqual(n_metrics2, SCALED + 5)
+        self.assertEqual(n_queries1, n_queries2)
+
+
+@unittest.skipUnless(STREAMED, "POEM_BENCHMARK_STREAMED is not set")
+class StreamingBenchmarkTests(TenantTestCase):
+    """
+    Compares peak memory of listing metric templates with and without
+    streaming. Number of listed metric templates is set with
+    POEM_BENCHMARK_STREAMED environment variable.
+    """
+    def setUp(self):
+        self.token = create_credentials()
+        self.view = views.ListMetricTemplates.as_view()
+        self.factory = TenantRequestFactory(self.tenant)
+        self.url = "/api/v2/metrictemplates"
+
+        mock_db_for_metrics_tests()
+
+    def _peak_memory(self, url, consume):
+        request = self.factory.get(url, **{"HTTP_X_API_KEY": self.token})
+        tracemalloc.start()
+        try:
+            content = consume(self.view(request))
+            return tracemalloc.get_traced_memory()[1], content
+
+        finally:
+            tracemalloc.stop()
+
+    def test_list_metric_templates_streaming_memory(self):
+        mock_db_for_metrics_scaling(0, STREAMED)
+        peak, content = self._peak_memory(self.url, rendered)
+        streaming_peak, streaming_content = self._peak_memory(
+            self.url + "?stream=true", streamed
+        )
+        self.assertEqual(len(json.loads(content)), STREAMED + 5)
+        self.assertEqual(streaming_content, content)
+        # joined content is kept by the test, the rest is bounded by chunk
+        self.assertLess(streaming_peak, peak / 2)
@@ -0,0 +1,95 @@
+from Poem.api import views_internal as views
+from Poem.helpers.catalogue_helpers import catalogue_cache
+from Poem.tenants.models import Tenant
+from Poem.users.models import CustUser
+from django.core.cache import cache
+from django.test import override_settings
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantRequestFactory
+from django_tenants.utils import schema_context, get_public_schema_name, \
+    get_tenant_domain_model
+from rest_framework import status
+from rest_framework.test import force_authenticate
+
+
+class GetCacheStatsAPIViewTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.factory = TenantRequestFactory(self.tenant)
+        self.view = views.GetCacheStats.as_view()
+        self.url = "/api/v2/internal/cachestats/"
+
+        self.tenant_superuser = CustUser.objects.create_user(
+            username="tenant_poem", is_superuser=True
+        )
+
+        with schema_context(get_public_schema_name()):
+            self.super_tenant = Tenant.objects.create(
+                name="public", schema_name=get_public_schema_name()
+            )
+            get_tenant_domain_model().objects.create(
+                domain="public", tenant=self.super_tenant, is_primary=True
+            )
+            self.superuser = CustUser.objects.create_user(
+                username="poem", is_superuser=True
+            )
+            self.user = CustUser.objects.create_user(username="admin_user")
+
+        cache.clear()
+        catalogue_cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def _get(self, user, tenant):
+        request = self.factory.get(self.url)
+        request.tenant = tenant
+        force_authenticate(request, user=user)
+        return self.view(request)
+
+    def test_get_cache_stats_sp_superuser(self):
+        catalogue_cache.get("key", lambda: "data")
+        catalogue_cache.get("key", lambda: "data")
+        response = self._get(self.superuser, self.super_tenant)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(response.data.keys()), [
+                "apikeys", "catalogue", "datafeeds", "domains", "saml",
+                "sessions", "webapi", "webapi_latency"
+            ]
+        )
+        self.assertEqual(response.data["catalogue"]["hits"], 1)
+        self.assertEqual(response.data["catalogue"]["misses"], 1)
+        self.assertEqual(response.data["catalogue"]["hit_rate"], 0.5)
+        self.assertEqual(response.data["catalogue"]["entries"], 1)
+        for name in [
+            "apikeys", "catalogue", "datafeeds", "domains", "saml",
+            "sessions", "webapi"
+        ]:
+            self.assertIn("hits", response.data[name])
+            self.assertIn("misses", response.data[name])
+            self.assertIn("hit_rate", response.data[name])
+
+    def test_get_cache_stats_sp_user(self):
+        response = self._get(self.user, self.super_tenant)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            response.data["detail"],
+            "You do not have permission to view cache statistics."
+        )
+
+    def test_get_cache_stats_tenant_superuser(self):
+        response = self._get(self.tenant_superuser, self.tenant)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            response.data["detail"],
+            "You do not have permission to view cache statistics."
+        )
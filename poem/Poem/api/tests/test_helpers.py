@@ -1,15 +1,34 @@
 import datetime
+import io
 import json
+import os
+import random
+import tempfile
+import threading
+import time
+import types
+import unittest
+from configparser import NoSectionError, NoOptionError
 from unittest.mock import patch, call
 
 import factory
 import requests
+from Poem.helpers.cache_helpers import bump_generation
+from Poem.helpers.config_helpers import config_registry, poem_config, \
+    reload_poem_config, config_reloaded
+from Poem.helpers.dataset_helpers import generate_catalogue, \
+    generate_tenant_data
 from Poem.helpers.history_helpers import create_comment, update_comment, \
     serialize_metric
+from Poem.helpers import metrics_helpers
 from Poem.helpers.metrics_helpers import import_metrics, update_metrics, \
     update_metrics_in_profiles, get_metrics_in_profiles, \
-    delete_metrics_from_profile, update_metric_in_schema, sync_metrics
-from Poem.helpers.tenant_helpers import CombinedTenant
+    delete_metrics_from_profile, update_metric_in_schema, sync_metrics, \
+    get_probes_for_metrics, get_metric_templates
+from Poem.helpers.saml_helpers import SPConfigCache, sp_configs
+from Poem.helpers.tenant_helpers import CombinedTenant, data_feeds
+from Poem.helpers.webapi_helpers import get_webapi_data, \
+    invalidate_webapi_cache, webapi_cache, webapi_fan_out, WebApiSession
 from Poem.helpers.versioned_comments import new_comment
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
@@ -19,19 +38,23 @@ from Poem.users.models import CustUser
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core import serializers
-from django.core.management import call_command
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
 from django.db import connection
 from django.db.models.signals import pre_save
+from django.test import override_settings, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
 from django.test.testcases import TransactionTestCase
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.utils import get_tenant_model, get_public_schema_name, \
     schema_context, get_tenant_domain_model
 
-from .utils_test import mocked_func, mocked_web_api_metric_profile, \
+from .utils_test import MockResponse, StubWebApiServer, mocked_func, \
+    mocked_web_api_metric_profile, \
     mocked_web_api_metric_profile_put, mocked_web_api_metric_profiles, \
     mocked_web_api_metric_profiles_empty, \
     mocked_web_api_metric_profiles_wrong_token, mocked_web_api_data_feed, \
-    mocked_web_api_data_feed_wrong_token
+    mocked_web_api_data_feed_wrong_token, assert_num_queries
 
 ALLOWED_TEST_DOMAIN = '.test.com'
 
@@ -2037,6 +2060,48 @@ class HistoryHelpersTests(TenantTestCase):
         self.assertEqual(comment, 'Initial version.')
 
 
+def mock_db_for_import_scaling(start, stop):
+    active = admin_models.MetricTemplateType.objects.get(name="Active")
+    passive = admin_models.MetricTemplateType.objects.get(name="Passive")
+    probekey = admin_models.ProbeHistory.objects.get(
+        name="ams-probe", package__version="0.1.8"
+    )
+    tag = admin_models.MetricTags.objects.get(name="test_tag1")
+
+    mts = admin_models.MetricTemplate.objects.bulk_create([
+        admin_models.MetricTemplate(
+            name=f"test.Import-{i}",
+            mtype=active if i % 2 == 0 else passive,
+            probekey=probekey if i % 2 == 0 else None,
+            probeexecutable='["ams-probe"]' if i % 2 == 0 else "",
+            config='["maxCheckAttempts 3", "timeout 60"]' if i % 2 == 0
+            else ""
+        ) for i in range(start, stop)
+    ])
+    mts = admin_models.MetricTemplate.objects.filter(
+        name__in=[mt.name for mt in mts]
+    )
+    admin_models.MetricTemplate.tags.through.objects.bulk_create([
+        admin_models.MetricTemplate.tags.through(
+            metrictemplate_id=mt.id, metrictags_id=tag.id
+        ) for mt in mts
+    ])
+    admin_models.MetricTemplateHistory.objects.bulk_create([
+        admin_models.MetricTemplateHistory(
+            object_id=mt,
+            name=mt.name,
+            mtype=mt.mtype,
+            probekey=mt.probekey,
+            probeexecutable=mt.probeexecutable,
+            config=mt.config,
+            version_user="poem",
+            version_comment="Initial version."
+        ) for mt in mts
+    ])
+
+    return [f"test.Import-{i}" for i in range(start, stop)]
+
+
 class ImportMetricsTests(TransactionTestCase):
     """
     Using TransactionTestCase because of handling of IntegrityError. The extra
@@ -2564,6 +2629,106 @@ class ImportMetricsTests(TransactionTestCase):
         )
 
 
+    def test_import_metrics_number_of_queries_does_not_depend_on_metrics(
+            self
+    ):
+        def import_and_count_queries(start, stop):
+            names = mock_db_for_import_scaling(start, stop)
+            with CaptureQueriesContext(connection) as context:
+                success, warning, error, unavailable = import_metrics(
+                    names, self.tenant, self.user
+                )
+            self.assertEqual(success, names)
+            self.assertEqual(warning, [])
+            self.assertEqual(error, [])
+            self.assertEqual(unavailable, [])
+            return len(context.captured_queries)
+
+        n_queries1 = import_and_count_queries(0, 10)
+        n_queries2 = import_and_count_queries(10, 1010)
+        self.assertEqual(n_queries1, n_queries2)
+        self.assertEqual(poem_models.Metric.objects.all().count(), 1016)
+        self.assertEqual(
+            poem_models.TenantHistory.objects.filter(
+                object_repr__startswith="test.Import-"
+            ).count(), 1010
+        )
+        metric1 = poem_models.Metric.objects.get(name="test.Import-500")
+        self.assertEqual(metric1.probeversion, "ams-probe (0.1.8)")
+        self.assertEqual(metric1.probe_name, "ams-probe")
+        self.assertEqual(metric1.package_version, "0.1.8")
+        self.assertEqual(metric1.group, self.group)
+        metric2 = poem_models.Metric.objects.get(name="test.Import-501")
+        self.assertIsNone(metric2.probeversion)
+        self.assertEqual(metric2.config, "")
+        history = poem_models.TenantHistory.objects.get(
+            object_id=metric1.id, content_type=self.ct
+        )
+        self.assertEqual(history.comment, "Initial version.")
+        self.assertEqual(history.user, "testuser")
+        serialized_data = json.loads(history.serialized_data)[0]["fields"]
+        self.assertEqual(serialized_data["tags"], [["test_tag1"]])
+        self.assertEqual(serialized_data["mtype"], ["Active"])
+        self.assertEqual(serialized_data["probekey"], ["ams-probe", "0.1.8"])
+
+    def test_import_same_metric_twice(self):
+        success, warning, error, unavailable = import_metrics(
+            ["eu.egi.cloud.OpenStack-VM", "eu.egi.cloud.OpenStack-VM"],
+            self.tenant, self.user
+        )
+        self.assertEqual(success, ["eu.egi.cloud.OpenStack-VM"])
+        self.assertEqual(warning, [])
+        self.assertEqual(error, ["eu.egi.cloud.OpenStack-VM"])
+        self.assertEqual(unavailable, [])
+        self.assertEqual(poem_models.Metric.objects.all().count(), 7)
+
+    def test_import_metrics_created_in_the_meantime(self):
+        create = metrics_helpers._create_imported_metrics
+
+        def create_after_other_request(new_metrics, user):
+            if len(new_metrics) > 1:
+                # other request creates one of the metrics in the meantime
+                poem_models.Metric.objects.create(
+                    name="org.nagios.CertLifetime2", group=self.group
+                )
+
+            create(new_metrics, user)
+
+        with patch(
+            "Poem.helpers.metrics_helpers._create_imported_metrics",
+            side_effect=create_after_other_request
+        ):
+            success, warning, error, unavailable = import_metrics(
+                [
+                    "eu.egi.cloud.OpenStack-VM", "org.nagios.CertLifetime2",
+                    "argo.AMS-Check", "eu.egi.sec.ARC-CE-result"
+                ], self.tenant, self.user
+            )
+        self.assertEqual(
+            success, ["eu.egi.cloud.OpenStack-VM", "eu.egi.sec.ARC-CE-result"]
+        )
+        self.assertEqual(warning, [])
+        self.assertEqual(
+            error, ["org.nagios.CertLifetime2", "argo.AMS-Check"]
+        )
+        self.assertEqual(unavailable, [])
+        self.assertEqual(poem_models.Metric.objects.all().count(), 9)
+        for name in ["eu.egi.cloud.OpenStack-VM", "eu.egi.sec.ARC-CE-result"]:
+            metric = poem_models.Metric.objects.get(name=name)
+            self.assertEqual(
+                poem_models.TenantHistory.objects.filter(
+                    object_id=metric.id, content_type=self.ct
+                ).count(), 1
+            )
+        self.assertFalse(
+            poem_models.TenantHistory.objects.filter(
+                object_id=poem_models.Metric.objects.get(
+                    name="org.nagios.CertLifetime2"
+                ).id, content_type=self.ct
+            ).exists()
+        )
+
+
 class UpdateMetricsTests(TenantTestCase):
     def setUp(self):
         self.tenant.name = 'TEST'
@@ -3154,8 +3319,8 @@ class MetricsInProfilesTests(TenantTestCase):
                 domain='public', tenant=tenant, is_primary=True
             )
 
-    @patch('Poem.helpers.metrics_helpers.requests.put')
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.put')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_update_metrics_in_profiles(self, mock_key, mock_get, mock_put):
         with self.settings(WEBAPI_METRIC='https://mock.api.url'):
@@ -3194,7 +3359,7 @@ class MetricsInProfilesTests(TenantTestCase):
             )
             self.assertEqual(msgs, [])
 
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_update_metrics_in_profiles_wrong_token(self, mock_key, mock_get):
         with self.settings(WEBAPI_METRIC='https://mock.api.url'):
@@ -3223,8 +3388,8 @@ class MetricsInProfilesTests(TenantTestCase):
                 ]
             )
 
-    @patch('Poem.helpers.metrics_helpers.requests.put')
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.put')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_update_metrics_in_profiles_if_response_empty(
             self, mock_key, mock_get, mock_put
@@ -3238,8 +3403,8 @@ class MetricsInProfilesTests(TenantTestCase):
             self.assertEqual(msgs, [])
             self.assertFalse(mock_put.called)
 
-    @patch('Poem.helpers.metrics_helpers.requests.put')
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.put')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_update_metrics_in_profiles_if_same_name(
             self, mock_key, mock_get, mock_put
@@ -3253,7 +3418,7 @@ class MetricsInProfilesTests(TenantTestCase):
             self.assertEqual(msgs, [])
             self.assertFalse(mock_put.called)
 
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_get_metrics_in_profiles(self, mock_key, mock_get):
         with self.settings(WEBAPI_METRIC='https://mock.api.url'):
@@ -3280,7 +3445,7 @@ class MetricsInProfilesTests(TenantTestCase):
                 }
             )
 
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_get_metrics_in_profiles_wrong_token(self, mock_key, mock_get):
         with self.settings(WEBAPI_METRIC='https://mock.api.url'):
@@ -3303,7 +3468,7 @@ class MetricsInProfilesTests(TenantTestCase):
                 'Error fetching WEB API data: API key not found.'
             )
 
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
     def test_get_metrics_in_profiles_if_response_empty(
             self, mock_key, mock_get
@@ -3321,8 +3486,8 @@ class MetricsInProfilesTests(TenantTestCase):
             )
             self.assertEqual(metrics, {})
 
-    @patch('Poem.helpers.metrics_helpers.requests.put')
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.put')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.poem_models.MetricProfiles.objects.'
            'get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
@@ -3368,7 +3533,7 @@ class MetricsInProfilesTests(TenantTestCase):
                 data=json.dumps(data)
             )
 
-    @patch('Poem.helpers.metrics_helpers.requests.get')
+    @patch('Poem.helpers.metrics_helpers.webapi.get')
     @patch('Poem.helpers.metrics_helpers.poem_models.MetricProfiles.objects.'
            'get')
     @patch('Poem.helpers.metrics_helpers.WebAPIKey.objects.get')
@@ -3644,6 +3809,97 @@ class SyncMetricsTests(TenantTestCase):
         )
 
 
+class MetricProbesTests(TenantTestCase):
+    def setUp(self):
+        mock_db(self.tenant)
+
+    def test_metric_probe_fields(self):
+        metric1 = poem_models.Metric.objects.get(name="argo.AMS-Check")
+        metric2 = poem_models.Metric.objects.get(name="org.apel.APEL-Pub")
+        self.assertEqual(metric1.probe_name, "ams-probe")
+        self.assertEqual(metric1.package_version, "0.1.8")
+        self.assertIsNone(metric2.probe_name)
+        self.assertIsNone(metric2.package_version)
+        metric1.probeversion = "ams-probe (0.1.11)"
+        metric1.save()
+        metric1 = poem_models.Metric.objects.get(name="argo.AMS-Check")
+        self.assertEqual(metric1.probe_name, "ams-probe")
+        self.assertEqual(metric1.package_version, "0.1.11")
+        metric1.probeversion = None
+        metric1.save()
+        metric1 = poem_models.Metric.objects.get(name="argo.AMS-Check")
+        self.assertIsNone(metric1.probe_name)
+        self.assertIsNone(metric1.package_version)
+
+    def test_metric_probe_fields_loaded_from_fixture(self):
+        # fixture dumped before the fields were added does not have them
+        fixture = [
+            {
+                "model": "poem.metric",
+                "pk": 1000,
+                "fields": {
+                    "name": "argo.AMS-Check-Fixture",
+                    "probeversion": "ams-probe (0.1.11)",
+                    "group": None,
+                    "config": ""
+                }
+            },
+            {
+                "model": "poem.metric",
+                "pk": 1001,
+                "fields": {
+                    "name": "org.apel.APEL-Pub-Fixture",
+                    "probeversion": "",
+                    "group": None,
+                    "config": ""
+                }
+            }
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.json")
+            with open(path, "w") as f:
+                json.dump(fixture, f)
+
+            call_command("loaddata", path, verbosity=0)
+
+        metric1 = poem_models.Metric.objects.get(pk=1000)
+        metric2 = poem_models.Metric.objects.get(pk=1001)
+        self.assertEqual(metric1.probe_name, "ams-probe")
+        self.assertEqual(metric1.package_version, "0.1.11")
+        self.assertIsNone(metric2.probe_name)
+        self.assertIsNone(metric2.package_version)
+        probes = get_probes_for_metrics([metric1])
+        self.assertEqual(
+            probes[("ams-probe", "0.1.11")].package.version, "0.1.11"
+        )
+
+    def test_get_probes_for_metrics(self):
+        metrics = poem_models.Metric.objects.all()
+        with assert_num_queries(self, 2):
+            probes = get_probes_for_metrics(metrics)
+        self.assertEqual(
+            sorted(probes.keys()), sorted([
+                (metric.probe_name, metric.package_version)
+                for metric in metrics if metric.probeversion
+            ])
+        )
+        for key, probe in probes.items():
+            self.assertEqual(probe.name, key[0])
+            self.assertEqual(probe.package.version, key[1])
+
+    def test_metric_templates_of_metrics_updated_in_bulk(self):
+        # bulk updates bypass save(), probe fields are not set then
+        poem_models.Metric.objects.filter(name="argo.AMS-Check").update(
+            probe_name=None, package_version=None
+        )
+        metric = poem_models.Metric.objects.get(name="argo.AMS-Check")
+        mts = get_metric_templates([metric])
+        self.assertEqual(mts["argo.AMS-Check"].probekey.name, "ams-probe")
+        self.assertEqual(
+            mts["argo.AMS-Check"].probekey.package.version, "0.1.8"
+        )
+
+
 class CommentsTests(TenantTestCase):
     def test_new_comment_with_objects_change(self):
         comment = '[{"changed": {"fields": ["config"], ' \
@@ -3740,7 +3996,7 @@ class CombinedTenantTests(TenantTestCase):
         self.tenant.save()
         self.combined_tenant = CombinedTenant(self.tenant)
 
-    @patch("Poem.helpers.tenant_helpers.requests.get")
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
     @patch("Poem.helpers.tenant_helpers.WebAPIKey.objects.get")
     def test_get_combined_tenants(self, mock_key, mock_get):
         with self.settings(WEBAPI_DATAFEEDS="https://mock.api.url/feeds/data"):
@@ -3756,7 +4012,7 @@ class CombinedTenantTests(TenantTestCase):
             )
             self.assertEqual(tenants, ["TENANT_X", "TENANT_Y"])
 
-    @patch("Poem.helpers.tenant_helpers.requests.get")
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
     @patch("Poem.helpers.tenant_helpers.WebAPIKey.objects.get")
     def test_get_combined_tenants_webapi_exception(self, mock_key, mock_get):
         with self.settings(WEBAPI_DATAFEEDS="https://mock.api.url/feeds/data"):
@@ -3772,10 +4028,886 @@ class CombinedTenantTests(TenantTestCase):
             )
             self.assertEqual(tenants, [])
 
-    @patch("Poem.helpers.tenant_helpers.requests.get")
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
     def test_get_combined_tenants_key_doesnotexist(self, mock_get):
         with self.settings(WEBAPI_DATAFEEDS="https://mock.api.url/feeds/data"):
             mock_get.side_effect = mocked_web_api_data_feed_wrong_token
             tenants = self.combined_tenant.tenants()
             self.assertFalse(mock_get.called)
             self.assertEqual(tenants, [])
+
+
+class DataFeedResolverTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(
+            WEBAPI_DATAFEEDS="https://mock.api.url/feeds/data",
+            WEBAPI_DATAFEEDS_CACHE_TIMEOUT=60
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.tenant.name = "TENANT"
+        self.tenant.save()
+        self.combined_tenant = CombinedTenant(self.tenant)
+        data_feeds.clear()
+
+    def tearDown(self):
+        data_feeds.clear()
+
+    def _expire(self):
+        with data_feeds._lock:
+            data_feeds._entries["TENANT"]["timestamp"] -= 120
+
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
+    @patch("Poem.helpers.tenant_helpers.WebAPIKey.objects.get")
+    def test_data_feed_cached(self, mock_key, mock_get):
+        mock_key.return_value = WebAPIKey(name="WEB-API-TENANT", token="t0k3n")
+        mock_get.side_effect = mocked_web_api_data_feed
+        stats = data_feeds.stats()
+        tenants1 = self.combined_tenant.tenants()
+        tenants1.append("TENANT_Z")
+        tenants2 = CombinedTenant(self.tenant).tenants()
+        self.assertEqual(tenants2, ["TENANT_X", "TENANT_Y"])
+        mock_get.assert_called_once()
+        self.assertEqual(data_feeds.stats()["hits"], stats["hits"] + 1)
+        self.assertEqual(data_feeds.stats()["misses"], stats["misses"] + 1)
+
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
+    @patch("Poem.helpers.tenant_helpers.WebAPIKey.objects.get")
+    def test_stale_data_feed_refreshed_in_background(self, mock_key, mock_get):
+        mock_key.return_value = WebAPIKey(name="WEB-API-TENANT", token="t0k3n")
+        mock_get.side_effect = mocked_web_api_data_feed
+        self.combined_tenant.tenants()
+        self._expire()
+        refreshed = threading.Event()
+
+        def slow_data_feed(*args, **kwargs):
+            refreshed.wait(5)
+            return MockResponse(
+                {"data": [{"tenants": ["TENANT_X", "TENANT_Z"]}]}, 200
+            )
+
+        mock_get.side_effect = slow_data_feed
+        threads = []
+        refresh_in_background = data_feeds._refresh_in_background
+        with patch.object(
+                data_feeds, "_refresh_in_background",
+                side_effect=lambda combined_tenant: threads.append(
+                    refresh_in_background(combined_tenant)
+                )
+        ):
+            start = time.monotonic()
+            tenants = self.combined_tenant.tenants()
+            self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(tenants, ["TENANT_X", "TENANT_Y"])
+        self.assertEqual(len(threads), 1)
+        refreshed.set()
+        threads[0].join(5)
+        self.assertFalse(threads[0].is_alive())
+        self.assertEqual(
+            self.combined_tenant.tenants(), ["TENANT_X", "TENANT_Z"]
+        )
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
+    @patch("Poem.helpers.tenant_helpers.WebAPIKey.objects.get")
+    def test_stale_data_feed_kept_on_error(self, mock_key, mock_get):
+        mock_key.return_value = WebAPIKey(name="WEB-API-TENANT", token="t0k3n")
+        mock_get.side_effect = mocked_web_api_data_feed
+        self.combined_tenant.tenants()
+        self._expire()
+        mock_get.side_effect = mocked_web_api_data_feed_wrong_token
+        with patch.object(
+                data_feeds, "_refresh_in_background",
+                side_effect=data_feeds._refresh
+        ):
+            self.assertEqual(
+                self.combined_tenant.tenants(), ["TENANT_X", "TENANT_Y"]
+            )
+            self.assertEqual(
+                self.combined_tenant.tenants(), ["TENANT_X", "TENANT_Y"]
+            )
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(data_feeds.stats()["failures"]["TENANT"]["count"], 2)
+        self.assertTrue(
+            "401" in data_feeds.stats()["failures"]["TENANT"]["last_error"]
+        )
+
+    @patch("Poem.helpers.tenant_helpers.webapi.get")
+    def test_failure_counted_without_data_feed(self, mock_get):
+        self.assertEqual(self.combined_tenant.tenants(), [])
+        self.assertFalse(mock_get.called)
+        self.assertEqual(data_feeds.stats()["failures"]["TENANT"]["count"], 1)
+        self.assertEqual(data_feeds.stats()["entries"], 0)
+
+
+class WebApiCacheTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        invalidate_webapi_cache()
+        self.headers = {"Accept": "application/json", "x-api-key": "mocked"}
+
+    def tearDown(self):
+        invalidate_webapi_cache()
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=0)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_get_data_if_cache_disabled(self, mock_get):
+        mock_get.side_effect = mocked_web_api_metric_profiles
+        data1 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        data2 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(data1, data2)
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            settings.WEBAPI_METRIC, headers=self.headers, timeout=180
+        )
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_get_data_from_cache(self, mock_get):
+        mock_get.side_effect = mocked_web_api_metric_profiles
+        stats = webapi_cache.stats()
+        data1 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        data2 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(data1, data2)
+        self.assertEqual(
+            data1, mocked_web_api_metric_profiles().json()["data"]
+        )
+        mock_get.assert_called_once_with(
+            settings.WEBAPI_METRIC, headers=self.headers, timeout=180
+        )
+        new_stats = webapi_cache.stats()
+        self.assertEqual(new_stats["hits"] - stats["hits"], 1)
+        self.assertEqual(new_stats["misses"] - stats["misses"], 1)
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_cached_data_is_not_changed_by_caller(self, mock_get):
+        mock_get.side_effect = mocked_web_api_metric_profiles
+        data1 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        data1[0]["services"] = []
+        data2 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(
+            data2, mocked_web_api_metric_profiles().json()["data"]
+        )
+        self.assertEqual(mock_get.call_count, 1)
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_cache_is_kept_per_tenant(self, mock_get):
+        mock_get.side_effect = mocked_web_api_metric_profiles
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST2", "mocked")
+        self.assertEqual(mock_get.call_count, 2)
+        invalidate_webapi_cache("TEST")
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST2", "mocked")
+        self.assertEqual(mock_get.call_count, 3)
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_revalidate_data_changed_by_other_process(self, mock_get):
+        data = mocked_web_api_metric_profiles().json()
+        mock_get.side_effect = [
+            MockResponse(data, 200, headers={"ETag": '"abc"'}),
+            MockResponse("", 304)
+        ]
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        # other process changed profiles of the tenant
+        bump_generation("webapi-TEST")
+        data2 = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(data2, data["data"])
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            settings.WEBAPI_METRIC,
+            headers={**self.headers, "If-None-Match": '"abc"'}, timeout=180
+        )
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_get_data_if_error(self, mock_get):
+        mock_get.side_effect = mocked_web_api_metric_profiles_wrong_token
+        with self.assertRaises(requests.exceptions.HTTPError):
+            get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        mock_get.side_effect = mocked_web_api_metric_profiles
+        data = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(data, mocked_web_api_metric_profiles().json()["data"])
+        self.assertEqual(mock_get.call_count, 2)
+
+    @override_settings(WEBAPI_CACHE_TIMEOUT=60)
+    @patch("Poem.helpers.webapi_helpers.webapi.get")
+    def test_revalidate_expired_data_with_etag(self, mock_get):
+        data = mocked_web_api_metric_profiles().json()
+        mock_get.side_effect = [
+            MockResponse(data, 200, headers={"ETag": '"abc"'}),
+            MockResponse("", 304)
+        ]
+        stats = webapi_cache.stats()
+        get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        webapi_cache._entries[("TEST", settings.WEBAPI_METRIC)][
+            "timestamp"
+        ] -= 120
+        cached = get_webapi_data(settings.WEBAPI_METRIC, "TEST", "mocked")
+        self.assertEqual(cached, data["data"])
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            settings.WEBAPI_METRIC,
+            headers={**self.headers, "If-None-Match": '"abc"'},
+            timeout=180
+        )
+        new_stats = webapi_cache.stats()
+        self.assertEqual(new_stats["revalidated"] - stats["revalidated"], 1)
+
+
+class WebApiSessionTests(SimpleTestCase):
+    def setUp(self):
+        self.data = mocked_web_api_metric_profiles().json()
+        self.headers = {"Accept": "application/json", "x-api-key": "mocked"}
+        self.session = WebApiSession()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_connections_are_reused(self):
+        server = StubWebApiServer(self.data)
+        server.start()
+        try:
+            for i in range(5):
+                response = self.session.get(server.url, headers=self.headers)
+                self.assertEqual(response.json(), self.data)
+
+            response = self.session.put(
+                server.url + "/11111111-2222-3333-4444-555555555555",
+                headers=self.headers, data=json.dumps(self.data["data"][0])
+            )
+            self.assertEqual(response.status_code, 200)
+
+        finally:
+            self.session.close()
+            server.stop()
+
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual(server.connections, 1)
+
+    def test_connections_without_session(self):
+        server = StubWebApiServer(self.data)
+        server.start()
+        try:
+            for i in range(5):
+                response = requests.get(
+                    server.url, headers=self.headers, timeout=10
+                )
+                self.assertEqual(response.json(), self.data)
+
+        finally:
+            server.stop()
+
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(server.connections, 5)
+
+    @override_settings(WEBAPI_RETRIES=2, WEBAPI_BACKOFF=0)
+    def test_get_is_retried(self):
+        server = StubWebApiServer(self.data, statuses=[503, 502])
+        server.start()
+        try:
+            response = self.session.get(server.url, headers=self.headers)
+
+        finally:
+            self.session.close()
+            server.stop()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+
+    @override_settings(WEBAPI_RETRIES=2, WEBAPI_BACKOFF=0)
+    def test_put_is_not_retried(self):
+        server = StubWebApiServer(self.data, statuses=[503])
+        server.start()
+        try:
+            response = self.session.put(
+                server.url + "/11111111-2222-3333-4444-555555555555",
+                headers=self.headers, data="{}"
+            )
+
+        finally:
+            self.session.close()
+            server.stop()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(server.requests), 1)
+
+    @override_settings(WEBAPI_TIMEOUT=42)
+    @patch("requests.Session.request")
+    def test_default_timeout(self, mock_request):
+        self.session.put("https://mock.api.url", data="{}")
+        self.session.get("https://mock.api.url", timeout=20)
+        self.assertEqual(
+            mock_request.call_args_list, [
+                call("PUT", "https://mock.api.url", data="{}", timeout=42),
+                call("GET", "https://mock.api.url", timeout=20)
+            ]
+        )
+
+    @patch("requests.Session.request")
+    def test_latency_stats(self, mock_request):
+        self.session.get("https://mock.api.url/api/v2/metric_profiles")
+        self.session.put(
+            "https://mock.api.url/api/v2/metric_profiles/"
+            "11111111-2222-3333-4444-555555555555", data="{}"
+        )
+        self.session.put(
+            "https://mock.api.url/api/v2/metric_profiles/"
+            "66666666-7777-8888-9999-000000000000", data="{}"
+        )
+        stats = self.session.stats()
+        self.assertEqual(
+            sorted(stats.keys()), [
+                "GET https://mock.api.url/api/v2/metric_profiles",
+                "PUT https://mock.api.url/api/v2/metric_profiles"
+            ]
+        )
+        self.assertEqual(
+            stats["GET https://mock.api.url/api/v2/metric_profiles"]["count"],
+            1
+        )
+        self.assertEqual(
+            stats["PUT https://mock.api.url/api/v2/metric_profiles"]["count"],
+            2
+        )
+
+
+class WebApiFanOutTests(SimpleTestCase):
+    @override_settings(WEBAPI_MAX_WORKERS=3)
+    def test_calls_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def func(tenant, value):
+            barrier.wait()
+            return f"{tenant}-{value}"
+
+        results = webapi_fan_out(
+            func, [("TENANT1", 1), ("TENANT2", 2), ("TENANT3", 3)]
+        )
+        self.assertEqual(
+            results, [("TENANT1-1", None), ("TENANT2-2", None),
+                      ("TENANT3-3", None)]
+        )
+
+    @override_settings(WEBAPI_MAX_WORKERS=2)
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def func(tenant):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+
+            time.sleep(0.05)
+
+            with lock:
+                running["now"] -= 1
+
+            return tenant
+
+        results = webapi_fan_out(
+            func, [(f"TENANT{i}",) for i in range(6)]
+        )
+        self.assertEqual(
+            results, [(f"TENANT{i}", None) for i in range(6)]
+        )
+        self.assertEqual(running["max"], 2)
+
+    @override_settings(WEBAPI_MAX_WORKERS=4)
+    def test_exceptions_are_returned_in_order(self):
+        def func(tenant):
+            if tenant == "TENANT2":
+                raise requests.exceptions.HTTPError("401 Client Error")
+
+            return tenant
+
+        results = webapi_fan_out(
+            func, [("TENANT1",), ("TENANT2",), ("TENANT3",)]
+        )
+        self.assertEqual(results[0], ("TENANT1", None))
+        self.assertIsNone(results[1][0])
+        self.assertIsInstance(results[1][1], requests.exceptions.HTTPError)
+        self.assertEqual(results[2], ("TENANT3", None))
+
+    @override_settings(WEBAPI_MAX_WORKERS=4)
+    def test_single_call_runs_in_current_thread(self):
+        results = webapi_fan_out(
+            lambda: threading.current_thread(), [()]
+        )
+        self.assertEqual(results, [(threading.current_thread(), None)])
+
+    def test_no_calls(self):
+        self.assertEqual(webapi_fan_out(lambda: None, []), [])
+
+
+CONFIG = """
+[GENERAL]
+Debug = False
+
+[GENERAL_ALL]
+PublicPage = tenant.com
+TermsOfUse = https://terms.of.use.com
+PrivacyPolicies = https://privacy.policies.com
+
+[GENERAL_TENANT]
+SamlLoginString = Log in using EGI CHECK-IN
+SamlServiceName = ARGO POEM EGI-CheckIn
+UseServiceTitles = True
+TermsOfUse = https://terms.of.use.com
+PrivacyPolicies = https://privacy.policies.com
+
+[GENERAL_TENANT2]
+SamlLoginString = Log in using B2ACCESS
+
+[SUPERUSER_TENANT]
+Name = poem
+Password = 50%%secret
+Email = test@email.com
+"""
+
+
+class ConfigRegistryTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".conf")
+        with os.fdopen(handle, "w") as f:
+            f.write(CONFIG)
+
+        override = override_settings(CONFIG_FILE=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(config_registry.clear)
+        config_registry.clear()
+
+    def test_options(self):
+        config = poem_config()
+        self.assertEqual(config.get("GENERAL_ALL", "publicpage"), "tenant.com")
+        self.assertEqual(config.get("GENERAL_ALL", "PublicPage"), "tenant.com")
+        self.assertEqual(
+            config.get("SUPERUSER_TENANT", "password"), "50%secret"
+        )
+        self.assertEqual(config.get("GENERAL", "missing", fallback=1), 1)
+        self.assertRaises(NoSectionError, config.get, "GENERAL_NONE", "name")
+        self.assertRaises(NoOptionError, config.get, "GENERAL", "missing")
+
+    def test_tenants(self):
+        config = poem_config()
+        self.assertEqual(sorted(config.tenants), ["all", "tenant", "tenant2"])
+        tenant = config.tenant("TENANT")
+        self.assertEqual(tenant.saml_login_string, "Log in using EGI CHECK-IN")
+        self.assertEqual(tenant.saml_service_name, "ARGO POEM EGI-CheckIn")
+        self.assertTrue(tenant.use_service_titles)
+        self.assertEqual(tenant.terms_of_use, "https://terms.of.use.com")
+        self.assertFalse(config.tenant("tenant2").use_service_titles)
+        self.assertIsNone(config.tenant("tenant2").saml_service_name)
+        self.assertRaises(NoSectionError, config.tenant, "nonexisting")
+
+    def test_config_immutable(self):
+        config = poem_config()
+        with self.assertRaises(TypeError):
+            config.tenants["new"] = config.tenant("tenant")
+        with self.assertRaises(AttributeError):
+            config.tenant("tenant").name = "changed"
+
+    def test_config_parsed_once(self):
+        config = poem_config()
+        with patch("Poem.helpers.config_helpers.ConfigParser") as parser:
+            for _ in range(10):
+                self.assertIs(poem_config(), config)
+        self.assertFalse(parser.called)
+
+    def test_reload_only_if_modified(self):
+        config = poem_config()
+        received = []
+
+        def receiver(sender, config, **kwargs):
+            received.append(config)
+
+        config_reloaded.connect(receiver)
+        self.addCleanup(config_reloaded.disconnect, receiver)
+        self.assertFalse(reload_poem_config())
+        self.assertIs(poem_config(), config)
+
+        with open(self.path, "a") as f:
+            f.write("\n[GENERAL_TENANT3]\nSamlLoginString = Log in\n")
+        os.utime(self.path, (config.mtime + 10, config.mtime + 10))
+
+        self.assertTrue(reload_poem_config())
+        self.assertIsNot(poem_config(), config)
+        self.assertEqual(
+            poem_config().tenant("tenant3").saml_login_string, "Log in"
+        )
+        self.assertEqual(received, [poem_config()])
+        self.assertTrue(reload_poem_config(force=True))
+        self.assertEqual(len(received), 2)
+
+    def test_modified_config_reloaded_on_use(self):
+        config = poem_config()
+        received = []
+
+        def receiver(sender, config, **kwargs):
+            received.append(config)
+
+        config_reloaded.connect(receiver)
+        self.addCleanup(config_reloaded.disconnect, receiver)
+
+        with open(self.path, "a") as f:
+            f.write("\n[GENERAL_TENANT3]\nSamlLoginString = Log in\n")
+        os.utime(self.path, (config.mtime + 10, config.mtime + 10))
+
+        # file is not checked again before check interval passes
+        self.assertIs(poem_config(), config)
+        with patch.object(config_registry, "check_interval", 0):
+            new_config = poem_config()
+            self.assertIsNot(new_config, config)
+            self.assertEqual(
+                new_config.tenant("tenant3").saml_login_string, "Log in"
+            )
+            self.assertIs(poem_config(), new_config)
+        self.assertEqual(received, [new_config])
+
+    def test_last_config_kept_if_file_not_parsed(self):
+        config = poem_config()
+        received = []
+
+        def receiver(sender, config, **kwargs):
+            received.append(config)
+
+        config_reloaded.connect(receiver)
+        self.addCleanup(config_reloaded.disconnect, receiver)
+
+        for content in ["", "[GENERAL\nPublicPage = tenant.com\n"]:
+            with open(self.path, "w") as f:
+                f.write(content)
+
+            with self.assertLogs("POEM", level="WARNING"):
+                self.assertFalse(reload_poem_config(force=True))
+            self.assertIs(poem_config(), config)
+
+        os.remove(self.path)
+        with self.assertLogs("POEM", level="WARNING"):
+            self.assertFalse(reload_poem_config(force=True))
+        self.assertEqual(
+            poem_config().get("GENERAL_ALL", "publicpage"), "tenant.com"
+        )
+        self.assertEqual(received, [])
+
+        with open(self.path, "w") as f:
+            f.write(CONFIG)
+        self.assertTrue(reload_poem_config(force=True))
+        self.assertIsNot(poem_config(), config)
+        self.assertEqual(received, [poem_config()])
+
+
+IDP_METADATA = """<?xml version="1.0" encoding="UTF-8"?>
+<md:EntityDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
+    entityID="https://idp.stub.test/metadata">
+  <md:IDPSSODescriptor
+      protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+    <md:SingleSignOnService
+        Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-Redirect"
+        Location="https://idp.stub.test/sso"/>
+  </md:IDPSSODescriptor>
+</md:EntityDescriptor>
+"""
+
+
+@override_settings(SAML_METADATA_REFRESH=60)
+class SPConfigCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = SPConfigCache()
+        self.built = []
+
+    def _build(self):
+        self.built.append(object())
+        return self.built[-1]
+
+    def test_config_loaded_once(self):
+        config = self.cache.get(("tenant", "tenant.com"), self._build)
+        for _ in range(5):
+            self.assertIs(
+                self.cache.get(("tenant", "tenant.com"), self._build), config
+            )
+        self.assertEqual(len(self.built), 1)
+        self.cache.get(("tenant2", "tenant2.com"), self._build)
+        self.assertEqual(len(self.built), 2)
+        self.assertEqual(
+            self.cache.stats(),
+            {
+                "hits": 5, "misses": 2, "refreshes": 0, "failures": 0,
+                "hit_rate": 5 / 7, "entries": 2
+            }
+        )
+
+    def test_config_refreshed(self):
+        with patch("Poem.helpers.saml_helpers.time.monotonic") as monotonic:
+            monotonic.return_value = 100.
+            config1 = self.cache.get(("tenant", "tenant.com"), self._build)
+            monotonic.return_value = 170.
+            config2 = self.cache.get(("tenant", "tenant.com"), self._build)
+        self.assertIsNot(config1, config2)
+        self.assertEqual(self.cache.stats()["refreshes"], 1)
+
+    def test_last_config_used_if_refresh_fails(self):
+        def failing_build():
+            raise FileNotFoundError("metadata-tenant.xml")
+
+        with patch("Poem.helpers.saml_helpers.time.monotonic") as monotonic:
+            monotonic.return_value = 100.
+            config = self.cache.get(("tenant", "tenant.com"), self._build)
+            monotonic.return_value = 170.
+            self.assertIs(
+                self.cache.get(("tenant", "tenant.com"), failing_build), config
+            )
+        self.assertEqual(self.cache.stats()["failures"], 1)
+        self.assertRaises(
+            FileNotFoundError, self.cache.get, ("tenant2", "tenant2.com"),
+            failing_build
+        )
+
+    @override_settings(SAML_METADATA_REFRESH=0)
+    def test_cache_disabled(self):
+        self.cache.get(("tenant", "tenant.com"), self._build)
+        self.cache.get(("tenant", "tenant.com"), self._build)
+        self.assertEqual(len(self.built), 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_cache_cleared_on_config_reload(self):
+        sp_configs.get(("tenant", "tenant.com"), self._build)
+        config_reloaded.send(sender=self.__class__, config=None)
+        self.assertEqual(sp_configs.stats()["entries"], 0)
+
+    def test_concurrent_logins_load_config_once(self):
+        def slow_build():
+            time.sleep(0.05)
+            return self._build()
+
+        threads = [
+            threading.Thread(
+                target=self.cache.get, args=(("tenant", "t.com"), slow_build)
+            ) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.built), 1)
+
+    def test_slow_config_does_not_block_other_tenants(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            return self._build()
+
+        thread = threading.Thread(
+            target=self.cache.get, args=(("tenant", "t.com"), slow_build)
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+        config = self.cache.get(("tenant2", "t2.com"), self._build)
+        self.assertIs(config, self.built[0])
+        self.assertTrue(thread.is_alive())
+        release.set()
+        thread.join()
+        self.assertEqual(len(self.built), 2)
+
+
+# building SAML config loads IdP metadata with xmlsec1
+@unittest.skipUnless(os.path.exists("/usr/bin/xmlsec1"), "xmlsec1 not found")
+@override_settings(SAML_METADATA_REFRESH=60)
+class SAMLConfigBenchmarkTests(SimpleTestCase):
+    def setUp(self):
+        self.venv = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.venv, "etc", "poem"))
+        with open(
+            os.path.join(self.venv, "etc", "poem", "metadata-tenant.xml"), "w"
+        ) as f:
+            f.write(IDP_METADATA)
+
+        override = override_settings(VENV=self.venv)
+        override.enable()
+        self.addCleanup(override.disable)
+        sp_configs.clear()
+        self.addCleanup(sp_configs.clear)
+        self.request = types.SimpleNamespace(
+            tenant=types.SimpleNamespace(name="TENANT"),
+            get_host=lambda: "tenant.test.com"
+        )
+
+    @patch(
+        "Poem.poem.saml2.config.service_name_conf",
+        return_value="ARGO POEM"
+    )
+    def test_login_handshake_config_benchmark(self, mock_name):
+        from Poem.poem.saml2.config import get_saml_config
+
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            sp_configs.clear()
+            config = get_saml_config(self.request)
+        uncached = (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.assertIs(get_saml_config(self.request), config)
+        cached = (time.perf_counter() - start) / runs
+
+        self.assertEqual(
+            config.entityid, "https://tenant.test.com/saml2/metadata/"
+        )
+        self.assertEqual(
+            list(config.metadata.identity_providers()),
+            ["https://idp.stub.test/metadata"]
+        )
+        self.assertEqual(mock_name.call_count, runs)
+        # cached config is a dict lookup, well under 1 ms
+        self.assertLess(cached, 0.001)
+        self.assertLess(cached, uncached)
+
+
+class DatasetHelpersTests(TenantTestCase):
+    def test_generate_catalogue(self):
+        templates = generate_catalogue(
+            random.Random(0), "ds", probes=4, versions=3, templates=10
+        )
+        self.assertEqual(len(templates), 10)
+        self.assertEqual(
+            admin_models.Package.objects.filter(
+                name__startswith="ds-package-"
+            ).count(), 12
+        )
+        self.assertEqual(
+            admin_models.YumRepo.objects.filter(
+                name__startswith="ds-repo-", tag__normalized_name="rocky9"
+            ).count(), 4
+        )
+        self.assertEqual(
+            admin_models.ProbeHistory.objects.filter(
+                name__startswith="ds-probe-"
+            ).count(), 12
+        )
+        self.assertEqual(
+            admin_models.MetricTemplateHistory.objects.filter(
+                name__startswith="ds.Metric-"
+            ).count(), 30
+        )
+        for mt, tags in templates:
+            template = admin_models.MetricTemplate.objects.get(name=mt.name)
+            self.assertEqual(template.probekey, mt.probekey)
+            self.assertEqual(mt.probekey.package.version, "1.2.0")
+            self.assertEqual(
+                sorted(tag.name for tag in template.tags.all()),
+                sorted(tag.name for tag in tags)
+            )
+
+    def test_generate_catalogue_is_deterministic(self):
+        def generated(prefix):
+            return [
+                (
+                    mt.name[len(prefix):],
+                    mt.probekey.name[len(prefix):],
+                    mt.config.replace(prefix, ""),
+                    sorted(tag.name.replace(prefix, "") for tag in tags)
+                ) for mt, tags in generate_catalogue(
+                    random.Random(42), prefix, probes=5, versions=2,
+                    templates=20
+                )
+            ]
+
+        self.assertEqual(generated("dsa"), generated("dsb"))
+
+    def test_generate_tenant_data(self):
+        templates = generate_catalogue(
+            random.Random(0), "ds", probes=4, versions=3, templates=10
+        )
+        metrics = generate_tenant_data(
+            random.Random(0), "ds", templates, metrics=6, groups=2,
+            profiles=3
+        )
+        self.assertEqual(len(metrics), 6)
+        self.assertEqual(poem_models.Metric.objects.count(), 6)
+        self.assertEqual(poem_models.TenantHistory.objects.count(), 6)
+        self.assertEqual(
+            sorted(poem_models.GroupOfMetrics.objects.filter(
+                name__startswith="DS-"
+            ).values_list("name", flat=True)),
+            ["DS-0", "DS-1"]
+        )
+        self.assertEqual(poem_models.MetricProfiles.objects.count(), 3)
+        self.assertEqual(
+            sum(
+                group.metricprofiles.count() for group in
+                poem_models.GroupOfMetricProfiles.objects.all()
+            ), 3
+        )
+        for metric in poem_models.Metric.objects.all():
+            mt = admin_models.MetricTemplateHistory.objects.get(
+                name=metric.name, probekey__name=metric.probe_name,
+                probekey__package__version=metric.package_version
+            )
+            self.assertEqual(metric.probeversion, mt.probekey.__str__())
+            self.assertEqual(metric.config, mt.config)
+
+        with schema_context(get_public_schema_name()):
+            self.assertEqual(
+                sorted(admin_models.TenantMetric.objects.filter(
+                    tenant__schema_name=self.tenant.schema_name
+                ).values_list("name", flat=True)),
+                sorted(metric.name for metric in metrics)
+            )
+
+    def test_generate_dataset_command(self):
+        out = io.StringIO()
+        call_command(
+            "poem_generate_dataset", "--prefix", "ds", "--probes", "3",
+            "--versions", "2", "--templates", "8", "--tenants", "0",
+            stdout=out
+        )
+        self.assertIn(
+            "Generated 3 probes and 8 metric templates with 2 versions each",
+            out.getvalue()
+        )
+        self.assertEqual(
+            admin_models.MetricTemplateHistory.objects.filter(
+                name__startswith="ds.Metric-"
+            ).count(), 16
+        )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "poem_generate_dataset", "--prefix", "ds", "--tenants", "0",
+                stdout=io.StringIO()
+            )
+
+    def test_generate_dataset_command_invalid_prefix(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "poem_generate_dataset", "--prefix", "data-set",
+                "--tenants", "0", stdout=io.StringIO()
+            )
+        self.assertFalse(
+            admin_models.Probe.objects.filter(
+                name__startswith="data-set"
+            ).exists()
+        )
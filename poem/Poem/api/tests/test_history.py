@@ -5,12 +5,16 @@ import factory
 from Poem.api import views_internal as views
 from Poem.poem_super_admin import models as admin_models
 from Poem.users.models import CustUser
+from django.db import connection
 from django.db.models.signals import pre_save
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from rest_framework import status
 from rest_framework.test import force_authenticate
 
+from .utils_test import rendered, streamed
+
 
 class ListVersionsAPIViewTests(TenantTestCase):
     @factory.django.mute_signals(pre_save)
@@ -675,3 +679,134 @@ class ListVersionsAPIViewTests(TenantTestCase):
                 }
             ]
         )
+
+    def _get_queries(self, obj):
+        request = self.factory.get(self.url + obj + '/')
+        force_authenticate(request, user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request, obj)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    @factory.django.mute_signals(pre_save)
+    def test_get_all_versions_number_of_queries(self):
+        probe_queries, response = self._get_queries('probe')
+        self.assertEqual(len(response.data), 3)
+        mt_queries, response = self._get_queries('metrictemplate')
+        self.assertEqual(len(response.data), 4)
+
+        tags = list(admin_models.MetricTags.objects.all())
+        for i in range(30):
+            package = admin_models.Package.objects.create(
+                name=f'package-{i}', version='1.0.0'
+            )
+            probe = admin_models.Probe.objects.create(
+                name=f'probe-{i}', package=package, user='testuser',
+                datetime=datetime.datetime.now()
+            )
+            probever = admin_models.ProbeHistory.objects.create(
+                object_id=probe, name=probe.name, package=package,
+                date_created=datetime.datetime.now(),
+                version_comment='Initial version.', version_user='testuser'
+            )
+            mt = admin_models.MetricTemplate.objects.create(
+                name=f'metric-{i}', mtype=self.mtype1, probekey=probever
+            )
+            mtver = admin_models.MetricTemplateHistory.objects.create(
+                object_id=mt, name=mt.name, mtype=mt.mtype,
+                probekey=probever, date_created=datetime.datetime.now(),
+                version_comment='Initial version.', version_user='testuser'
+            )
+            mtver.tags.add(*tags)
+
+        queries, response = self._get_queries('probe')
+        self.assertEqual(len(response.data), 33)
+        self.assertEqual(queries, probe_queries)
+        queries, response = self._get_queries('metrictemplate')
+        self.assertEqual(len(response.data), 34)
+        metric = [
+            ver for ver in response.data if ver['fields']['name'] == 'metric-0'
+        ][0]
+        self.assertEqual(
+            sorted(metric['fields']['tags']),
+            sorted(tag.name for tag in tags)
+        )
+        self.assertEqual(queries, mt_queries)
+
+    def test_get_all_probe_versions_paginated(self):
+        request = self.factory.get(self.url + 'probe/?limit=2')
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'probe')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']],
+            [self.ver3.id, self.ver1.id]
+        )
+        self.assertIsNone(response.data['previous'])
+        request = self.factory.get(response.data['next'])
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'probe')
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']], [self.ver2.id]
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_get_all_probe_versions_sorted(self):
+        request = self.factory.get(
+            self.url + 'probe/?limit=2&ordering=-date_created'
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'probe')
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']],
+            [self.ver3.id, self.ver2.id]
+        )
+        request = self.factory.get(self.url + 'probe/?ordering=date_created')
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'probe')
+        self.assertEqual(
+            [ver['id'] for ver in response.data],
+            [self.ver1.id, self.ver2.id, self.ver3.id]
+        )
+
+    def test_get_versions_of_metric_template_paginated(self):
+        request = self.factory.get(
+            self.url + 'metrictemplate/argo.POEM-API-MON-new?limit=1'
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(
+            request, 'metrictemplate', 'argo.POEM-API-MON-new'
+        )
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']], [self.ver5.id]
+        )
+        self.assertEqual(
+            response.data['results'][0]['fields']['tags'], ['test_tag1']
+        )
+        request = self.factory.get(response.data['next'])
+        force_authenticate(request, user=self.user)
+        response = self.view(
+            request, 'metrictemplate', 'argo.POEM-API-MON-new'
+        )
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']], [self.ver4.id]
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_get_versions_streaming(self):
+        for url, args in [
+            ('probe/', ['probe']),
+            ('metrictemplate/', ['metrictemplate']),
+            (
+                'metrictemplate/argo.POEM-API-MON-new',
+                ['metrictemplate', 'argo.POEM-API-MON-new']
+            )
+        ]:
+            request = self.factory.get(self.url + url)
+            force_authenticate(request, user=self.user)
+            response = self.view(request, *args)
+            request = self.factory.get(self.url + url + '?stream=true')
+            force_authenticate(request, user=self.user)
+            streaming_response = self.view(request, *args)
+            self.assertTrue(streaming_response.streaming)
+            self.assertEqual(streamed(streaming_response), rendered(response))
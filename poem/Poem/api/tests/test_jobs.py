@@ -0,0 +1,286 @@
+import datetime
+from unittest.mock import patch
+
+from Poem.api import views_internal as views
+from Poem.helpers.jobs_helpers import claim_next_job, run_job
+from Poem.poem_super_admin import models as admin_models
+from Poem.tenants.models import Tenant
+from Poem.users.models import CustUser
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantRequestFactory
+from django_tenants.utils import schema_context, get_public_schema_name, \
+    get_tenant_domain_model
+from rest_framework import status
+from rest_framework.test import force_authenticate
+
+from .utils_test import mocked_func
+
+
+def mock_jobs():
+    with schema_context(get_public_schema_name()):
+        job1 = admin_models.Job.objects.create(
+            view="Poem.api.internal_views.metrictemplates."
+                 "ListMetricTemplates",
+            method="delete",
+            kwargs={"name": "nonexisting"},
+            schema_name=get_public_schema_name(),
+            user="poem"
+        )
+        job2 = admin_models.Job.objects.create(
+            view="Poem.api.internal_views.metrictemplates."
+                 "BulkDeleteMetricTemplates",
+            method="post",
+            data={"metrictemplates": ["argo.AMS-Check"]},
+            form_data=True,
+            schema_name=get_public_schema_name(),
+            user="poem"
+        )
+
+    return job1, job2
+
+
+class BackgroundJobsTests(TenantTestCase):
+    def setUp(self):
+        self.factory = TenantRequestFactory(self.tenant)
+        self.view = views.BulkDeleteMetricTemplates.as_view()
+        self.url = "/api/v2/internal/deletetemplates/"
+
+        self.tenant_superuser = CustUser.objects.create_user(
+            username="tenant_poem", is_superuser=True
+        )
+
+        with schema_context(get_public_schema_name()):
+            self.super_tenant = Tenant.objects.create(
+                name="public", schema_name=get_public_schema_name()
+            )
+            get_tenant_domain_model().objects.create(
+                domain="public", tenant=self.super_tenant, is_primary=True
+            )
+            self.superuser = CustUser.objects.create_user(
+                username="poem", is_superuser=True
+            )
+            self.user = CustUser.objects.create_user(username="admin_user")
+
+    @patch(
+        "Poem.api.internal_views.metrictemplates.get_metrics_in_profiles"
+    )
+    def test_enqueue_bulk_delete_sp_superuser(self, mock_get):
+        data = {"metrictemplates": ["argo.AMS-Check", "test.AMS-Check"]}
+        request = self.factory.post(
+            self.url + "?background=true", data, format="json"
+        )
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.superuser)
+        response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        with schema_context(get_public_schema_name()):
+            job = admin_models.Job.objects.get(id=response.data["id"])
+        self.assertEqual(response.data, {"id": job.id, "status": "queued"})
+        self.assertEqual(job.name, "BulkDeleteMetricTemplates.post")
+        self.assertEqual(job.method, "post")
+        self.assertEqual(job.schema_name, get_public_schema_name())
+        self.assertEqual(job.user, "poem")
+        self.assertEqual(
+            job.data,
+            {"metrictemplates": ["argo.AMS-Check", "test.AMS-Check"]}
+        )
+        self.assertTrue(job.form_data)
+        self.assertFalse(mock_get.called)
+
+    @patch(
+        "Poem.api.internal_views.metrictemplates.get_metrics_in_profiles"
+    )
+    def test_enqueue_bulk_delete_sp_user(self, mock_get):
+        data = {"metrictemplates": ["argo.AMS-Check", "test.AMS-Check"]}
+        request = self.factory.post(
+            self.url + "?background=true", data, format="json"
+        )
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with schema_context(get_public_schema_name()):
+            self.assertEqual(admin_models.Job.objects.all().count(), 0)
+        self.assertFalse(mock_get.called)
+
+    @patch(
+        "Poem.api.internal_views.metrictemplates.get_metrics_in_profiles"
+    )
+    def test_enqueue_bulk_delete_tenant_superuser(self, mock_get):
+        data = {"metrictemplates": ["argo.AMS-Check", "test.AMS-Check"]}
+        request = self.factory.post(
+            self.url + "?background=true", data, format="json"
+        )
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.tenant_superuser)
+        response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with schema_context(get_public_schema_name()):
+            self.assertEqual(admin_models.Job.objects.all().count(), 0)
+        self.assertFalse(mock_get.called)
+
+    def test_claim_next_job(self):
+        job1, job2 = mock_jobs()
+        job = claim_next_job()
+        self.assertEqual(job.id, job1.id)
+        self.assertEqual(job.status, "running")
+        self.assertIsNotNone(job.date_started)
+        job = claim_next_job()
+        self.assertEqual(job.id, job2.id)
+        self.assertIsNone(claim_next_job())
+
+    @override_settings(JOBS_TIMEOUT=3600)
+    def test_claim_next_job_fails_abandoned_jobs(self):
+        job1, job2 = mock_jobs()
+        started = timezone.now() - datetime.timedelta(hours=2)
+        with schema_context(get_public_schema_name()):
+            admin_models.Job.objects.filter(id=job1.id).update(
+                status="running", date_started=started
+            )
+            admin_models.Job.objects.filter(id=job2.id).update(
+                status="running", date_started=timezone.now()
+            )
+        self.assertIsNone(claim_next_job())
+        with schema_context(get_public_schema_name()):
+            job1 = admin_models.Job.objects.get(id=job1.id)
+            job2 = admin_models.Job.objects.get(id=job2.id)
+        self.assertEqual(job1.status, "failed")
+        self.assertEqual(job1.error, "Job not finished in 3600 seconds")
+        self.assertIsNotNone(job1.date_finished)
+        self.assertEqual(job2.status, "running")
+        self.assertIsNone(job2.date_finished)
+
+    @override_settings(JOBS_TIMEOUT=0)
+    def test_claim_next_job_abandoned_jobs_timeout_disabled(self):
+        job1, job2 = mock_jobs()
+        started = timezone.now() - datetime.timedelta(days=2)
+        with schema_context(get_public_schema_name()):
+            admin_models.Job.objects.filter(id=job1.id).update(
+                status="running", date_started=started
+            )
+        job = claim_next_job()
+        self.assertEqual(job.id, job2.id)
+        with schema_context(get_public_schema_name()):
+            self.assertEqual(
+                admin_models.Job.objects.get(id=job1.id).status, "running"
+            )
+
+    def test_run_job_with_error_response(self):
+        job1, job2 = mock_jobs()
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.status_code, 404)
+        self.assertEqual(
+            job.result, {"detail": "Metric template does not exist."}
+        )
+        self.assertEqual(job.error, "")
+        self.assertIsNotNone(job.date_finished)
+
+    @patch("Poem.api.internal_views.metrictemplates.sync_tags_webapi")
+    @patch(
+        "Poem.api.internal_views.metrictemplates.get_metrics_in_profiles"
+    )
+    def test_run_job(self, mock_get, mock_sync):
+        mock_get.return_value = {}
+        mock_sync.side_effect = mocked_func
+        job1, job2 = mock_jobs()
+        with schema_context(get_public_schema_name()):
+            admin_models.MetricTemplate.objects.create(
+                name="argo.AMS-Check",
+                mtype=admin_models.MetricTemplateType.objects.create(
+                    name="Active"
+                )
+            )
+            job1.delete()
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.status_code, 200)
+        self.assertEqual(
+            job.result,
+            {"info": "Metric template argo.AMS-Check successfully deleted."}
+        )
+        mock_get.assert_called_once()
+        with schema_context(get_public_schema_name()):
+            self.assertFalse(
+                admin_models.MetricTemplate.objects.filter(
+                    name="argo.AMS-Check"
+                ).exists()
+            )
+
+    def test_run_job_with_exception(self):
+        with schema_context(get_public_schema_name()):
+            admin_models.Job.objects.create(
+                view="Poem.api.internal_views.metrictemplates."
+                     "ListMetricTemplates",
+                method="delete",
+                kwargs={"name": "nonexisting"},
+                schema_name=get_public_schema_name(),
+                user="nonexisting"
+            )
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, "failed")
+        self.assertIsNone(job.status_code)
+        self.assertEqual(job.error, "CustUser matching query does not exist.")
+
+    # connection of the test case must be kept open
+    @patch(
+        "Poem.poem.management.commands.poem_run_jobs.close_old_connections"
+    )
+    @patch("Poem.api.internal_views.metrictemplates.sync_tags_webapi")
+    @patch(
+        "Poem.api.internal_views.metrictemplates.get_metrics_in_profiles"
+    )
+    def test_run_jobs_command(self, mock_get, mock_sync, mock_close):
+        mock_get.return_value = {}
+        mock_sync.side_effect = mocked_func
+        job1, job2 = mock_jobs()
+        call_command("poem_run_jobs", "--once")
+        self.assertTrue(mock_close.called)
+        with schema_context(get_public_schema_name()):
+            statuses = [
+                job.status for job in
+                admin_models.Job.objects.all().order_by("id")
+            ]
+        self.assertEqual(statuses, ["failed", "done"])
+
+    def test_get_job_sp_superuser(self):
+        job1, job2 = mock_jobs()
+        run_job(claim_next_job())
+        request = self.factory.get(f"/api/v2/internal/jobs/{job1.id}")
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.superuser)
+        response = views.ListJobs.as_view()(request, job_id=job1.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], job1.id)
+        self.assertEqual(response.data["name"], "ListMetricTemplates.delete")
+        self.assertEqual(response.data["status"], "failed")
+        self.assertEqual(response.data["status_code"], 404)
+        self.assertEqual(
+            response.data["result"],
+            {"detail": "Metric template does not exist."}
+        )
+        self.assertIsNotNone(response.data["date_finished"])
+
+    def test_get_job_of_other_schema_tenant_superuser(self):
+        job1, job2 = mock_jobs()
+        request = self.factory.get(f"/api/v2/internal/jobs/{job1.id}")
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.tenant_superuser)
+        response = views.ListJobs.as_view()(request, job_id=job1.id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, {"detail": "Job not found."})
+
+    def test_get_job_sp_user(self):
+        job1, job2 = mock_jobs()
+        request = self.factory.get(f"/api/v2/internal/jobs/{job1.id}")
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.user)
+        response = views.ListJobs.as_view()(request, job_id=job1.id)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            response.data,
+            {"detail": "You do not have permission to view jobs."}
+        )
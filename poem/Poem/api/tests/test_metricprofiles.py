@@ -123,6 +123,21 @@ class ListMetricProfilesAPIViewTests(TenantTestCase):
             ]
         )
 
+    @patch('Poem.api.internal_views.metricprofiles.sync_webapi')
+    def test_get_metric_profiles_forced_sync(self, func):
+        func.side_effect = mocked_func
+        request = self.factory.get(self.url)
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.superuser)
+        self.view(request)
+        self.assertFalse(func.call_args[1]['force'])
+        request = self.factory.get(self.url + '?sync=true')
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.superuser)
+        response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(func.call_args[1]['force'])
+
     @patch('Poem.api.internal_views.metricprofiles.sync_webapi')
     def test_get_all_metric_profiles_regular_user(self, func):
         func.side_effect = mocked_func
@@ -1,17 +1,23 @@
 import datetime
 import json
+from io import StringIO
 from unittest.mock import patch, call
 
 import requests
 from Poem.api import views_internal as views
 from Poem.api.internal_views.utils import WebApiException
+from Poem.helpers.catalogue_helpers import catalogue_cache, \
+    get_catalogue_generation
 from Poem.helpers.history_helpers import create_comment, serialize_metric
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from Poem.tenants.models import Tenant
 from Poem.users.models import CustUser
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from django_tenants.utils import get_public_schema_name, schema_context, \
@@ -19,7 +25,8 @@ from django_tenants.utils import get_public_schema_name, schema_context, \
 from rest_framework import status
 from rest_framework.test import force_authenticate
 
-from .utils_test import mocked_inline_metric_for_db, mocked_func, encode_data
+from .utils_test import mocked_inline_metric_for_db, mocked_func, \
+    encode_data, rendered, streamed
 
 
 def mock_db():
@@ -8622,6 +8629,224 @@ class ListAvailableMetricTemplatesAPIViewTests(TenantTestCase):
         )
 
 
+class MetricTemplatesCatalogueCacheTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.factory = TenantRequestFactory(self.tenant)
+        self.url = "/api/v2/internal/metrictemplates/"
+
+        mock_db()
+
+        self.user = CustUser.objects.get(username="tenant_poem")
+        self.public_tenant = Tenant.objects.get(name="public")
+        with schema_context(get_public_schema_name()):
+            self.superuser = CustUser.objects.get(username="poem")
+
+        catalogue_cache.clear()
+
+    def _get(self, view, url, tenant=None, user=None, **kwargs):
+        request = self.factory.get(url)
+        request.tenant = tenant if tenant else self.tenant
+        force_authenticate(request, user=user if user else self.user)
+        return view.as_view()(request, **kwargs)
+
+    def test_metric_templates_served_from_cache(self):
+        response1 = self._get(views.ListMetricTemplates, self.url)
+        stats = catalogue_cache.stats()
+        with CaptureQueriesContext(connection) as queries:
+            response2 = self._get(views.ListMetricTemplates, self.url)
+        self.assertEqual(response1.data, response2.data)
+        self.assertEqual(catalogue_cache.stats()["hits"], stats["hits"] + 1)
+        self.assertEqual(catalogue_cache.stats()["misses"], stats["misses"])
+        self.assertFalse(
+            [q for q in queries if "metrictemplate" in q["sql"]]
+        )
+
+    def test_cached_data_not_changed_by_response(self):
+        response1 = self._get(
+            views.ListMetricTemplates, self.url + "argo.AMS-Check",
+            name="argo.AMS-Check"
+        )
+        self.assertFalse("ostag" in response1.data)
+        response2 = self._get(views.ListMetricTemplates, self.url)
+        self.assertTrue("ostag" in response2.data[0])
+        self.assertFalse("tenants" in response2.data[0])
+        response3 = self._get(
+            views.ListMetricTemplates, self.url, tenant=self.public_tenant,
+            user=self.superuser
+        )
+        self.assertTrue("tenants" in response3.data[0])
+        response4 = self._get(views.ListMetricTemplates, self.url)
+        self.assertEqual(response2.data, response4.data)
+
+    def test_streaming_response_same_as_cached(self):
+        for kwargs in [
+            dict(), dict(tenant=self.public_tenant, user=self.superuser)
+        ]:
+            response = self._get(views.ListMetricTemplates, self.url, **kwargs)
+            streaming_response = self._get(
+                views.ListMetricTemplates, self.url + "?stream=true", **kwargs
+            )
+            self.assertTrue(streaming_response.streaming)
+            self.assertEqual(streamed(streaming_response), rendered(response))
+
+    def test_cache_invalidated_on_metric_template_change(self):
+        response = self._get(views.ListMetricTemplates, self.url)
+        self.assertEqual(len(response.data), 8)
+        mt = admin_models.MetricTemplate.objects.create(
+            name="argo.new-template",
+            mtype=admin_models.MetricTemplateType.objects.get(name="Passive")
+        )
+        response = self._get(views.ListMetricTemplates, self.url)
+        self.assertEqual(len(response.data), 9)
+        self.assertTrue(
+            "argo.new-template" in [mt["name"] for mt in response.data]
+        )
+        mt.description = "New description."
+        mt.save()
+        response = self._get(
+            views.ListMetricTemplates, self.url + "argo.new-template",
+            name="argo.new-template"
+        )
+        self.assertEqual(response.data["description"], "New description.")
+        mt.delete()
+        response = self._get(views.ListMetricTemplates, self.url)
+        self.assertEqual(len(response.data), 8)
+
+    def test_cache_invalidated_on_tags_change(self):
+        url = "/api/v2/internal/metrictags/"
+        response = self._get(
+            views.ListMetricTags, url + "internal", name="internal"
+        )
+        self.assertFalse(
+            "argo.AMSPublisher-Check" in
+            [m["name"] for m in response.data["metrics"]]
+        )
+        admin_models.MetricTemplate.objects.get(
+            name="argo.AMSPublisher-Check"
+        ).tags.add(admin_models.MetricTags.objects.get(name="internal"))
+        response = self._get(
+            views.ListMetricTags, url + "internal", name="internal"
+        )
+        self.assertTrue(
+            "argo.AMSPublisher-Check" in
+            [m["name"] for m in response.data["metrics"]]
+        )
+
+    def test_cache_invalidated_on_commit(self):
+        self._get(views.ListMetricTemplates, self.url)
+        generation = get_catalogue_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            admin_models.MetricTags.objects.create(name="new_tag")
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_catalogue_generation(), generation)
+
+    def test_tenant_metrics_not_cached(self):
+        response = self._get(views.ListAvailableMetricTemplates, self.url)
+        self.assertTrue(
+            "eudat.itsm.spmt-healthcheck" in [m["name"] for m in response.data]
+        )
+        poem_models.Metric.objects.get(
+            name="eudat.itsm.spmt-healthcheck"
+        ).delete()
+        response = self._get(views.ListAvailableMetricTemplates, self.url)
+        self.assertFalse(
+            "eudat.itsm.spmt-healthcheck" in [m["name"] for m in response.data]
+        )
+
+    def test_not_cached_with_dummy_cache(self):
+        with self.settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }):
+            stats = catalogue_cache.stats()
+            self._get(views.ListMetricTemplates, self.url)
+            self._get(views.ListMetricTemplates, self.url)
+            self.assertEqual(catalogue_cache.stats(), stats)
+
+
+class TenantMetricIndexTests(TenantTestCase):
+    def setUp(self):
+        self.factory = TenantRequestFactory(self.tenant)
+        self.url = "/api/v2/internal/metrictemplates/"
+
+        self.tenant.name = "test"
+        self.tenant.save()
+
+        mock_db()
+
+        self.public_tenant = Tenant.objects.get(name="public")
+        with schema_context(get_public_schema_name()):
+            self.superuser = CustUser.objects.get(username="poem")
+
+    def _indexed(self):
+        with schema_context(get_public_schema_name()):
+            return sorted(
+                admin_models.TenantMetric.objects.filter(
+                    tenant=self.tenant
+                ).values_list("name", flat=True)
+            )
+
+    def _metrics(self):
+        return sorted(
+            poem_models.Metric.objects.all().values_list("name", flat=True)
+        )
+
+    def test_metrics_indexed_on_create(self):
+        self.assertEqual(self._indexed(), self._metrics())
+        self.assertEqual(len(self._indexed()), 4)
+
+    def test_index_updated_on_rename(self):
+        metric = poem_models.Metric.objects.get(name="argo.AMS-Check")
+        metric.name = "argo.AMS-Check-new"
+        metric.save()
+        self.assertTrue("argo.AMS-Check-new" in self._indexed())
+        self.assertFalse("argo.AMS-Check" in self._indexed())
+        self.assertEqual(self._indexed(), self._metrics())
+
+    def test_index_updated_on_delete(self):
+        poem_models.Metric.objects.get(name="argo.AMS-Check").delete()
+        self.assertFalse("argo.AMS-Check" in self._indexed())
+        self.assertEqual(self._indexed(), self._metrics())
+
+    def test_rebuild_index_command(self):
+        with schema_context(get_public_schema_name()):
+            admin_models.TenantMetric.objects.all().delete()
+        self.assertEqual(self._indexed(), [])
+        out = StringIO()
+        call_command("poem_rebuild_metric_index", stdout=out)
+        self.assertEqual(self._indexed(), self._metrics())
+        self.assertEqual(out.getvalue(), "Tenant test: 4 metrics indexed\n")
+
+    def test_rebuild_index_command_nonexisting_tenant(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "poem_rebuild_metric_index", "--tenant", "nonexisting"
+            )
+
+    def test_list_metric_templates_without_entering_tenant_schemas(self):
+        request = self.factory.get(self.url)
+        request.tenant = self.public_tenant
+        force_authenticate(request, user=self.superuser)
+        with CaptureQueriesContext(connection) as queries:
+            response = views.ListMetricTemplates.as_view()(request)
+        self.assertFalse(
+            [q for q in queries if '"poem_metric"' in q["sql"]]
+        )
+        tenants = dict((mt["name"], mt["tenants"]) for mt in response.data)
+        self.assertEqual(tenants["argo.AMS-Check"], ["test"])
+        self.assertEqual(tenants["argo.AMSPublisher-Check"], [])
+        self.assertEqual(tenants["grnet.agora.healthcheck"], ["test"])
+
+
 class BulkDeleteMetricTemplatesTests(TenantTestCase):
     def setUp(self):
         self.tenant.name = "TENANT"
@@ -2,12 +2,16 @@ import datetime
 import json
 
 from Poem.api import views_internal as views
-from Poem.helpers.history_helpers import serialize_metric
+from Poem.api.internal_views.tenanthistory import ListTenantVersions
+from Poem.helpers.history_helpers import serialize_metric, \
+    serialized_data_to_dict
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from Poem.tenants.models import Tenant
 from Poem.users.models import CustUser
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from django_tenants.utils import schema_context, get_public_schema_name, \
@@ -2654,3 +2658,211 @@ class ListPackagesVersionsTests(TenantTestCase):
         response = self.view(request, 'nonexisting-package')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['detail'], 'Package not found.')
+
+
+class UpdateMetricsOnPackageChangeTests(TenantTestCase):
+    def setUp(self):
+        with schema_context(get_public_schema_name()):
+            public_tenant = Tenant.objects.create(
+                name='public', schema_name=get_public_schema_name()
+            )
+            get_tenant_domain_model().objects.create(
+                domain='public', tenant=public_tenant, is_primary=True
+            )
+
+        self.package = admin_models.Package.objects.create(
+            name='nagios-plugins-argo',
+            version='0.1.11'
+        )
+
+        probe = admin_models.Probe.objects.create(
+            name='ams-probe',
+            package=self.package,
+            comment='Initial version.',
+            user='testuser',
+            datetime=datetime.datetime.now()
+        )
+
+        self.probeversion = admin_models.ProbeHistory.objects.create(
+            object_id=probe,
+            name=probe.name,
+            package=probe.package,
+            comment=probe.comment,
+            version_comment='Initial version.',
+            version_user='testuser'
+        )
+
+        self.group = poem_models.GroupOfMetrics.objects.create(name='TEST')
+        self.ct = ContentType.objects.get_for_model(poem_models.Metric)
+        self.other_ct = ContentType.objects.get_for_model(
+            poem_models.MetricProfiles
+        )
+
+    def _create_metrics(self, start, stop):
+        for i in range(start, stop):
+            metric = poem_models.Metric.objects.create(
+                name=f'argo.AMS-Check-{i}',
+                group=self.group,
+                probeversion=self.probeversion.__str__()
+            )
+            poem_models.TenantHistory.objects.create(
+                object_id=metric.id,
+                serialized_data=json.dumps([{
+                    'model': 'poem.metric',
+                    'fields': {
+                        'name': metric.name,
+                        'probekey': ['ams-probe', '0.1.11']
+                    }
+                }]),
+                object_repr=metric.__str__(),
+                content_type=self.ct,
+                comment='Initial version.',
+                user='testuser'
+            )
+
+    def test_update_package_version(self):
+        self._create_metrics(0, 2)
+        metric = poem_models.Metric.objects.get(name='argo.AMS-Check-0')
+        profile_history = poem_models.TenantHistory.objects.create(
+            object_id=metric.id,
+            serialized_data=json.dumps([{'fields': {'name': 'PROFILE'}}]),
+            object_repr='PROFILE',
+            content_type=self.other_ct,
+            comment='Initial version.',
+            user='testuser'
+        )
+        self.package.version = '0.1.12'
+        self.package.save()
+        for metric in poem_models.Metric.objects.all():
+            self.assertEqual(metric.probeversion, 'ams-probe (0.1.12)')
+            self.assertEqual(metric.probe_name, 'ams-probe')
+            self.assertEqual(metric.package_version, '0.1.12')
+            history = poem_models.TenantHistory.objects.get(
+                object_id=metric.id, content_type=self.ct
+            )
+            serialized_data = json.loads(history.serialized_data)[0]
+            self.assertEqual(serialized_data['model'], 'poem.metric')
+            self.assertEqual(serialized_data['fields']['name'], metric.name)
+            self.assertEqual(
+                serialized_data['fields']['probekey'], ['ams-probe', '0.1.12']
+            )
+        profile_history.refresh_from_db()
+        self.assertEqual(
+            json.loads(profile_history.serialized_data),
+            [{'fields': {'name': 'PROFILE'}}]
+        )
+
+    def test_update_package_without_version_change(self):
+        self._create_metrics(0, 2)
+        serialized_data = dict(
+            poem_models.TenantHistory.objects.values_list(
+                'id', 'serialized_data'
+            )
+        )
+        with CaptureQueriesContext(connection) as context:
+            self.package.save()
+        for metric in poem_models.Metric.objects.all():
+            self.assertEqual(metric.probeversion, 'ams-probe (0.1.11)')
+            self.assertEqual(metric.package_version, '0.1.11')
+        self.assertFalse([
+            query for query in context.captured_queries
+            if poem_models.TenantHistory._meta.db_table in query['sql']
+        ])
+        self.assertEqual(
+            dict(
+                poem_models.TenantHistory.objects.values_list(
+                    'id', 'serialized_data'
+                )
+            ), serialized_data
+        )
+
+    def test_update_package_to_present_version(self):
+        self._create_metrics(0, 2)
+        self.package.use_present_version = True
+        self.package.save()
+        self.assertEqual(self.package.version, 'present')
+        for metric in poem_models.Metric.objects.all():
+            self.assertEqual(metric.probeversion, 'ams-probe (present)')
+            self.assertEqual(metric.package_version, 'present')
+            history = poem_models.TenantHistory.objects.get(
+                object_id=metric.id, content_type=self.ct
+            )
+            self.assertEqual(
+                json.loads(history.serialized_data)[0]['fields']['probekey'],
+                ['ams-probe', 'present']
+            )
+
+    def test_update_package_version_keeps_other_history_fields(self):
+        metric = poem_models.Metric.objects.create(
+            name='argo.AMS-Check',
+            group=self.group,
+            probeversion=self.probeversion.__str__()
+        )
+        fields = {
+            'name': metric.name,
+            'group': ['TEST'],
+            'probekey': ['ams-probe', '0.1.11'],
+            'config': '["maxCheckAttempts 3", "timeout 60", '
+                      '"path /usr/libexec/argo-monitoring/probes/argo"]',
+            'tags': [['test_tag1'], ['test_tag2']],
+            'mtype': ['Active'],
+            'description': 'Metric checking "AMS" \u2013 Čćž, 1/2\n'
+                           'with\ttab and \\ backslash',
+            'parent': '',
+            'probeexecutable': '["ams-probe"]',
+            'attribute': '["argo.ams_TOKEN --token"]',
+            'dependancy': '',
+            'flags': '["OBSESS 1"]',
+            'parameter': '["--project EGI"]'
+        }
+        serialized_data = json.dumps(
+            [{'model': 'poem.metric', 'fields': fields}]
+        )
+        history = poem_models.TenantHistory.objects.create(
+            object_id=metric.id,
+            serialized_data=serialized_data,
+            object_repr=metric.__str__(),
+            content_type=self.ct,
+            comment='Initial version.',
+            user='testuser'
+        )
+        self.package.version = '0.1.12'
+        self.package.save()
+        history.refresh_from_db()
+        self.assertEqual(
+            history.serialized_data,
+            serialized_data.replace('"0.1.11"', '"0.1.12"')
+        )
+        new_fields = serialized_data_to_dict(history.serialized_data)
+        self.assertEqual(new_fields['probekey'], ['ams-probe', '0.1.12'])
+        new_fields['probekey'] = fields['probekey']
+        self.assertEqual(new_fields, fields)
+        old_view_fields = ListTenantVersions._fields(metric, serialized_data)
+        new_view_fields = ListTenantVersions._fields(
+            metric, history.serialized_data
+        )
+        self.assertEqual(
+            new_view_fields.pop('probeversion'), 'ams-probe (0.1.12)'
+        )
+        self.assertEqual(
+            old_view_fields.pop('probeversion'), 'ams-probe (0.1.11)'
+        )
+        self.assertEqual(new_view_fields, old_view_fields)
+
+    def test_number_of_queries_does_not_depend_on_metrics(self):
+        def count_queries(version):
+            self.package.version = version
+            with CaptureQueriesContext(connection) as context:
+                self.package.save()
+            return len(context.captured_queries)
+
+        self._create_metrics(0, 5)
+        n_queries1 = count_queries('0.1.12')
+        self._create_metrics(5, 100)
+        n_queries2 = count_queries('0.1.13')
+        self.assertEqual(n_queries1, n_queries2)
+        self.assertEqual(
+            poem_models.Metric.objects.filter(
+                probeversion='ams-probe (0.1.13)'
+            ).count(), 100
+        )
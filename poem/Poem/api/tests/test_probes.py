@@ -17,7 +17,7 @@ from django_tenants.utils import schema_context, get_public_schema_name, \
 from rest_framework import status
 from rest_framework.test import force_authenticate
 
-from .utils_test import encode_data
+from .utils_test import encode_data, rendered, streamed
 
 
 class ListProbesAPIViewTests(TenantTestCase):
@@ -311,6 +311,18 @@ class ListProbesAPIViewTests(TenantTestCase):
             ]
         )
 
+    def test_get_list_of_all_probes_streaming(self):
+        request = self.factory.get(self.url)
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.superuser)
+        response = self.view(request)
+        request = self.factory.get(self.url + '?stream=true')
+        request.tenant = self.super_tenant
+        force_authenticate(request, user=self.superuser)
+        streaming_response = self.view(request)
+        self.assertTrue(streaming_response.streaming)
+        self.assertEqual(streamed(streaming_response), rendered(response))
+
     def test_get_list_of_all_probes_sp_user(self):
         request = self.factory.get(self.url)
         request.tenant = self.super_tenant
@@ -958,3 +958,85 @@ class ListTenantVersionsAPIViewTests(TenantTestCase):
                 }
             ]
         )
+
+    def test_get_metric_profile_versions_summary(self):
+        request = self.factory.get(
+            self.url + 'metricprofile/TEST_PROFILE2?summary=true'
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'metricprofile', 'TEST_PROFILE2')
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    'id': self.ver5.id,
+                    'user': 'testuser',
+                    'date_created': datetime.datetime.strftime(
+                        self.ver5.date_created, '%Y-%m-%d %H:%M:%S'
+                    ),
+                    'comment': 'Deleted service-metric instance tuple '
+                               '(APEL, org.apel.APEL-Sync). Changed groupname '
+                               'and name.',
+                    'version': datetime.datetime.strftime(
+                        self.ver5.date_created, '%Y%m%d-%H%M%S'
+                    )
+                },
+                {
+                    'id': self.ver4.id,
+                    'user': 'testuser',
+                    'date_created': datetime.datetime.strftime(
+                        self.ver4.date_created, '%Y-%m-%d %H:%M:%S'
+                    ),
+                    'comment': 'Initial version.',
+                    'version': datetime.datetime.strftime(
+                        self.ver4.date_created, '%Y%m%d-%H%M%S'
+                    )
+                }
+            ]
+        )
+
+    def test_get_metric_profile_versions_paginated(self):
+        request = self.factory.get(
+            self.url + 'metricprofile/TEST_PROFILE2?limit=1'
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'metricprofile', 'TEST_PROFILE2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']], [self.ver5.id]
+        )
+        self.assertEqual(
+            response.data['results'][0]['fields']['name'], 'TEST_PROFILE2'
+        )
+        self.assertIsNotNone(response.data['next'])
+        request = self.factory.get(response.data['next'])
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'metricprofile', 'TEST_PROFILE2')
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']], [self.ver4.id]
+        )
+        self.assertEqual(
+            response.data['results'][0]['fields']['name'], 'TEST_PROFILE'
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_get_metric_profile_versions_paginated_summary(self):
+        request = self.factory.get(
+            self.url + 'metricprofile/TEST_PROFILE2?limit=5&summary=true'
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'metricprofile', 'TEST_PROFILE2')
+        self.assertEqual(
+            [ver['id'] for ver in response.data['results']],
+            [self.ver5.id, self.ver4.id]
+        )
+        self.assertFalse('fields' in response.data['results'][0])
+        self.assertIsNone(response.data['next'])
+
+    def test_get_nonexisting_metric_version_paginated(self):
+        request = self.factory.get(self.url + 'metric/test.AMS-Check?limit=5')
+        force_authenticate(request, user=self.user)
+        response = self.view(request, 'metric', 'test.AMS-Check')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, {'detail': 'Version not found.'})
@@ -1,10 +1,19 @@
 import datetime
+import threading
+import time
 from unittest.mock import patch
 
 from Poem.api import views_internal as views
+from Poem.helpers.domain_helpers import tenant_domains
+from Poem.tenants.middleware import PoemTenantMiddleware
 from Poem.tenants.models import Tenant
 from Poem.users.models import CustUser
+from django.core.cache import cache
 from django.db import connection
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from django_tenants.utils import schema_context, get_public_schema_name, \
@@ -12,6 +21,8 @@ from django_tenants.utils import schema_context, get_public_schema_name, \
 from rest_framework import status
 from rest_framework.test import force_authenticate
 
+from .utils_test import assert_num_queries
+
 
 def mock_tenant_resources(*args, **kwargs):
     if args[0] == 'public':
@@ -30,6 +41,13 @@ def mock_tenant_resources(*args, **kwargs):
         return {'metrics': 24, 'probes': 15}
 
 
+def mock_tenants_resources(*args, **kwargs):
+    return dict(
+        (schema_name, mock_tenant_resources(schema_name))
+        for schema_name in args[0]
+    )
+
+
 class ListTenantsTests(TenantTestCase):
     def setUp(self) -> None:
         self.factory = TenantRequestFactory(self.tenant)
@@ -84,14 +102,21 @@ class ListTenantsTests(TenantTestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     @patch("Poem.api.internal_views.tenants.CombinedTenant.tenants")
-    @patch('Poem.api.internal_views.tenants.get_tenant_resources')
+    @patch('Poem.api.internal_views.tenants.get_tenants_resources')
     def test_get_all_tenants(self, mock_resources, mock_tenants):
-        mock_resources.side_effect = mock_tenant_resources
+        mock_resources.side_effect = mock_tenants_resources
         mock_tenants.return_value = ["TEST1", "TEST2"]
         request = self.factory.get(self.url)
         force_authenticate(request, user=self.user)
         response = self.view(request)
-        self.assertEqual(mock_resources.call_count, 5)
+        self.assertEqual(mock_resources.call_count, 1)
+        self.assertEqual(
+            sorted(mock_resources.call_args[0][0]),
+            sorted([
+                self.tenant.schema_name, "combined", get_public_schema_name(),
+                "test1", "test2"
+            ])
+        )
         self.assertEqual(
             response.data,
             [
@@ -154,9 +179,54 @@ class ListTenantsTests(TenantTestCase):
             ]
         )
 
-    @patch('Poem.api.internal_views.tenants.get_tenant_resources')
+    @override_settings(WEBAPI_MAX_WORKERS=8)
+    @patch("Poem.api.internal_views.tenants.CombinedTenant.tenants")
+    @patch('Poem.api.internal_views.tenants.get_tenants_resources')
+    def test_get_all_tenants_scaling(self, mock_resources, mock_tenants):
+        threads = set()
+
+        def mock_combined_tenants():
+            threads.add(threading.get_ident())
+            time.sleep(0.01)
+            return ["TEST1", "TEST2"]
+
+        mock_resources.side_effect = mock_tenants_resources
+        mock_tenants.side_effect = mock_combined_tenants
+
+        def count_queries():
+            request = self.factory.get(self.url)
+            force_authenticate(request, user=self.user)
+            with CaptureQueriesContext(connection) as context:
+                response = self.view(request)
+            return len(context.captured_queries), len(response.data)
+
+        n_queries1, n_tenants1 = count_queries()
+        with schema_context(get_public_schema_name()):
+            for i in range(50):
+                tenant = Tenant(
+                    name=f"SYNTHETIC{i}", schema_name=f"synthetic{i}",
+                    combined=i % 5 == 0
+                )
+                tenant.auto_create_schema = False
+                tenant.save()
+                get_tenant_domain_model().objects.create(
+                    domain=f"synthetic{i}.domain.url", tenant=tenant,
+                    is_primary=True
+                )
+        threads.clear()
+        n_queries2, n_tenants2 = count_queries()
+        self.assertEqual(n_tenants1, 5)
+        self.assertEqual(n_tenants2, 55)
+        self.assertEqual(n_queries1, n_queries2)
+        self.assertEqual(mock_resources.call_count, 2)
+        self.assertEqual(mock_tenants.call_count, 12)
+        self.assertGreater(len(threads), 1)
+
+    @patch('Poem.api.internal_views.tenants.get_tenants_resources')
     def test_get_tenant_by_name(self, mock_resources):
-        mock_resources.return_value = {'metrics': 24, 'probes': 15}
+        mock_resources.return_value = {
+            'test1': {'metrics': 24, 'probes': 15}
+        }
         request = self.factory.get(self.url + 'TEST1')
         force_authenticate(request, user=self.user)
         response = self.view(request, 'TEST1')
@@ -174,11 +244,13 @@ class ListTenantsTests(TenantTestCase):
                 "combined": False
             }
         )
-        mock_resources.assert_called_once_with('test1')
+        mock_resources.assert_called_once_with(['test1'])
 
-    @patch('Poem.api.internal_views.tenants.get_tenant_resources')
+    @patch('Poem.api.internal_views.tenants.get_tenants_resources')
     def test_get_public_schema_tenant_by_name(self, mock_resources):
-        mock_resources.return_value = {'metric_templates': 354, 'probes': 112}
+        mock_resources.return_value = {
+            get_public_schema_name(): {'metric_templates': 354, 'probes': 112}
+        }
         request = self.factory.get(self.url + 'SuperPOEM_Tenant')
         force_authenticate(request, user=self.user)
         response = self.view(request, 'SuperPOEM_Tenant')
@@ -196,9 +268,9 @@ class ListTenantsTests(TenantTestCase):
                 "combined": False
             }
         )
-        mock_resources.assert_called_once_with(get_public_schema_name())
+        mock_resources.assert_called_once_with([get_public_schema_name()])
 
-    @patch('Poem.api.internal_views.tenants.get_tenant_resources')
+    @patch('Poem.api.internal_views.tenants.get_tenants_resources')
     def test_get_tenant_by_nonexisting_name(self, mock_resources):
         request = self.factory.get(self.url + 'nonexisting')
         force_authenticate(request, user=self.user)
@@ -269,3 +341,82 @@ class ListTenantsTests(TenantTestCase):
         self.assertEqual(Tenant.objects.all().count(), 5)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['detail'], 'Tenant not found.')
+
+
+class PoemTenantMiddlewareTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        tenant_domains.clear()
+        self.factory = RequestFactory()
+        self.middleware = PoemTenantMiddleware(lambda r: HttpResponse())
+        self.domain = get_tenant_domain_model().objects.get(
+            tenant=self.tenant
+        )
+
+    def tearDown(self):
+        connection.set_tenant(self.tenant)
+
+    def _resolve(self, hostname=None):
+        request = self.factory.get(
+            "/", HTTP_HOST=hostname if hostname else self.domain.domain
+        )
+        self.middleware.process_request(request)
+        return request.tenant
+
+    def test_tenant_resolved_from_cache(self):
+        tenant = self._resolve()
+        self.assertEqual(tenant.schema_name, self.tenant.schema_name)
+        with assert_num_queries(self, 0):
+            tenant = self._resolve()
+        self.assertEqual(tenant.schema_name, self.tenant.schema_name)
+        self.assertEqual(tenant.domain_url, self.domain.domain)
+        self.assertEqual(tenant_domains.stats()["hits"], 1)
+        self.assertEqual(tenant_domains.stats()["misses"], 1)
+
+    def test_requests_get_their_own_tenant(self):
+        tenant = self._resolve()
+        tenant.name = "changed"
+        self.assertEqual(self._resolve().name, self.tenant.name)
+
+    def test_cache_invalidated_if_tenant_changed(self):
+        self._resolve()
+        # class level tenant is shared by all the tests, change its copy
+        tenant = Tenant.objects.get(pk=self.tenant.pk)
+        tenant.name = "TENANT_CHANGED"
+        tenant.save()
+        self.assertEqual(self._resolve().name, "TENANT_CHANGED")
+        self.assertEqual(tenant_domains.stats()["misses"], 2)
+
+    def test_cache_invalidated_if_domain_changed(self):
+        self._resolve()
+        self.domain.domain = "new.tenant.test.com"
+        self.domain.save()
+        with self.settings(ALLOWED_HOSTS=["new.tenant.test.com"]):
+            tenant = self._resolve("new.tenant.test.com")
+        self.assertEqual(tenant.schema_name, self.tenant.schema_name)
+        self.assertEqual(tenant_domains.stats()["entries"], 1)
+
+    def test_middleware_overhead_benchmark(self):
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            tenant_domains.clear()
+            self._resolve()
+        uncached = (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        with assert_num_queries(self, 0):
+            for _ in range(runs):
+                self._resolve()
+        cached = (time.perf_counter() - start) / runs
+
+        # resolving cached tenant is a single cache read, with no queries
+        self.assertLess(cached, uncached)
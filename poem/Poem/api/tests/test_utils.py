@@ -3,8 +3,10 @@ import json
 from unittest.mock import patch
 
 import factory.django
+import requests
 from Poem.api.internal_views.utils import sync_webapi, \
-    get_tenant_resources, sync_tags_webapi, WebApiException
+    get_tenant_resources, get_tenants_resources, sync_tags_webapi, \
+    WebApiException
 from Poem.helpers.history_helpers import create_comment
 from Poem.helpers.history_helpers import serialize_metric
 from Poem.poem import models as poem_models
@@ -13,12 +15,17 @@ from Poem.poem_super_admin.models import WebAPIKey
 from Poem.users.models import CustUser
 from django.contrib.contenttypes.models import ContentType
 from django.core import serializers
+from django.core.cache import cache
+from django.db import connection
 from django.db.models.signals import pre_save
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.utils import get_public_schema_name
 
 from .test_views import mock_db_for_metrics_tests
-from .utils_test import mocked_web_api_request, MockResponse
+from .utils_test import mocked_web_api_request, MockResponse, \
+    assert_num_queries
 
 
 def mocked_put_response(*args, **kwargs):
@@ -59,6 +66,19 @@ def mocked_put_response_not_ok_no_msg(*args, **kwargs):
 
 class SyncWebApiTests(TenantTestCase):
     def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                }
+            },
+            WEBAPI_CACHE_TIMEOUT=0,
+            WEBAPI_SYNC_INTERVAL=0
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
         self.tenant.name = "TENANT"
         self.tenant.save()
         ct_mp = ContentType.objects.get_for_model(poem_models.MetricProfiles)
@@ -151,7 +171,7 @@ class SyncWebApiTests(TenantTestCase):
             groupname='EGI'
         )
 
-    @patch('requests.get')
+    @patch('Poem.api.internal_views.utils.webapi.get')
     def test_sync_webapi_metricprofiles(self, func):
         func.side_effect = mocked_web_api_request
         self.assertEqual(poem_models.MetricProfiles.objects.all().count(), 2)
@@ -189,7 +209,7 @@ class SyncWebApiTests(TenantTestCase):
             [['dg.3GBridge', 'eu.egi.cloud.Swift-CRUD']]
         )
 
-    @patch('requests.get')
+    @patch('Poem.api.internal_views.utils.webapi.get')
     def test_sync_webapi_aggregationprofiles(self, func):
         func.side_effect = mocked_web_api_request
         self.assertEqual(poem_models.Aggregation.objects.all().count(), 2)
@@ -205,7 +225,7 @@ class SyncWebApiTests(TenantTestCase):
         )
         self.assertTrue(poem_models.Aggregation.objects.get(name='NEW_PROFILE'))
 
-    @patch('requests.get')
+    @patch('Poem.api.internal_views.utils.webapi.get')
     def test_sync_webapi_thresholdsprofile(self, func):
         func.side_effect = mocked_web_api_request
         self.assertEqual(
@@ -227,6 +247,77 @@ class SyncWebApiTests(TenantTestCase):
             name='ANOTHER-PROFILE'
         )
 
+    @staticmethod
+    def _writes(queries):
+        return [
+            q["sql"] for q in queries.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+
+    @patch('Poem.api.internal_views.utils.webapi.get')
+    def test_sync_webapi_writes_only_changed_entries(self, func):
+        func.side_effect = mocked_web_api_request
+        sync_webapi('metric_profiles', poem_models.MetricProfiles, "TENANT")
+        with CaptureQueriesContext(connection) as queries:
+            sync_webapi(
+                'metric_profiles', poem_models.MetricProfiles, "TENANT",
+                force=True
+            )
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(self._writes(queries), [])
+        poem_models.MetricProfiles.objects.filter(id=self.mp1.id).update(
+            name='CHANGED_PROFILE', description='changed'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            sync_webapi(
+                'metric_profiles', poem_models.MetricProfiles, "TENANT",
+                force=True
+            )
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(len(self._writes(queries)), 1)
+        mp1 = poem_models.MetricProfiles.objects.get(id=self.mp1.id)
+        self.assertEqual(mp1.name, 'TEST_PROFILE')
+        self.assertEqual(mp1.description, '')
+        self.assertEqual(mp1.groupname, 'EGI')
+        self.assertEqual(poem_models.MetricProfiles.objects.count(), 2)
+
+    @override_settings(WEBAPI_SYNC_INTERVAL=60)
+    @patch('Poem.api.internal_views.utils.webapi.get')
+    def test_sync_webapi_throttled(self, func):
+        func.side_effect = mocked_web_api_request
+        sync_webapi('metric_profiles', poem_models.MetricProfiles, "TENANT")
+        sync_webapi('metric_profiles', poem_models.MetricProfiles, "TENANT")
+        self.assertEqual(func.call_count, 1)
+        sync_webapi('aggregation_profiles', poem_models.Aggregation, "TENANT")
+        self.assertEqual(func.call_count, 2)
+        poem_models.MetricProfiles.objects.filter(id=self.mp1.id).update(
+            name='CHANGED_PROFILE'
+        )
+        sync_webapi(
+            'metric_profiles', poem_models.MetricProfiles, "TENANT",
+            force=True
+        )
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(
+            poem_models.MetricProfiles.objects.get(id=self.mp1.id).name,
+            'TEST_PROFILE'
+        )
+
+    @override_settings(WEBAPI_SYNC_INTERVAL=60)
+    @patch('Poem.api.internal_views.utils.webapi.get')
+    def test_sync_webapi_retried_after_failure(self, func):
+        func.side_effect = requests.exceptions.ConnectionError
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            sync_webapi(
+                'metric_profiles', poem_models.MetricProfiles, "TENANT"
+            )
+        func.side_effect = mocked_web_api_request
+        sync_webapi('metric_profiles', poem_models.MetricProfiles, "TENANT")
+        self.assertEqual(func.call_count, 2)
+        self.assertTrue(
+            poem_models.MetricProfiles.objects.get(name='NEW_PROFILE')
+        )
+
 
 class SyncWebApiTagsTests(TenantTestCase):
     def setUp(self) -> None:
@@ -240,7 +331,7 @@ class SyncWebApiTagsTests(TenantTestCase):
             token='mocked_token'
         )
 
-    @patch("requests.put")
+    @patch("Poem.api.internal_views.utils.webapi.put")
     def test_sync_tags(self, mock_put):
         with self.settings(
             WEBAPI_METRICSTAGS="https://metric.tags.com"
@@ -287,7 +378,7 @@ class SyncWebApiTagsTests(TenantTestCase):
                 ])
             )
 
-    @patch("requests.put")
+    @patch("Poem.api.internal_views.utils.webapi.put")
     def test_sync_tags_with_error(self, mock_put):
         with self.settings(
             WEBAPI_METRICSTAGS="https://metric.tags.com"
@@ -341,7 +432,7 @@ class SyncWebApiTagsTests(TenantTestCase):
                 "There has been an error"
             )
 
-    @patch("requests.put")
+    @patch("Poem.api.internal_views.utils.webapi.put")
     def test_sync_tags_with_error_without_msg(self, mock_put):
         with self.settings(
             WEBAPI_METRICSTAGS="https://metric.tags.com"
@@ -662,3 +753,26 @@ class BasicResourceInfoTests(TenantTestCase):
     def test_get_resourece_info_for_super_poem_tenant(self):
         data = get_tenant_resources(get_public_schema_name())
         self.assertEqual(data, {'metric_templates': 3, 'probes': 2})
+
+    def test_get_resource_info_for_multiple_tenants(self):
+        # existing tables are looked up, and then counted in one query
+        with assert_num_queries(self, 2):
+            data = get_tenants_resources(['test', get_public_schema_name()])
+        self.assertEqual(
+            data, {
+                'test': {'metrics': 2, 'probes': 1},
+                get_public_schema_name(): {'metric_templates': 3, 'probes': 2}
+            }
+        )
+
+    def test_get_resource_info_for_tenant_without_schema(self):
+        data = get_tenants_resources(['test', 'nonexisting'])
+        self.assertEqual(
+            data, {
+                'test': {'metrics': 2, 'probes': 1},
+                'nonexisting': {'metrics': 0, 'probes': 0}
+            }
+        )
+        self.assertEqual(
+            get_tenant_resources('nonexisting'), {'metrics': 0, 'probes': 0}
+        )
@@ -8,11 +8,17 @@ from Poem.api.models import MyAPIKey
 from Poem.poem import models as poem_models
 from Poem.poem_super_admin import models as admin_models
 from django.core import mail
+from django.core.cache import cache
+from django.db import connection
 from django.db.models.signals import post_save, pre_save
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantRequestFactory
 from rest_framework import status
 
+from .utils_test import rendered, streamed
+
 
 def mock_function(*args):
     if args[0] == 'ARGO-MON':
@@ -353,6 +359,64 @@ def mock_db_for_metrics_tests():
     )
 
 
+@factory.django.mute_signals(pre_save, post_save)
+def mock_db_for_metrics_scaling(start, stop):
+    active = admin_models.MetricTemplateType.objects.get(name="Active")
+    probekey = admin_models.ProbeHistory.objects.get(
+        name="ams-probe", package__version="0.1.12"
+    )
+    tag = admin_models.MetricTags.objects.get(name="test_tag1")
+    group = poem_models.GroupOfMetrics.objects.get(name="EOSC")
+
+    mts = admin_models.MetricTemplate.objects.bulk_create([
+        admin_models.MetricTemplate(
+            name=f"test.Scaling-{i}",
+            mtype=active,
+            probekey=probekey,
+            probeexecutable='["ams-probe"]',
+            config='["maxCheckAttempts 3", "timeout 60"]'
+        ) for i in range(start, stop)
+    ])
+    mts = admin_models.MetricTemplate.objects.filter(
+        name__in=[mt.name for mt in mts]
+    )
+    admin_models.MetricTemplate.tags.through.objects.bulk_create([
+        admin_models.MetricTemplate.tags.through(
+            metrictemplate_id=mt.id, metrictags_id=tag.id
+        ) for mt in mts
+    ])
+    admin_models.MetricTemplateHistory.objects.bulk_create([
+        admin_models.MetricTemplateHistory(
+            object_id=mt,
+            name=mt.name,
+            mtype=mt.mtype,
+            probekey=mt.probekey,
+            probeexecutable=mt.probeexecutable,
+            config=mt.config,
+            version_user="poem",
+            version_comment="Initial version."
+        ) for mt in mts
+    ])
+    history = admin_models.MetricTemplateHistory.objects.filter(
+        name__in=[mt.name for mt in mts]
+    )
+    admin_models.MetricTemplateHistory.tags.through.objects.bulk_create([
+        admin_models.MetricTemplateHistory.tags.through(
+            metrictemplatehistory_id=mt.id, metrictags_id=tag.id
+        ) for mt in history
+    ])
+    poem_models.Metric.objects.bulk_create([
+        poem_models.Metric(
+            name=mt.name,
+            group=group,
+            probeversion=probekey.__str__(),
+            probe_name=probekey.name,
+            package_version=probekey.package.version,
+            config=mt.config
+        ) for mt in mts
+    ])
+
+
 @factory.django.mute_signals(pre_save, post_save)
 def mock_db_for_repos_tests():
     tag1 = admin_models.OSTag.objects.create(name='CentOS 6')
@@ -759,6 +823,60 @@ def mock_db_for_repos_tests():
     )
 
 
+@factory.django.mute_signals(pre_save, post_save)
+def mock_db_for_repos_scaling(start, stop):
+    repo = admin_models.YumRepo.objects.get(
+        name="repo-1", tag__name="CentOS 7"
+    )
+    packages = admin_models.Package.objects.bulk_create([
+        admin_models.Package(name=f"nagios-plugins-scaling-{i}", version="1.0")
+        for i in range(start, stop)
+    ])
+    packages = admin_models.Package.objects.filter(
+        name__in=[package.name for package in packages]
+    )
+    admin_models.Package.repos.through.objects.bulk_create([
+        admin_models.Package.repos.through(
+            package_id=package.id, yumrepo_id=repo.id
+        ) for package in packages
+    ])
+    probes = admin_models.Probe.objects.bulk_create([
+        admin_models.Probe(
+            name=package.name.replace("nagios-plugins-", "probe-"),
+            package=package,
+            description="Scaling probe.",
+            comment="Initial version.",
+            repository="https://github.com/ARGOeu",
+            docurl="https://github.com/ARGOeu"
+        ) for package in packages
+    ])
+    probes = admin_models.Probe.objects.filter(
+        name__in=[probe.name for probe in probes]
+    )
+    admin_models.ProbeHistory.objects.bulk_create([
+        admin_models.ProbeHistory(
+            object_id=probe,
+            name=probe.name,
+            package=probe.package,
+            description=probe.description,
+            comment=probe.comment,
+            repository=probe.repository,
+            docurl=probe.docurl,
+            version_comment="Initial version.",
+            version_user="testuser"
+        ) for probe in probes.select_related("package")
+    ])
+    poem_models.Metric.objects.bulk_create([
+        poem_models.Metric(
+            name=f"test.Scaling-{probe.name}",
+            probeversion=f"{probe.name} (1.0)",
+            probe_name=probe.name,
+            package_version="1.0",
+            config='["maxCheckAttempts 3", "timeout 60"]'
+        ) for probe in probes
+    ])
+
+
 def create_credentials():
     obj, key = MyAPIKey.objects.create_key(name='EGI')
     return obj.token
@@ -911,6 +1029,21 @@ class ListMetricsAPIViewTests(TenantTestCase):
             ['argo.AMSPublisher-Check', 'hr.srce.CertLifetime-Local']
         )
 
+    def test_list_metrics_streaming(self):
+        mock_db_for_metrics_scaling(0, 30)
+        request = self.factory.get(self.url, **{'HTTP_X_API_KEY': self.token})
+        response = self.view(request)
+        request = self.factory.get(
+            self.url + '?stream=true', **{'HTTP_X_API_KEY': self.token}
+        )
+        streaming_response = self.view(request)
+        self.assertEqual(streaming_response.status_code, status.HTTP_200_OK)
+        self.assertTrue(streaming_response.streaming)
+        self.assertEqual(
+            streaming_response["Content-Type"], "application/json"
+        )
+        self.assertEqual(streamed(streaming_response), rendered(response))
+
     def test_get_metrics_if_no_tagged_metrics(self):
         request = self.factory.get(
             self.url + '/empty_tag', **{'HTTP_X_API_KEY': self.token}
@@ -1244,6 +1377,36 @@ class ListReposAPIViewTests(TenantTestCase):
             }
         )
 
+    @patch('Poem.api.views.get_metrics_from_profile')
+    def test_list_repos_number_of_queries_does_not_depend_on_packages(
+            self, mock_get_metrics
+    ):
+        mock_get_metrics.side_effect = lambda *args: set(
+            poem_models.Metric.objects.filter(
+                name__startswith="test.Scaling-"
+            ).values_list("name", flat=True)
+        )
+
+        def count_queries():
+            request = self.factory.get(
+                self.url + '/centos7',
+                **{'HTTP_X_API_KEY': self.token,
+                   'HTTP_PROFILES': '[SCALING]'}
+            )
+            request.tenant = self.tenant
+            with CaptureQueriesContext(connection) as context:
+                response = self.view(request, 'centos7')
+            return len(context.captured_queries), \
+                len(response.data['data']['repo-1']['packages'])
+
+        mock_db_for_repos_scaling(0, 10)
+        n_queries1, n_packages1 = count_queries()
+        mock_db_for_repos_scaling(10, 200)
+        n_queries2, n_packages2 = count_queries()
+        self.assertEqual(n_packages1, 10)
+        self.assertEqual(n_packages2, 200)
+        self.assertEqual(n_queries1, n_queries2)
+
 
 class ListReposInternalAPIViewTests(TenantTestCase):
     def setUp(self):
@@ -1468,6 +1631,16 @@ class ListMetricTemplateAPIViewTests(TenantTestCase):
             ['argo.AMSPublisher-Check', 'hr.srce.CertLifetime-Local']
         )
 
+    def test_list_metric_templates_streaming(self):
+        request = self.factory.get(self.url, **{'HTTP_X_API_KEY': self.token})
+        response = self.view(request)
+        request = self.factory.get(
+            self.url + '?stream=true', **{'HTTP_X_API_KEY': self.token}
+        )
+        streaming_response = self.view(request)
+        self.assertTrue(streaming_response.streaming)
+        self.assertEqual(streamed(streaming_response), rendered(response))
+
     def test_get_metric_templates_if_no_tagged_metrics(self):
         request = self.factory.get(
             self.url + '/empty_tag', **{'HTTP_X_API_KEY': self.token}
@@ -1556,6 +1729,16 @@ class ListMetricConfigurationAPIViewTests(TenantTestCase):
         )
 
 
+    def test_list_metric_overrides_streaming(self):
+        request = self.factory.get(self.url, **{'HTTP_X_API_KEY': self.token})
+        response = self.view(request)
+        request = self.factory.get(
+            self.url + '?stream=true', **{'HTTP_X_API_KEY': self.token}
+        )
+        streaming_response = self.view(request)
+        self.assertTrue(streaming_response.streaming)
+        self.assertEqual(streamed(streaming_response), rendered(response))
+
 class ListDefaultPortsTests(TenantTestCase):
     def setUp(self):
         self.token = create_credentials()
@@ -1593,6 +1776,118 @@ class ListDefaultPortsTests(TenantTestCase):
         )
 
 
+class ConditionalAPIResponseTests(TenantTestCase):
+    def setUp(self):
+        # TenantTestCase does not apply class level settings overrides
+        override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.token = create_credentials()
+        self.factory = TenantRequestFactory(self.tenant)
+        cache.clear()
+
+        mock_db_for_metrics_tests()
+        admin_models.DefaultPort.objects.create(name="BDII_PORT", value="2170")
+
+    def _get(self, view, url, etag=None):
+        headers = {"HTTP_X_API_KEY": self.token}
+        if etag:
+            headers["HTTP_IF_NONE_MATCH"] = etag
+        return view.as_view()(self.factory.get(url, **headers))
+
+    def test_response_has_etag_and_cache_control(self):
+        for view, url in [
+            (views.ListMetrics, "/api/v2/metrics"),
+            (views.ListMetricTemplates, "/api/v2/metrictemplates"),
+            (views.ListMetricOverrides, "/api/v2/metricoverrides"),
+            (views.ListDefaultPorts, "/api/v2/default_ports")
+        ]:
+            response = self._get(view, url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response["ETag"].startswith('"'))
+            self.assertIn("must-revalidate", response["Cache-Control"])
+            self.assertIn("private", response["Cache-Control"])
+            self.assertIn("X-Api-Key", response["Vary"])
+
+    def test_not_modified_if_etag_matches(self):
+        response = self._get(views.ListMetrics, "/api/v2/metrics")
+        etag = response["ETag"]
+        with patch.object(views.ListMetrics, "_get") as mock_get:
+            with CaptureQueriesContext(connection) as queries:
+                response = self._get(
+                    views.ListMetrics, "/api/v2/metrics", etag=etag
+                )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(mock_get.called)
+        self.assertFalse(
+            [q for q in queries.captured_queries if "poem_metric" in q["sql"]]
+        )
+
+    def test_weak_and_multiple_etags_match(self):
+        etag = self._get(views.ListMetrics, "/api/v2/metrics")["ETag"]
+        response = self._get(
+            views.ListMetrics, "/api/v2/metrics", etag=f'"other", W/{etag}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_etag_returns_content(self):
+        response = self._get(
+            views.ListMetrics, "/api/v2/metrics", etag='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(len(response.data) > 0)
+
+    def test_etag_differs_per_path(self):
+        etag1 = self._get(views.ListMetrics, "/api/v2/metrics")["ETag"]
+        etag2 = self._get(
+            views.ListMetrics, "/api/v2/metrics?stream=true"
+        )["ETag"]
+        self.assertNotEqual(etag1, etag2)
+
+    def test_etag_changes_if_metric_changes(self):
+        etag = self._get(views.ListMetrics, "/api/v2/metrics")["ETag"]
+        poem_models.Metric.objects.all()[0].save()
+        response = self._get(views.ListMetrics, "/api/v2/metrics", etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_if_metric_override_changes(self):
+        url = "/api/v2/metricoverrides"
+        etag = self._get(views.ListMetricOverrides, url)["ETag"]
+        poem_models.MetricConfiguration.objects.create(
+            name="etag-test", globalattribute="", hostattribute="",
+            metricparameter=""
+        )
+        response = self._get(views.ListMetricOverrides, url, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_if_default_port_changes(self):
+        url = "/api/v2/default_ports"
+        etag = self._get(views.ListDefaultPorts, url)["ETag"]
+        admin_models.DefaultPort.objects.create(name="GRAM_PORT", value="2119")
+        response = self._get(views.ListDefaultPorts, url, etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            response.data, {"BDII_PORT": "2170", "GRAM_PORT": "2119"}
+        )
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    })
+    def test_no_etag_without_cache(self):
+        response = self._get(views.ListMetrics, "/api/v2/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertIn("must-revalidate", response["Cache-Control"])
+
+
 class ProbeCandidateAPITests(TenantTestCase):
     def setUp(self) -> None:
         self.token = create_credentials()
@@ -1,7 +1,12 @@
 import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import requests
+from django.db import connection
 from django.test.client import encode_multipart
+from django.test.utils import CaptureQueriesContext
 
 
 def mocked_func(*args, **kwargs):
@@ -30,15 +35,20 @@ def mocked_inline_metric_for_db(data):
 
 
 class MockResponse:
-    def __init__(self, data, status_code):
+    def __init__(self, data, status_code, headers=None):
         self.data = data
         self.status_code = status_code
+        self.headers = headers if headers else dict()
         self.ok = False
 
         if self.status_code == 200:
             self.reason = 'OK'
             self.ok = True
 
+        elif self.status_code == 304:
+            self.reason = "Not Modified"
+            self.ok = True
+
         elif self.status_code == 400:
             self.reason = "BAD REQUEST"
 
@@ -61,7 +71,7 @@ class MockResponse:
                 raise
 
     def raise_for_status(self):
-        if self.status_code == 200:
+        if self.status_code in [200, 304]:
             return ''
 
         elif self.status_code == 401:
@@ -356,3 +366,100 @@ def mocked_web_api_data_feed_wrong_token(*args, **kwargs):
             }
         }, 401
     )
+
+
+class StubWebApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        status_code = 200
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+            if self.server.statuses:
+                status_code = self.server.statuses.pop(0)
+
+        body = json.dumps(self.server.data).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWebApiServer(ThreadingHTTPServer):
+    """
+    Local WEB-API stub used to test connection handling; it responds with
+    the given data and counts accepted TCP connections. Status codes in
+    statuses are returned for the first requests, 200 afterwards.
+    """
+    def __init__(self, data, statuses=None):
+        super().__init__(("127.0.0.1", 0), StubWebApiHandler)
+        self.data = data
+        self.statuses = list(statuses) if statuses else []
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://{}:{}/api/v2/metric_profiles".format(
+            *self.server_address
+        )
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+
+        super().process_request(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+def rendered(response):
+    response.render()
+    return response.content
+
+
+def streamed(response):
+    return b"".join(response.streaming_content)
+
+
+def executed_queries(context):
+    """
+    Returns queries captured by CaptureQueriesContext, without the search
+    path changes which django-tenants does before every query.
+    """
+    return [
+        query for query in context.captured_queries
+        if not query["sql"].startswith("SET search_path")
+    ]
+
+
+@contextmanager
+def assert_num_queries(test, num):
+    with CaptureQueriesContext(connection) as context:
+        yield context
+
+    queries = executed_queries(context)
+    test.assertEqual(
+        len(queries), num, "\n".join(query["sql"] for query in queries)
+    )
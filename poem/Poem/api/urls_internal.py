@@ -96,5 +96,7 @@ urlpatterns = [
     path("public_default_ports/", views_internal.ListPublicDefaultPorts.as_view(), name="default_ports"),
     path("probecandidates/", views_internal.ListProbeCandidates.as_view(), name="probecandidates"),
     path("probecandidates/<str:cid>", views_internal.ListProbeCandidates.as_view(), name="probecandidates"),
-    path("probecandidatestatuses/", views_internal.ListProbeCandidateStatuses.as_view(), name="probecandidatestatus")
+    path("probecandidatestatuses/", views_internal.ListProbeCandidateStatuses.as_view(), name="probecandidatestatus"),
+    path("jobs/<int:job_id>", views_internal.ListJobs.as_view(), name="jobs"),
+    path("cachestats/", views_internal.GetCacheStats.as_view(), name="cachestats")
 ]
@@ -1,10 +1,16 @@
 import json
 
-import requests
 from Poem.api.internal_views.utils import error_response
 from Poem.api.internal_views.utils import one_value_inline, \
     two_value_inline_dict
 from Poem.api.permissions import MyHasAPIKey
+from Poem.helpers.catalogue_helpers import catalogue_cache
+from Poem.helpers.etag_helpers import conditional_response
+from Poem.helpers.metrics_helpers import get_metric_templates, \
+    get_probes_for_metrics
+from Poem.helpers.streaming_helpers import streaming_requested, \
+    queryset_chunks, streaming_list_response, streaming_dict_response
+from Poem.helpers.webapi_helpers import get_webapi_data
 from Poem.poem import models
 from Poem.poem_super_admin import models as admin_models
 from Poem.poem_super_admin.models import WebAPIKey
@@ -25,119 +31,121 @@ class NotFound(APIException):
         self.code = code if code else detail
 
 
-def build_metricconfigs(templates=False):
-    ret = []
+def _metricconfig(m, mt):
+    mdict = dict()
+    mdict.update({m.name: dict()})
 
-    if templates:
-        metricsobjs = admin_models.MetricTemplate.objects.all().order_by('name')
+    config = two_value_inline_dict(m.config)
 
-    else:
-        metricsobjs = models.Metric.objects.all().order_by('name')
+    parent = one_value_inline(mt.parent)
+    probeexecutable = one_value_inline(mt.probeexecutable)
+    attribute = two_value_inline_dict(mt.attribute)
+    dependency = two_value_inline_dict(mt.dependency)
+    flags = two_value_inline_dict(mt.flags)
+    parameter = two_value_inline_dict(mt.parameter)
 
-    for m in metricsobjs:
-        mdict = dict()
-        mdict.update({m.name: dict()})
+    tags = sorted([tag.name for tag in mt.tags.all()])
 
-        config = two_value_inline_dict(m.config)
+    docurl = mt.probekey.docurl if mt.probekey else ""
 
-        if templates:
-            parent = one_value_inline(m.parent)
-            probeexecutable = one_value_inline(m.probeexecutable)
-            attribute = two_value_inline_dict(m.attribute)
-            dependency = two_value_inline_dict(m.dependency)
-            flags = two_value_inline_dict(m.flags)
-            parameter = two_value_inline_dict(m.parameter)
+    mdict[m.name].update({"tags": tags})
 
-            tags = sorted([tag.name for tag in m.tags.all()])
+    if probeexecutable:
+        mdict[m.name].update({'probe': probeexecutable})
+    else:
+        mdict[m.name].update({'probe': ''})
 
-            docurl = m.probekey.docurl if m.probekey else ""
+    if config:
+        mdict[m.name].update({'config': config})
+    else:
+        mdict[m.name].update({'config': dict()})
 
-        else:
-            try:
-                if m.probeversion:
-                    probeversion = m.probeversion.split("(")
-                    probe_name = probeversion[0].strip()
-                    probe_version = probeversion[1][:-1].strip()
-                    probe = admin_models.ProbeHistory.objects.get(
-                        name=probe_name, package__version=probe_version
-                    )
-                    mt = admin_models.MetricTemplateHistory.objects.get(
-                        name=m.name, probekey=probe
-                    )
+    if flags:
+        mdict[m.name].update({'flags': flags})
+    else:
+        mdict[m.name].update({'flags': dict()})
 
-                else:
-                    mt = admin_models.MetricTemplate.objects.get(name=m.name)
+    if dependency:
+        mdict[m.name].update({'dependency': dependency})
+    else:
+        mdict[m.name].update({'dependency': dict()})
+
+    if attribute:
+        mdict[m.name].update({'attribute': attribute})
+    else:
+        mdict[m.name].update({'attribute': dict()})
 
-                parent = one_value_inline(mt.parent)
-                probeexecutable = one_value_inline(mt.probeexecutable)
-                attribute = two_value_inline_dict(mt.attribute)
-                dependency = two_value_inline_dict(mt.dependency)
-                flags = two_value_inline_dict(mt.flags)
-                parameter = two_value_inline_dict(mt.parameter)
+    if parameter:
+        mdict[m.name].update({'parameter': parameter})
+    else:
+        mdict[m.name].update({'parameter': dict()})
 
-                tags = sorted([tag.name for tag in mt.tags.all()])
+    if parent:
+        mdict[m.name].update({'parent': parent})
+    else:
+        mdict[m.name].update({'parent': ''})
 
-                docurl = mt.probekey.docurl if mt.probekey else ""
+    if docurl:
+        mdict[m.name].update({'docurl': docurl})
+    else:
+        mdict[m.name].update({'docurl': ''})
 
-            except admin_models.MetricTemplateHistory.DoesNotExist:
-                continue
+    return mdict
 
-        mdict[m.name].update({"tags": tags})
 
-        if probeexecutable:
-            mdict[m.name].update({'probe': probeexecutable})
-        else:
-            mdict[m.name].update({'probe': ''})
+def _metricconfigs(chunks, templates=False):
+    """
+    Yields metric configurations of metrics (or metric templates) given in
+    chunks, resolving metric templates of tenant metrics chunk by chunk.
+    """
+    for metricsobjs in chunks:
+        if templates:
+            for m in metricsobjs:
+                yield _metricconfig(m, m)
 
-        if config:
-            mdict[m.name].update({'config': config})
         else:
-            mdict[m.name].update({'config': dict()})
+            metrictemplates = get_metric_templates(metricsobjs)
+            for m in metricsobjs:
+                if m.name in metrictemplates:
+                    yield _metricconfig(m, metrictemplates[m.name])
 
-        if flags:
-            mdict[m.name].update({'flags': flags})
-        else:
-            mdict[m.name].update({'flags': dict()})
 
-        if dependency:
-            mdict[m.name].update({'dependency': dependency})
-        else:
-            mdict[m.name].update({'dependency': dict()})
+def _metricconfigs_queryset(templates=False):
+    if templates:
+        return admin_models.MetricTemplate.objects.all().select_related(
+            "probekey"
+        ).prefetch_related("tags").order_by('name')
 
-        if attribute:
-            mdict[m.name].update({'attribute': attribute})
-        else:
-            mdict[m.name].update({'attribute': dict()})
+    else:
+        return models.Metric.objects.all().order_by('name')
 
-        if parameter:
-            mdict[m.name].update({'parameter': parameter})
-        else:
-            mdict[m.name].update({'parameter': dict()})
 
-        if parent:
-            mdict[m.name].update({'parent': parent})
-        else:
-            mdict[m.name].update({'parent': ''})
+def _build_metricconfigs(templates=False):
+    return list(_metricconfigs(
+        [list(_metricconfigs_queryset(templates))], templates=templates
+    ))
 
-        if docurl:
-            mdict[m.name].update({'docurl': docurl})
-        else:
-            mdict[m.name].update({'docurl': ''})
 
-        ret.append(mdict)
+def build_metricconfigs(templates=False):
+    if templates:
+        return catalogue_cache.get(
+            "metricconfigs", lambda: _build_metricconfigs(templates=True)
+        )
+
+    return _build_metricconfigs()
+
 
-    return ret
+def stream_metricconfigs(templates=False):
+    return _metricconfigs(
+        queryset_chunks(_metricconfigs_queryset(templates)),
+        templates=templates
+    )
 
 
 def get_metrics_from_profile(profile, tenant):
     token = WebAPIKey.objects.get(name=f"WEB-API-{tenant}-RO")
 
-    headers = {'Accept': 'application/json', 'x-api-key': token.token}
-    response = requests.get(
-        settings.WEBAPI_METRIC, headers=headers, timeout=180
-    )
-    response.raise_for_status()
-    data = response.json()['data']
+    data = get_webapi_data(settings.WEBAPI_METRIC, tenant, token.token)
 
     metrics = set()
     if data:
@@ -160,6 +168,9 @@ class ListMetrics(APIView):
     permission_classes = (MyHasAPIKey,)
 
     def get(self, request, tag=None):
+        return conditional_response(request, lambda: self._get(request, tag))
+
+    def _get(self, request, tag=None):
         if tag:
             try:
                 admin_models.MetricTags.objects.get(name=tag)
@@ -181,6 +192,9 @@ class ListMetrics(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
+        elif streaming_requested(request):
+            return streaming_list_response(stream_metricconfigs())
+
         else:
             return Response(build_metricconfigs())
 
@@ -189,44 +203,32 @@ class Repos(APIView):
     permission_classes = (MyHasAPIKey,)
 
     def _get_packages(self, tag, metrics):
-        try:
-            ostag = [
-                t for t in admin_models.OSTag.objects.all() if
-                t.name.lower().replace(" ", "") == tag
-            ][0]
-
-        except IndexError:
+        ostag = admin_models.OSTag.objects.filter(normalized_name=tag).first()
+        if not ostag:
             raise NotFound(status=404, detail='YUM repo tag not found.')
 
-        packages = set()
-        for metric in metrics:
-            try:
-                m = models.Metric.objects.get(name=metric)
-                if m.probeversion:
-                    probeversion = m.probeversion.split("(")
-                    probe_name = probeversion[0].strip()
-                    probe_version = probeversion[1][:-1].strip()
-                    probe = admin_models.ProbeHistory.objects.get(
-                        name=probe_name, package__version=probe_version
-                    )
-                    packages.add(probe.package)
+        probes = get_probes_for_metrics(
+            models.Metric.objects.filter(
+                name__in=metrics, probe_name__isnull=False
+            )
+        )
+        packages = set([probe.package for probe in probes.values()])
 
-            except models.Metric.DoesNotExist:
-                pass
+        repos = dict()
+        for package_repo in admin_models.Package.repos.through.objects.filter(
+            package__in=packages, yumrepo__tag=ostag
+        ).select_related("yumrepo").order_by("yumrepo__id"):
+            repos.setdefault(package_repo.package_id, package_repo.yumrepo)
 
         data = dict()
         packagedict = dict()
         missing_packages = []
         for package in packages:
-            try:
-                repo = package.repos.get(tag=ostag)
-
-            except admin_models.YumRepo.DoesNotExist:
-                missing_packages.append(package.__str__())
-                continue
+            if package.id in repos:
+                packagedict.update({package: repos[package.id]})
 
             else:
-                packagedict.update({package: repo})
+                missing_packages.append(package.__str__())
 
         for key, value in packagedict.items():
             if value.name not in data:
@@ -288,7 +290,10 @@ class ListRepos(Repos):
                     get_metrics_from_profile(profile, request.tenant.name)
                 )
 
-            return self._get_packages(tag=tag, metrics=metrics)
+            return conditional_response(
+                request, lambda: self._get_packages(tag=tag, metrics=metrics),
+                sorted(metrics)
+            )
 
 
 class ListReposInternal(Repos):
@@ -300,24 +305,27 @@ class ListReposInternal(Repos):
             )
 
         else:
-            internal_mt = [
-                mt.name for mt in
-                admin_models.MetricTemplate.objects.filter(
-                    tags__name="internal"
+            def get_packages():
+                internal_metrics = set(
+                    models.Metric.objects.filter(
+                        name__in=admin_models.MetricTemplate.objects.filter(
+                            tags__name="internal"
+                        ).values_list("name", flat=True)
+                    ).values_list("name", flat=True)
                 )
-            ]
-            internal_metrics = set([
-                metric.name for metric in models.Metric.objects.all() if
-                metric.name in internal_mt
-            ])
 
-            return self._get_packages(tag=tag, metrics=internal_metrics)
+                return self._get_packages(tag=tag, metrics=internal_metrics)
+
+            return conditional_response(request, get_packages)
 
 
 class ListMetricTemplates(APIView):
     permission_classes = (MyHasAPIKey,)
 
     def get(self, request, tag=None):
+        return conditional_response(request, lambda: self._get(request, tag))
+
+    def _get(self, request, tag=None):
         if tag:
             try:
                 admin_models.MetricTags.objects.get(name=tag)
@@ -331,6 +339,11 @@ class ListMetricTemplates(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
+        elif streaming_requested(request):
+            return streaming_list_response(
+                stream_metricconfigs(templates=True)
+            )
+
         else:
             return Response(build_metricconfigs(templates=True))
 
@@ -402,32 +415,39 @@ class ListMetricOverrides(APIView):
 
         return results
 
+    def _overrides(self, data):
+        for item in data:
+            yield item.name, {
+                "global_attributes": self._get_global_attributes(
+                    item.globalattribute
+                ),
+                "host_attributes": self._get_host_attributes(
+                    item.hostattribute
+                ),
+                "metric_parameters": self._get_metric_parameters(
+                    item.metricparameter
+                )
+            }
+
     def get(self, request):
-        data = models.MetricConfiguration.objects.all()
+        return conditional_response(request, lambda: self._get(request))
 
-        overrides = dict()
-        for item in data:
-            overrides.update({
-                item.name: {
-                    "global_attributes": self._get_global_attributes(
-                        item.globalattribute
-                    ),
-                    "host_attributes": self._get_host_attributes(
-                        item.hostattribute
-                    ),
-                    "metric_parameters": self._get_metric_parameters(
-                        item.metricparameter
-                    )
-                }
-            })
+    def _get(self, request):
+        data = models.MetricConfiguration.objects.all().order_by("id")
+
+        if streaming_requested(request):
+            return streaming_dict_response(self._overrides(data.iterator()))
 
-        return Response(overrides)
+        return Response(dict(self._overrides(data)))
 
 
 class ListDefaultPorts(APIView):
     permission_classes = (MyHasAPIKey,)
 
     def get(self, request):
+        return conditional_response(request, lambda: self._get(request))
+
+    def _get(self, request):
         data = admin_models.DefaultPort.objects.all()
 
         results = dict()
@@ -0,0 +1,100 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from Poem.helpers.cache_helpers import ProcessCache, get_generation, \
+    invalidate_generation
+from django.conf import settings
+from django.utils import timezone
+
+
+def _generation_name(schema_name):
+    return f"apikeys-{schema_name}"
+
+
+class VerifiedKeyCache(ProcessCache):
+    """
+    Process-wide cache of API keys which were successfully verified, so that
+    the key is not hashed on every request. Entries are kept per API key
+    model and tenant schema for at most APIKEY_CACHE_TIMEOUT seconds, at most
+    APIKEY_CACHE_SIZE of them, and they are dropped as soon as any of API keys
+    of the tenant is changed or deleted.
+    """
+    def _reset(self):
+        super()._reset()
+        self._entries = OrderedDict()
+        self.time_saved = 0.
+
+    def _extra_stats(self):
+        return {
+            "time_saved": self.time_saved,
+            "entries": len(self._entries)
+        }
+
+    @staticmethod
+    def _key(model, schema_name, key):
+        return (
+            model._meta.label, schema_name,
+            hashlib.sha256(key.encode()).hexdigest()
+        )
+
+    def get(self, model, schema_name, key):
+        """
+        Returns True if the key was verified before and it is still valid,
+        None otherwise.
+        """
+        if not settings.APIKEY_CACHE_TIMEOUT:
+            return None
+
+        generation = get_generation(_generation_name(schema_name))
+        if generation is None:
+            return None
+
+        cache_key = self._key(model, schema_name, key)
+        with self._lock:
+            entry = self._entries.get(cache_key, None)
+            if entry and (
+                entry["generation"] != generation or
+                time.monotonic() - entry["timestamp"] >=
+                settings.APIKEY_CACHE_TIMEOUT or
+                (entry["expiry_date"] and
+                 entry["expiry_date"] < timezone.now())
+            ):
+                del self._entries[cache_key]
+                entry = None
+
+            if not entry:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            self.time_saved += entry["elapsed"]
+
+            return True
+
+    def set(self, model, schema_name, key, expiry_date, elapsed):
+        if not settings.APIKEY_CACHE_TIMEOUT:
+            return
+
+        generation = get_generation(_generation_name(schema_name))
+        if generation is None:
+            return
+
+        with self._lock:
+            self._entries[self._key(model, schema_name, key)] = {
+                "generation": generation,
+                "expiry_date": expiry_date,
+                "elapsed": elapsed,
+                "timestamp": time.monotonic()
+            }
+            while len(self._entries) > settings.APIKEY_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+verified_keys = VerifiedKeyCache()
+
+
+def invalidate_verified_keys(schema_name):
+    invalidate_generation(_generation_name(schema_name))
+
@@ -0,0 +1,95 @@
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def generation_key(name):
+    return f"poem-generation-{name}"
+
+
+def get_generation(name):
+    """
+    Returns current generation of data with the given name, which is shared
+    by all the processes through Django cache. None is returned if cache
+    backend does not keep values (e.g. dummy cache), and then data should not
+    be cached at all.
+    """
+    key = generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def get_generations(names, values=None):
+    """
+    Returns list of current generations of data with the given names. Values
+    already read from cache with generation_key() keys can be passed, so that
+    generations are read in the same round trip as the data itself.
+    """
+    if values is None:
+        values = cache.get_many([generation_key(name) for name in names])
+
+    return [
+        values.get(generation_key(name), None) or get_generation(name)
+        for name in names
+    ]
+
+
+def bump_generation(name):
+    cache.set(generation_key(name), uuid.uuid4().hex, None)
+
+
+def invalidate_generation(name):
+    """
+    Starts new generation of data right away, and once again when the current
+    transaction is committed, so that data read before commit is not kept.
+    """
+    bump_generation(name)
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+class ProcessCache:
+    """
+    Base of caches kept in memory of a single process. Counters named in
+    counters are kept under the lock together with the entries, and they
+    are reset, together with the entries, when the cache is cleared.
+    """
+    counters = ("hits", "misses")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # called with the lock held
+        for counter in self.counters:
+            setattr(self, counter, 0)
+
+    def _extra_stats(self):
+        # called with the lock held
+        return dict()
+
+    def count(self, *counters):
+        with self._lock:
+            for counter in counters:
+                setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            stats = dict(
+                (counter, getattr(self, counter)) for counter in self.counters
+            )
+            stats["hit_rate"] = self.hits / requests if requests else 0.
+            stats.update(self._extra_stats())
+
+            return stats
@@ -0,0 +1,55 @@
+import copy
+
+from Poem.helpers.cache_helpers import ProcessCache, get_generation, \
+    invalidate_generation
+
+
+def get_catalogue_generation():
+    return get_generation("catalogue")
+
+
+def invalidate_catalogue_cache():
+    invalidate_generation("catalogue")
+
+
+class CatalogueCache(ProcessCache):
+    """
+    In-process cache of data built from metric templates, probes, packages,
+    repos and tags from public schema. Data is the same for all the tenants,
+    and entries are dropped as soon as catalogue generation changes. None
+    returned by build function (e.g. nothing found) is not kept.
+    """
+    def _reset(self):
+        super()._reset()
+        self._generation = None
+        self._entries = dict()
+
+    def _extra_stats(self):
+        return {"entries": len(self._entries)}
+
+    def get(self, key, build):
+        generation = get_catalogue_generation()
+        if generation is None:
+            return build()
+
+        with self._lock:
+            if self._generation != generation:
+                self._generation = generation
+                self._entries = dict()
+
+            if key in self._entries:
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+
+            self.misses += 1
+
+        data = build()
+
+        with self._lock:
+            if data is not None and self._generation == generation:
+                self._entries[key] = copy.deepcopy(data)
+
+        return data
+
+
+catalogue_cache = CatalogueCache()
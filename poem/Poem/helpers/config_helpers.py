@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from configparser import ConfigParser, Error, NoSectionError, \
+    NoOptionError, InterpolationError
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional
+
+from django.conf import settings
+from django.dispatch import Signal
+
+logger = logging.getLogger("POEM")
+
+# sent with config argument whenever config file is parsed again
+config_reloaded = Signal()
+
+_UNSET = object()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class TenantConfig:
+    """
+    Options of tenant defined in its GENERAL_<TENANT> section.
+    """
+    name: str
+    saml_service_name: Optional[str] = None
+    saml_login_string: Optional[str] = None
+    use_service_titles: bool = False
+    public_page: Optional[str] = None
+    terms_of_use: Optional[str] = None
+    privacy_policies: Optional[str] = None
+
+
+class PoemConfig:
+    """
+    Immutable view of POEM config file. Options are read the same way as
+    with ConfigParser (section names are case sensitive, option names are
+    not), and NoSectionError or NoOptionError is raised for missing ones.
+    """
+    def __init__(self, path):
+        parser = ConfigParser()
+        parser.read(path)
+
+        self.path = path
+        self.mtime = _mtime(path)
+        self._sections = MappingProxyType(dict(
+            (name, MappingProxyType(self._options(parser, name)))
+            for name in parser.sections()
+        ))
+        self.tenants = MappingProxyType(dict(
+            (tenant.name, tenant) for tenant in [
+                self._tenant(name) for name in self._sections
+                if name.startswith("GENERAL_")
+            ]
+        ))
+
+    @staticmethod
+    def _options(parser, section):
+        options = dict()
+        for option in parser.options(section):
+            try:
+                options[option] = parser.get(section, option)
+
+            # values which cannot be interpolated are kept as they are
+            except InterpolationError:
+                options[option] = parser.get(section, option, raw=True)
+
+        return options
+
+    def _tenant(self, section):
+        options = self._sections[section]
+
+        return TenantConfig(
+            name=section[len("GENERAL_"):].lower(),
+            saml_service_name=options.get("samlservicename", None),
+            saml_login_string=options.get("samlloginstring", None),
+            use_service_titles=options.get("useservicetitles", "") == "True",
+            public_page=options.get("publicpage", None),
+            terms_of_use=options.get("termsofuse", None),
+            privacy_policies=options.get("privacypolicies", None)
+        )
+
+    def sections(self):
+        return list(self._sections)
+
+    def has_section(self, section):
+        return section in self._sections
+
+    def get(self, section, option, fallback=_UNSET):
+        if section not in self._sections:
+            if fallback is _UNSET:
+                raise NoSectionError(section)
+
+            return fallback
+
+        try:
+            return self._sections[section][option.lower()]
+
+        except KeyError:
+            if fallback is _UNSET:
+                raise NoOptionError(option, section)
+
+            return fallback
+
+    def tenant(self, name):
+        """
+        Returns options of tenant with the given name, raising NoSectionError
+        if there is no GENERAL_<TENANT> section for it.
+        """
+        try:
+            return self.tenants[name.lower()]
+
+        except KeyError:
+            raise NoSectionError(f"GENERAL_{name.upper()}")
+
+
+class ConfigRegistry:
+    """
+    Process-wide registry of POEM config, parsed once when it is first used
+    (i.e. at startup), so that requests do not read config file. Config is
+    parsed again only if the file has been modified, which is checked at
+    most once per check_interval seconds. If the modified file cannot be
+    parsed or it has no sections (e.g. it is missing or it is being written),
+    the last parsed config is kept. Settings are not affected, they are read
+    from config file only at startup.
+    """
+    # seconds between checks whether config file has been modified
+    check_interval = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self._checked = 0.
+
+    def get(self):
+        config = self._config
+        if config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = PoemConfig(settings.CONFIG_FILE)
+                    self._checked = time.monotonic()
+
+                config = self._config
+
+        elif time.monotonic() - self._checked >= self.check_interval:
+            if self.reload():
+                config = self._config
+
+        return config
+
+    def reload(self, force=False):
+        """
+        Parses config file again if it has been modified since it was last
+        parsed (or if forced), and sends config_reloaded signal. Returns True
+        if config has been reloaded.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            current = self._config
+            if not force and current is not None and \
+                    current.path == settings.CONFIG_FILE and \
+                    current.mtime == _mtime(current.path):
+                return False
+
+            try:
+                config = PoemConfig(settings.CONFIG_FILE)
+                error = None if config.sections() else "no sections found"
+
+            except Error as e:
+                if current is None:
+                    raise
+
+                error = str(e)
+
+            if error and current is not None:
+                logger.warning(
+                    "Config file %s not reloaded, keeping the last one: %s" % (
+                        settings.CONFIG_FILE, error
+                    )
+                )
+                return False
+
+            self._config = config
+
+        config_reloaded.send(sender=self.__class__, config=config)
+
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._config = None
+
+
+config_registry = ConfigRegistry()
+
+
+def poem_config():
+    return config_registry.get()
+
+
+def reload_poem_config(force=False):
+    return config_registry.reload(force=force)
@@ -0,0 +1,226 @@
+import json
+
+from Poem.helpers.catalogue_helpers import invalidate_catalogue_cache
+from Poem.helpers.etag_helpers import invalidate_api_content
+from Poem.helpers.history_helpers import serialize_metric
+from Poem.poem import models as poem_models
+from Poem.poem_super_admin import models as admin_models
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+# objects are inserted in batches of this size
+BATCH_SIZE = 1000
+
+OS_TAG = "Rocky 9"
+
+
+def _tags(prefix, count=5):
+    """
+    Returns metric tags of dataset, the first of them being "internal".
+    """
+    names = ["internal"] + [f"{prefix}-tag-{i}" for i in range(count)]
+
+    return [
+        admin_models.MetricTags.objects.get_or_create(name=name)[0]
+        for name in names
+    ]
+
+
+def generate_catalogue(rng, prefix, probes, versions, templates, user="poem"):
+    """
+    Creates probes, each with its own package and YUM repo and with the given
+    number of versions, and metric templates, each with the given number of
+    versions using consecutive versions of randomly chosen probe. Objects
+    are named after prefix and inserted in bulk, in a single transaction;
+    since bulk inserts do not send signals, cached catalogue data is
+    invalidated explicitly. Returns list of (the latest version of metric template, its tags)
+    tuples.
+    """
+    with transaction.atomic():
+        ostag, _ = admin_models.OSTag.objects.get_or_create(name=OS_TAG)
+        active, _ = admin_models.MetricTemplateType.objects.get_or_create(
+            name="Active"
+        )
+        tags = _tags(prefix)
+
+        repos = admin_models.YumRepo.objects.bulk_create([
+            admin_models.YumRepo(
+                name=f"{prefix}-repo-{i}",
+                tag=ostag,
+                content=f"[{prefix}-repo-{i}]\nbaseurl=https://repo.example/",
+                description=f"Repo of {prefix}-package-{i}"
+            ) for i in range(probes)
+        ], batch_size=BATCH_SIZE)
+        packages = admin_models.Package.objects.bulk_create([
+            admin_models.Package(
+                name=f"{prefix}-package-{i}", version=f"1.{k}.0"
+            ) for i in range(probes) for k in range(versions)
+        ], batch_size=BATCH_SIZE)
+        admin_models.Package.repos.through.objects.bulk_create([
+            admin_models.Package.repos.through(
+                package_id=package.id, yumrepo_id=repos[index // versions].id
+            ) for index, package in enumerate(packages)
+        ], batch_size=BATCH_SIZE)
+
+        probe_objs = admin_models.Probe.objects.bulk_create([
+            admin_models.Probe(
+                name=f"{prefix}-probe-{i}",
+                package=packages[i * versions + versions - 1],
+                description=f"Probe {i} of {prefix} dataset.",
+                comment=f"Version {versions - 1}.",
+                repository="https://github.com/ARGOeu/nagios-plugins-argo",
+                docurl="https://github.com/ARGOeu/nagios-plugins-argo/blob/"
+                       "master/README.md",
+                user=user
+            ) for i in range(probes)
+        ], batch_size=BATCH_SIZE)
+        probe_versions = admin_models.ProbeHistory.objects.bulk_create([
+            admin_models.ProbeHistory(
+                object_id=probe,
+                name=probe.name,
+                package=packages[i * versions + k],
+                description=probe.description,
+                comment=f"Version {k}.",
+                repository=probe.repository,
+                docurl=probe.docurl,
+                version_comment="Initial version." if k == 0 else
+                f"Changed package version to 1.{k}.0.",
+                version_user=user
+            ) for i, probe in enumerate(probe_objs) for k in range(versions)
+        ], batch_size=BATCH_SIZE)
+
+        chosen = [rng.randrange(probes) for i in range(templates)]
+        mt_tags = [
+            ([tags[0]] if rng.random() < 0.1 else []) +
+            rng.sample(tags[1:], rng.randint(0, 2))
+            for i in range(templates)
+        ]
+
+        mts = admin_models.MetricTemplate.objects.bulk_create([
+            admin_models.MetricTemplate(
+                name=f"{prefix}.Metric-{i}",
+                mtype=active,
+                probekey=probe_versions[chosen[i] * versions + versions - 1],
+                description=f"Metric template {i} of {prefix} dataset.",
+                probeexecutable=json.dumps([f"{prefix}-probe-{chosen[i]}"]),
+                config=json.dumps([
+                    "maxCheckAttempts 3", f"timeout {rng.choice([30, 60])}",
+                    f"path /usr/libexec/argo/probes/{prefix}",
+                    f"interval {rng.choice([5, 15, 60])}", "retryInterval 3"
+                ]),
+                attribute='["argo.ams_TOKEN --token"]',
+                flags='["OBSESS 1"]',
+                parameter=json.dumps([f"--metric {i}"])
+            ) for i in range(templates)
+        ], batch_size=BATCH_SIZE)
+        admin_models.MetricTemplate.tags.through.objects.bulk_create([
+            admin_models.MetricTemplate.tags.through(
+                metrictemplate_id=mt.id, metrictags_id=tag.id
+            ) for i, mt in enumerate(mts) for tag in mt_tags[i]
+        ], batch_size=BATCH_SIZE)
+
+        history = admin_models.MetricTemplateHistory.objects.bulk_create([
+            admin_models.MetricTemplateHistory(
+                object_id=mt,
+                name=mt.name,
+                mtype=mt.mtype,
+                probekey=probe_versions[chosen[i] * versions + k],
+                description=mt.description,
+                probeexecutable=mt.probeexecutable,
+                config=mt.config,
+                attribute=mt.attribute,
+                flags=mt.flags,
+                parameter=mt.parameter,
+                version_comment="Initial version." if k == 0 else
+                f"Changed probe version to 1.{k}.0.",
+                version_user=user
+            ) for i, mt in enumerate(mts) for k in range(versions)
+        ], batch_size=BATCH_SIZE)
+        admin_models.MetricTemplateHistory.tags.through.objects.bulk_create([
+            admin_models.MetricTemplateHistory.tags.through(
+                metrictemplatehistory_id=mt.id, metrictags_id=tag.id
+            ) for index, mt in enumerate(history)
+            for tag in mt_tags[index // versions]
+        ], batch_size=BATCH_SIZE)
+
+    invalidate_catalogue_cache()
+
+    return [
+        (history[i * versions + versions - 1], mt_tags[i])
+        for i in range(templates)
+    ]
+
+
+def generate_tenant_data(
+        rng, prefix, templates, metrics, groups, profiles, user="poem"
+):
+    """
+    Creates groups of metrics, metrics (with their history) of randomly
+    chosen metric templates, given as returned by generate_catalogue(), and
+    metric profiles in the current schema, in a single transaction. Metric
+    profiles are only kept in POEM, they are not created in WEB-API. Index
+    of tenant's metrics is updated, and cached API content of the tenant is
+    invalidated. Returns the created metrics.
+    """
+    chosen = rng.sample(templates, min(metrics, len(templates)))
+
+    with transaction.atomic():
+        metric_groups = poem_models.GroupOfMetrics.objects.bulk_create([
+            poem_models.GroupOfMetrics(name=f"{prefix.upper()}-{i}")
+            for i in range(groups)
+        ])
+        metric_objs = poem_models.Metric.objects.bulk_create([
+            poem_models.Metric(
+                name=mt.name,
+                group=rng.choice(metric_groups) if metric_groups else None,
+                probeversion=mt.probekey.__str__(),
+                probe_name=mt.probekey.name,
+                package_version=mt.probekey.package.version,
+                config=mt.config
+            ) for mt, tags in chosen
+        ], batch_size=BATCH_SIZE)
+
+        ct = ContentType.objects.get_for_model(poem_models.Metric)
+        poem_models.TenantHistory.objects.bulk_create([
+            poem_models.TenantHistory(
+                object_id=metric.id,
+                serialized_data=serialize_metric(
+                    metric, tags=tags, mt_instance=mt
+                ),
+                object_repr=metric.__str__(),
+                content_type=ct,
+                comment="Initial version.",
+                user=user
+            ) for metric, (mt, tags) in zip(metric_objs, chosen)
+        ], batch_size=BATCH_SIZE)
+
+        profile_objs = poem_models.MetricProfiles.objects.bulk_create([
+            poem_models.MetricProfiles(
+                name=f"{prefix.upper()}_PROFILE_{i}",
+                description=f"Metric profile {i} of {prefix} dataset.",
+                apiid="%032x" % rng.getrandbits(128),
+                groupname=rng.choice(metric_groups).name
+                if metric_groups else ""
+            ) for i in range(profiles)
+        ])
+        profile_groups = dict(
+            (group.name, group) for group in
+            poem_models.GroupOfMetricProfiles.objects.bulk_create([
+                poem_models.GroupOfMetricProfiles(name=group.name)
+                for group in metric_groups
+            ])
+        )
+        through = poem_models.GroupOfMetricProfiles.metricprofiles.through
+        through.objects.bulk_create([
+            through(
+                groupofmetricprofiles_id=profile_groups[profile.groupname].id,
+                metricprofiles_id=profile.id
+            ) for profile in profile_objs if profile.groupname
+        ])
+
+    admin_models.TenantMetric.objects.index(
+        connection.schema_name, metric_objs
+    )
+    invalidate_api_content(connection.schema_name)
+
+    return metric_objs
@@ -0,0 +1,52 @@
+import copy
+
+from Poem.helpers.cache_helpers import ProcessCache, get_generation, \
+    invalidate_generation
+
+
+def invalidate_tenant_domains():
+    invalidate_generation("tenants")
+
+
+class TenantDomainCache(ProcessCache):
+    """
+    In-process cache of tenants resolved from hostnames of requests. Entries
+    are dropped as soon as any of domains or tenants is changed (in any of
+    the processes), and hostnames with no tenant are not kept. Every call
+    returns its own copy of tenant, so that changes done while handling one
+    request are not seen by the others.
+    """
+    def _reset(self):
+        super()._reset()
+        self._generation = None
+        self._entries = dict()
+
+    def _extra_stats(self):
+        return {"entries": len(self._entries)}
+
+    def get(self, hostname, build):
+        generation = get_generation("tenants")
+        if generation is None:
+            return build()
+
+        with self._lock:
+            if self._generation != generation:
+                self._generation = generation
+                self._entries = dict()
+
+            if hostname in self._entries:
+                self.hits += 1
+                return copy.copy(self._entries[hostname])
+
+            self.misses += 1
+
+        tenant = build()
+
+        with self._lock:
+            if self._generation == generation:
+                self._entries[hostname] = copy.copy(tenant)
+
+        return tenant
+
+
+tenant_domains = TenantDomainCache()
@@ -0,0 +1,83 @@
+import hashlib
+
+from Poem.helpers.cache_helpers import get_generations, invalidate_generation
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+
+
+def _generation_names(schema_name):
+    # tenant data (metrics, metric overrides) and public catalogue data
+    return [f"api-{schema_name}", "catalogue"]
+
+
+def invalidate_api_content(schema_name):
+    invalidate_generation(_generation_names(schema_name)[0])
+
+
+def content_etag(request, *extra):
+    """
+    Returns ETag of content of token-protected API response, built from
+    requested path, generations of tenant and catalogue data and extra
+    values the content depends on. None is returned if generations are not
+    kept (e.g. dummy cache).
+    """
+    # schema of the request's tenant is already set by tenant middleware
+    generations = get_generations(_generation_names(connection.schema_name))
+    if None in generations:
+        return None
+
+    digest = hashlib.sha1()
+    for part in [
+        request.get_full_path(), connection.schema_name, *generations,
+        *extra
+    ]:
+        digest.update(repr(part).encode())
+
+    return quote_etag(digest.hexdigest())
+
+
+def _not_modified(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if not header:
+        return False
+
+    etags = [
+        item[2:] if item.startswith("W/") else item
+        for item in parse_etags(header)
+    ]
+
+    return "*" in etags or etag in etags
+
+
+def conditional_response(request, build, *extra):
+    """
+    Returns 304 response if client already has the current version of
+    content (If-None-Match header), without building it; otherwise returns
+    response built by build function. Successful responses get ETag and
+    Cache-Control headers.
+    """
+    etag = content_etag(request, *extra)
+
+    if etag and _not_modified(request, etag):
+        response = HttpResponseNotModified()
+
+    else:
+        response = build()
+
+    if response.status_code in [
+        status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+    ]:
+        if etag:
+            response["ETag"] = etag
+
+        patch_cache_control(
+            response, private=True, must_revalidate=True,
+            max_age=settings.API_CACHE_MAX_AGE
+        )
+        patch_vary_headers(response, ["X-Api-Key"])
+
+    return response
@@ -1,6 +1,7 @@
 import json
 
 from Poem.poem import models as poem_models
+from Poem.poem.dbmodels.metricstags import split_probeversion
 from Poem.poem_super_admin import models as admin_models
 from Poem.users.models import CustUser
 from deepdiff import DeepDiff
@@ -40,21 +41,28 @@ def inline_one_to_dict(data):
         return ''
 
 
-def serialize_metric(metric_instance, tags=None):
+def get_metric_template_history(metric_instance):
     if metric_instance.probeversion:
-        instance_probe = metric_instance.probeversion.split("(")
-        probe_name = instance_probe[0].strip()
-        probe_version = instance_probe[1][:-1].strip()
-        mt_instance = admin_models.MetricTemplateHistory.objects.get(
+        # instance might not be saved yet, so probe name and package version
+        # are taken from probeversion
+        probe_name, probe_version = split_probeversion(
+            metric_instance.probeversion
+        )
+        return admin_models.MetricTemplateHistory.objects.get(
             name=metric_instance.name, probekey__name=probe_name,
             probekey__package__version=probe_version
         )
 
     else:
-        mt_instance = admin_models.MetricTemplateHistory.objects.get(
+        return admin_models.MetricTemplateHistory.objects.get(
             name=metric_instance.name
         )
 
+
+def serialize_metric(metric_instance, tags=None, mt_instance=None):
+    if mt_instance is None:
+        mt_instance = get_metric_template_history(metric_instance)
+
     serialized_data = serializers.serialize(
         "json", [metric_instance],
         use_natural_foreign_keys=True,
@@ -78,6 +86,8 @@ def serialize_metric(metric_instance, tags=None):
         probekey = None
 
     unserialized["fields"].pop("probeversion")
+    unserialized["fields"].pop("probe_name")
+    unserialized["fields"].pop("package_version")
 
     unserialized["fields"].update({
         "tags": tags_list,
@@ -0,0 +1,160 @@
+import datetime
+import logging
+
+from Poem.poem_super_admin.models import Job
+from Poem.tenants.models import Tenant
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django_tenants.utils import schema_context, get_public_schema_name
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+logger = logging.getLogger("POEM")
+
+
+class JobRequest:
+    """
+    Request passed to view method by the job worker, carrying the data,
+    user and tenant of the request which created the job.
+    """
+    def __init__(self, job, user, tenant):
+        if job.form_data:
+            self.data = QueryDict(mutable=True)
+            for key, value in job.data.items():
+                self.data.setlist(key, value)
+
+        else:
+            self.data = job.data
+
+        self.user = user
+        self.tenant = tenant
+        self.query_params = dict()
+
+
+def run_in_background(request):
+    """
+    Returns True if the request asked to be run as background job, which is
+    possible only for superusers.
+    """
+    return request.query_params.get("background", "") in \
+        ["true", "True", "1"] and request.user.is_superuser
+
+
+def enqueue_job(request, view, method, **kwargs):
+    """
+    Stores the request as a job to be run by the poem_run_jobs command, and
+    returns response with job id.
+    """
+    data = request.data
+    form_data = isinstance(data, QueryDict)
+    if form_data:
+        data = dict(data.lists())
+
+    with schema_context(get_public_schema_name()):
+        job = Job.objects.create(
+            view="{}.{}".format(view.__module__, view.__name__),
+            method=method,
+            kwargs=kwargs,
+            data=data,
+            form_data=form_data,
+            schema_name=request.tenant.schema_name,
+            user=request.user.username
+        )
+
+    return Response(
+        {"id": job.id, "status": job.status},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+def fail_abandoned_jobs():
+    """
+    Marks jobs running longer than JOBS_TIMEOUT seconds as failed, since
+    their worker has most likely been killed. Returns number of such jobs.
+    """
+    if not settings.JOBS_TIMEOUT:
+        return 0
+
+    now = timezone.now()
+    with schema_context(get_public_schema_name()):
+        count = Job.objects.filter(
+            status=Job.RUNNING,
+            date_started__lt=now - datetime.timedelta(
+                seconds=settings.JOBS_TIMEOUT
+            )
+        ).update(
+            status=Job.FAILED,
+            error=f"Job not finished in {settings.JOBS_TIMEOUT} seconds",
+            date_finished=now
+        )
+
+    if count:
+        logger.warning("Marked %d abandoned job(s) as failed" % count)
+
+    return count
+
+
+def claim_next_job():
+    """
+    Marks the oldest queued job as running and returns it, or None if there
+    are no queued jobs. Jobs locked by other workers are skipped. Abandoned
+    running jobs are marked as failed first.
+    """
+    fail_abandoned_jobs()
+
+    with schema_context(get_public_schema_name()):
+        with transaction.atomic():
+            job = Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.QUEUED
+            ).order_by("date_created", "id").first()
+
+            if job:
+                job.status = Job.RUNNING
+                job.date_started = timezone.now()
+                job.save(update_fields=["status", "date_started"])
+
+    return job
+
+
+def run_job(job):
+    """
+    Calls the view method the job was created for and stores its response.
+    """
+    try:
+        view = import_string(job.view)
+        with schema_context(job.schema_name):
+            tenant = Tenant.objects.get(schema_name=job.schema_name)
+            user = get_user_model().objects.get(username=job.user)
+
+            try:
+                response = getattr(view(), job.method)(
+                    JobRequest(job, user, tenant), **job.kwargs
+                )
+                status_code = response.status_code
+                result = response.data
+
+            except APIException as e:
+                status_code = e.status_code
+                result = {"detail": e.detail}
+
+        job.status_code = status_code
+        job.result = result
+        job.status = Job.DONE if status_code < 400 else Job.FAILED
+
+    except Exception as e:
+        logger.exception("Job %s (%s) failed" % (job.id, job.name))
+        job.status = Job.FAILED
+        job.error = str(e)
+
+    job.date_finished = timezone.now()
+    with schema_context(get_public_schema_name()):
+        job.save(update_fields=[
+            "status", "status_code", "result", "error", "date_finished"
+        ])
+
+    return job
@@ -1,106 +1,283 @@
 import json
 
 import requests
+from Poem.helpers.etag_helpers import invalidate_api_content
 from Poem.helpers.history_helpers import create_history, serialize_metric
+from Poem.helpers.webapi_helpers import get_webapi_data, \
+    invalidate_webapi_cache, webapi, webapi_fan_out
 from Poem.poem import models as poem_models
+from Poem.poem.dbmodels.metricstags import split_probeversion
 from Poem.poem_super_admin import models as admin_models
 from Poem.poem_super_admin.models import WebAPIKey
 from Poem.tenants.models import Tenant
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
 from django_tenants.utils import schema_context, get_public_schema_name
 
 
+def get_probes_for_metrics(metrics):
+    keys = set([
+        (metric.probe_name, metric.package_version) for metric in metrics
+        if metric.probe_name
+    ])
+
+    probes = dict()
+    if keys:
+        for probe in admin_models.ProbeHistory.objects.filter(
+            name__in=set([key[0] for key in keys]),
+            package__version__in=set([key[1] for key in keys])
+        ).select_related("package"):
+            key = (probe.name, probe.package.version)
+            if key in keys:
+                probes[key] = probe
+
+    return probes
+
+
+def get_metric_templates(metrics):
+    """
+    Resolves metric templates of the given tenant metrics in a fixed number
+    of queries. Metrics with probe are matched to MetricTemplateHistory
+    entries by (name, probe name, package version), metrics without probe
+    are matched to MetricTemplate entries by name. Returns dict keyed by
+    metric name; metrics whose template is not found are left out.
+    """
+    with_probe = dict()
+    without_probe = set()
+    for metric in metrics:
+        if metric.probeversion:
+            key = (metric.probe_name, metric.package_version)
+            if None in key:
+                # probe fields are not set if metric was inserted or
+                # updated in bulk, bypassing save()
+                key = split_probeversion(metric.probeversion)
+
+            with_probe[metric.name] = key
+
+        else:
+            without_probe.add(metric.name)
+
+    mts = dict()
+    if with_probe:
+        for mt in admin_models.MetricTemplateHistory.objects.filter(
+            name__in=with_probe.keys(), probekey__isnull=False
+        ).select_related(
+            "mtype", "probekey__package"
+        ).prefetch_related("tags"):
+            key = (mt.name, mt.probekey.name, mt.probekey.package.version)
+            mts[key] = mt
+
+    templates = dict()
+    if without_probe:
+        for mt in admin_models.MetricTemplate.objects.filter(
+            name__in=without_probe
+        ).select_related(
+            "mtype", "probekey__package"
+        ).prefetch_related("tags"):
+            templates[mt.name] = mt
+
+    resolved = dict()
+    for metric in metrics:
+        if metric.name in with_probe:
+            mt = mts.get((metric.name, *with_probe[metric.name]), None)
+
+        else:
+            mt = templates.get(metric.name, None)
+
+        if mt:
+            resolved[metric.name] = mt
+
+    return resolved
+
+
+def get_tenant_packages():
+    """
+    Returns dict with packages used by tenant's metrics, keyed by package
+    name, and set of their ids.
+    """
+    metrics = poem_models.Metric.objects.filter(probe_name__isnull=False)
+    probes = get_probes_for_metrics(metrics)
+
+    packages = dict()
+    package_ids = set()
+    for metric in metrics:
+        key = (metric.probe_name, metric.package_version)
+        if key in probes:
+            package = probes[key].package
+            package_ids.add(package.id)
+            if package.name not in packages:
+                packages.update({package.name: package})
+
+    return packages, package_ids
+
+
+def _create_imported_metrics(new_metrics, user):
+    """
+    Creates metrics, given as (metric, template history, tags) tuples, and
+    their initial history entries in a single transaction.
+    """
+    with transaction.atomic():
+        poem_models.Metric.objects.bulk_create(
+            [item[0] for item in new_metrics]
+        )
+        admin_models.TenantMetric.objects.index(
+            connection.schema_name, [item[0] for item in new_metrics]
+        )
+        invalidate_api_content(connection.schema_name)
+
+        content_type = ContentType.objects.get_for_model(poem_models.Metric)
+        poem_models.TenantHistory.objects.bulk_create([
+            poem_models.TenantHistory(
+                object_id=metric.id,
+                serialized_data=serialize_metric(
+                    metric, tags=tags, mt_instance=history
+                ),
+                object_repr=metric.__str__(),
+                content_type=content_type,
+                comment="Initial version.",
+                user=user.username
+            ) for metric, history, tags in new_metrics
+        ])
+
+
 def import_metrics(metrictemplates, tenant, user):
     imported = []
     warn_imported = []
     not_imported = []
     unavailable = []
-    for template in metrictemplates:
-        imported_different_version = False
-        try:
-            mt = admin_models.MetricTemplate.objects.get(name=template)
 
-        except admin_models.MetricTemplate.DoesNotExist:
-            continue
+    templates = dict(
+        (mt.name, mt) for mt in admin_models.MetricTemplate.objects.filter(
+            name__in=metrictemplates
+        ).select_related("probekey__package").prefetch_related("tags")
+    )
 
-        gr = poem_models.GroupOfMetrics.objects.get(
-            name=tenant.name.upper()
-        )
+    if not templates:
+        return imported, warn_imported, not_imported, unavailable
 
-        packages = []
-        for m in poem_models.Metric.objects.all():
-            if m.probeversion:
-                metric_probe = m.probeversion.split(" (")
-                probe_name = metric_probe[0].strip()
-                probe_version = metric_probe[1][:-1].strip()
-                probe = admin_models.ProbeHistory.objects.get(
-                    name=probe_name,
-                    package__version=probe_version
-                )
-                packages.append(probe.package)
+    gr = poem_models.GroupOfMetrics.objects.get(name=tenant.name.upper())
 
-        package_names = [package.name for package in packages]
+    packages, package_ids = get_tenant_packages()
 
-        try:
-            if mt.probekey:
-                if mt.probekey.package.name in package_names and \
-                        mt.probekey.package not in packages:
-                    package_version = [
-                        package for package in packages
-                        if package.name == mt.probekey.package.name
-                    ][0]
-                    try:
-                        ver = admin_models.ProbeHistory.objects.get(
-                            name=mt.probekey.name,
-                            package=package_version
-                        )
+    probekeys = [mt.probekey for mt in templates.values() if mt.probekey]
+    probes = dict(
+        ((probe.name, probe.package_id), probe) for probe in
+        admin_models.ProbeHistory.objects.filter(
+            name__in=set([probekey.name for probekey in probekeys]),
+            package__name__in=set(
+                [probekey.package.name for probekey in probekeys]
+            )
+        ).select_related("package")
+    )
 
-                        mt = admin_models.MetricTemplateHistory.objects.get(
-                            name=mt.name, probekey=ver
-                        )
-                        imported_different_version = True
+    # ordered by date, so that the latest entry is kept for templates
+    # without probe
+    histories = dict(
+        ((history.name, history.probekey_id), history) for history in
+        admin_models.MetricTemplateHistory.objects.filter(
+            Q(probekey__in=probes.values()) | Q(probekey__isnull=True),
+            name__in=templates.keys()
+        ).select_related(
+            "mtype", "probekey__package"
+        ).prefetch_related("tags").order_by("date_created", "id")
+    )
 
-                    except admin_models.ProbeHistory.DoesNotExist:
-                        unavailable.append(mt.name)
-                        continue
+    existing = set(
+        poem_models.Metric.objects.filter(
+            name__in=templates.keys()
+        ).values_list("name", flat=True)
+    )
 
-                    except admin_models.MetricTemplateHistory.DoesNotExist:
-                        unavailable.append(mt.name)
-                        continue
+    new_metrics = []
+    for template in metrictemplates:
+        if template not in templates:
+            continue
 
-                else:
-                    ver = mt.probekey
+        mt = templates[template]
+        imported_different_version = False
 
-                metric = poem_models.Metric.objects.create(
-                    name=mt.name,
-                    probeversion=f"{ver.name} ({ver.package.version})",
-                    group=gr,
-                    config=mt.config
+        ver = None
+        if mt.probekey:
+            package = mt.probekey.package
+            if package.name in packages and package.id not in package_ids:
+                ver = probes.get(
+                    (mt.probekey.name, packages[package.name].id), None
                 )
+                if not ver or (mt.name, ver.id) not in histories:
+                    unavailable.append(mt.name)
+                    continue
+
+                mt = histories[(mt.name, ver.id)]
+                imported_different_version = True
 
             else:
-                metric = poem_models.Metric.objects.create(
-                    name=mt.name,
-                    group=gr
-                )
+                ver = mt.probekey
+
+            history = histories.get((mt.name, ver.id), None)
+
+        else:
+            history = histories.get((mt.name, None), None)
+
+        if mt.name in existing:
+            not_imported.append(mt.name)
+            continue
+
+        existing.add(mt.name)
+
+        if ver:
+            if ver.package.name not in packages:
+                packages.update({ver.package.name: ver.package})
 
-            new_tags = [tag for tag in mt.tags.all()]
+            package_ids.add(ver.package.id)
 
-            create_history(
-                metric, user.username, comment='Initial version.', tags=new_tags
+            metric = poem_models.Metric(
+                name=mt.name,
+                probeversion=f"{ver.name} ({ver.package.version})",
+                probe_name=ver.name,
+                package_version=ver.package.version,
+                group=gr,
+                config=mt.config
             )
 
-            if imported_different_version:
-                warn_imported.append(mt.name)
+        else:
+            metric = poem_models.Metric(name=mt.name, group=gr)
 
-            else:
-                imported.append(mt.name)
+        new_metrics.append((metric, history, list(mt.tags.all())))
+
+        if imported_different_version:
+            warn_imported.append(mt.name)
+
+        else:
+            imported.append(mt.name)
+
+    if new_metrics:
+        try:
+            _create_imported_metrics(new_metrics, user)
 
         except IntegrityError:
-            not_imported.append(mt.name)
-            continue
+            # some of the metrics were created in the meantime by another
+            # request; the rest of them are imported one by one
+            position = dict(
+                (name, index) for index, name in
+                reversed(list(enumerate(metrictemplates)))
+            )
+            for item in new_metrics:
+                try:
+                    _create_imported_metrics([item], user)
+
+                except IntegrityError:
+                    name = item[0].name
+                    if name in imported:
+                        imported.remove(name)
+
+                    else:
+                        warn_imported.remove(name)
+
+                    not_imported.append(name)
+
+            not_imported.sort(key=lambda name: position[name])
 
     return imported, warn_imported, not_imported, unavailable
 
@@ -109,16 +286,9 @@ def get_metrics_in_profiles(tenant):
     with schema_context(tenant.schema_name):
         try:
             token = WebAPIKey.objects.get(name=f"WEB-API-{tenant.name}")
-            headers = {
-                'Accept': 'application/json', 'x-api-key': token.token
-            }
-
-            response = requests.get(
-                settings.WEBAPI_METRIC, headers=headers, timeout=180
+            data = get_webapi_data(
+                settings.WEBAPI_METRIC, tenant.name, token.token
             )
-            response.raise_for_status()
-
-            data = response.json()['data']
             metrics_dict = dict()
             for item in data:
                 for service in item['services']:
@@ -166,7 +336,8 @@ def update_metric_in_schema(
         try:
             if probekey:
                 met = poem_models.Metric.objects.get(
-                    name=name, probeversion=probekey.__str__()
+                    name=name, probe_name=probekey.name,
+                    package_version=probekey.package.version
                 )
 
             else:
@@ -250,6 +421,47 @@ def update_metrics(metrictemplate, name, probekey, user=''):
     return msgs
 
 
+def _update_metric_in_tenant_profiles(tenant, token, old_name, new_name):
+    headers = {'Accept': 'application/json', 'x-api-key': token}
+
+    response = webapi.get(settings.WEBAPI_METRIC, headers=headers, timeout=180)
+    response.raise_for_status()
+
+    data = response.json()['data']
+
+    for profile in data:
+        flag = 0
+        new_services = []
+        for service in profile['services']:
+            new_metrics = []
+            if 'metrics' in service:
+                for metric in service['metrics']:
+                    if metric == old_name:
+                        flag += 1
+                        new_metrics.append(new_name)
+                    else:
+                        new_metrics.append(metric)
+            new_services.append({
+                'service': service['service'],
+                'metrics': new_metrics
+            })
+
+        if flag > 0:
+            new_data = {
+                'id': profile['id'],
+                'name': profile['name'],
+                'description': profile['description'],
+                'services': new_services
+            }
+            response = webapi.put(
+                settings.WEBAPI_METRIC + '/' + profile['id'],
+                headers=headers,
+                data=json.dumps(new_data)
+            )
+            invalidate_webapi_cache(tenant.name)
+            response.raise_for_status()
+
+
 def update_metrics_in_profiles(old_name, new_name):
     error_msgs = []
     if old_name == new_name:
@@ -262,69 +474,42 @@ def update_metrics_in_profiles(old_name, new_name):
             tenant.schema_name != get_public_schema_name()
         ]
 
+        tasks = []
+        tenant_msgs = dict()
         for tenant in tenants:
-            with schema_context(tenant.schema_name):
-                try:
-                    token = WebAPIKey.objects.get(name=f"WEB-API-{tenant.name}")
-                    headers = {
-                        'Accept': 'application/json', 'x-api-key': token.token
-                    }
-
-                    response = requests.get(
-                        settings.WEBAPI_METRIC, headers=headers, timeout=180
-                    )
-                    response.raise_for_status()
-
-                    data = response.json()['data']
-
-                    for profile in data:
-                        flag = 0
-                        new_services = []
-                        for service in profile['services']:
-                            new_metrics = []
-                            if 'metrics' in service:
-                                for metric in service['metrics']:
-                                    if metric == old_name:
-                                        flag += 1
-                                        new_metrics.append(new_name)
-                                    else:
-                                        new_metrics.append(metric)
-                            new_services.append({
-                                'service': service['service'],
-                                'metrics': new_metrics
-                            })
-
-                        if flag > 0:
-                            new_data = {
-                                'id': profile['id'],
-                                'name': profile['name'],
-                                'description': profile['description'],
-                                'services': new_services
-                            }
-                            response = requests.put(
-                                settings.WEBAPI_METRIC + '/' + profile['id'],
-                                headers=headers,
-                                data=json.dumps(new_data)
-                            )
-                            response.raise_for_status()
-
-                except requests.exceptions.HTTPError as e:
-                    error_msgs.append(
-                        '{}: Error trying to update metric in metric profiles: '
-                        '{}.\nPlease update metric profiles manually.'.format(
-                            tenant.schema_name.upper(), e
-                        )
-                    )
-                    continue
+            try:
+                token = WebAPIKey.objects.get(name=f"WEB-API-{tenant.name}")
+                tasks.append((tenant, token.token, old_name, new_name))
 
-                except WebAPIKey.DoesNotExist:
-                    error_msgs.append(
+            except WebAPIKey.DoesNotExist:
+                tenant_msgs.update({
+                    tenant.schema_name:
                         '{}: No "WEB-API" key in the DB!'
                         '\nPlease update metric profiles manually.'.format(
                             tenant.schema_name.upper()
                         )
-                    )
-                    continue
+                })
+
+        results = webapi_fan_out(_update_metric_in_tenant_profiles, tasks)
+
+        for task, (result, exception) in zip(tasks, results):
+            tenant = task[0]
+            if isinstance(exception, requests.exceptions.HTTPError):
+                tenant_msgs.update({
+                    tenant.schema_name:
+                        '{}: Error trying to update metric in metric '
+                        'profiles: {}.\nPlease update metric profiles '
+                        'manually.'.format(
+                            tenant.schema_name.upper(), exception
+                        )
+                })
+
+            elif exception:
+                raise exception
+
+        for tenant in tenants:
+            if tenant.schema_name in tenant_msgs:
+                error_msgs.append(tenant_msgs[tenant.schema_name])
 
     return error_msgs
 
@@ -342,7 +527,7 @@ def delete_metrics_from_profile(profile, metrics, tenant):
         else:
             url = settings.WEBAPI_METRIC + '/' + profile_id
 
-        response = requests.get(url, headers=headers, timeout=180)
+        response = webapi.get(url, headers=headers, timeout=180)
         response.raise_for_status()
 
         data = response.json()['data'][0]
@@ -362,9 +547,10 @@ def delete_metrics_from_profile(profile, metrics, tenant):
             'services': data['services']
         }
 
-        response = requests.put(
+        response = webapi.put(
             url, headers=headers, data=json.dumps(send_data)
         )
+        invalidate_webapi_cache(tenant)
         response.raise_for_status()
 
     except WebAPIKey.DoesNotExist:
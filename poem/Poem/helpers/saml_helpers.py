@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+from Poem.helpers.cache_helpers import ProcessCache
+from Poem.helpers.config_helpers import config_reloaded
+from django.conf import settings
+
+logger = logging.getLogger("POEM")
+
+
+class SPConfigCache(ProcessCache):
+    """
+    Process-wide cache of loaded SAML2 SP configs, kept per tenant and
+    hostname. Configs are loaded again, together with IdP metadata, once they
+    are older than SAML_METADATA_REFRESH seconds, and the last loaded config
+    is used if that fails. Only one config of the same tenant and hostname is
+    loaded at a time, so that burst of logins does not load the same config
+    many times, while configs of other tenants are loaded concurrently.
+    """
+    counters = ("hits", "misses", "refreshes", "failures")
+
+    def __init__(self):
+        self._build_locks = dict()
+        super().__init__()
+
+    def _reset(self):
+        super()._reset()
+        self._entries = dict()
+
+    def _extra_stats(self):
+        return {"entries": len(self._entries)}
+
+    def _fresh(self, key, refresh):
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry and time.monotonic() - entry["timestamp"] < refresh:
+                self.hits += 1
+                return entry, True
+
+            return entry, False
+
+    def _build_lock(self, key):
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, build):
+        refresh = settings.SAML_METADATA_REFRESH
+        if not refresh:
+            return build()
+
+        entry, fresh = self._fresh(key, refresh)
+        if fresh:
+            return entry["config"]
+
+        with self._build_lock(key):
+            # config might have been loaded while waiting for the lock
+            entry, fresh = self._fresh(key, refresh)
+            if fresh:
+                return entry["config"]
+
+            with self._lock:
+                if entry:
+                    self.refreshes += 1
+
+                else:
+                    self.misses += 1
+
+            try:
+                config = build()
+
+            except Exception as e:
+                if entry is None:
+                    raise
+
+                with self._lock:
+                    self.failures += 1
+                    entry["timestamp"] = time.monotonic()
+
+                logger.warning(
+                    "SAML2 config of %s not refreshed: %s" % (key[0], str(e))
+                )
+                return entry["config"]
+
+            with self._lock:
+                self._entries[key] = {
+                    "config": config,
+                    "timestamp": time.monotonic()
+                }
+
+            return config
+
+    def clear(self, **kwargs):
+        super().clear()
+
+
+sp_configs = SPConfigCache()
+
+# service names of tenants might have been changed
+config_reloaded.connect(sp_configs.clear, dispatch_uid="saml-sp-configs")
+
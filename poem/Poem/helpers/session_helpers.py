@@ -0,0 +1,74 @@
+from Poem.helpers.cache_helpers import ProcessCache, generation_key, \
+    get_generations, invalidate_generation
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _generation_names(schema_name):
+    return [f"sessions-{schema_name}"]
+
+
+class SessionPayloadCache(ProcessCache):
+    """
+    Cache of payloads returned by IsSessionActive, kept per session in Django
+    cache for at most SESSION_CACHE_TIMEOUT seconds. Payloads are dropped as
+    soon as users or their groups are changed, and payload together with its
+    generations is read in a single cache round trip. Since Django cache may
+    be kept on disk, payloads must not contain WEB-API tokens.
+    """
+    @staticmethod
+    def _key(request, istenant):
+        session = getattr(request, "session", None)
+        session_key = getattr(session, "session_key", None)
+        if not session_key:
+            return None
+
+        return "poem-sessionactive-{}-{}-{}-{}-{}".format(
+            request.tenant.schema_name, session_key, request.user.id,
+            istenant, request.tenant.combined
+        )
+
+    def get(self, request, istenant):
+        """
+        Returns cached payload for the session, or None if it is not cached
+        or it is not up to date.
+        """
+        key = self._key(request, istenant)
+        if not settings.SESSION_CACHE_TIMEOUT or not key:
+            return None
+
+        names = _generation_names(request.tenant.schema_name)
+        values = cache.get_many(
+            [key] + [generation_key(name) for name in names]
+        )
+        entry = values.get(key, None)
+        if entry and entry["generations"] == get_generations(names, values):
+            self.count("hits")
+            return entry["payload"]
+
+        self.count("misses")
+        return None
+
+    def set(self, request, istenant, payload):
+        key = self._key(request, istenant)
+        if not settings.SESSION_CACHE_TIMEOUT or not key:
+            return
+
+        generations = get_generations(
+            _generation_names(request.tenant.schema_name)
+        )
+        if None in generations:
+            return
+
+        cache.set(
+            key, {"generations": generations, "payload": payload},
+            settings.SESSION_CACHE_TIMEOUT
+        )
+
+
+session_payloads = SessionPayloadCache()
+
+
+def invalidate_session_payloads(schema_name):
+    invalidate_generation(_generation_names(schema_name)[0])
+
@@ -0,0 +1,97 @@
+import itertools
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+CHUNK_SIZE = 1000
+
+
+def streaming_requested(request):
+    return request.query_params.get("stream", "") in ["true", "True", "1"]
+
+
+def queryset_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of at most chunk_size objects of the queryset, keeping its
+    ordering. Primary keys are read with server-side cursor, and objects are
+    fetched chunk by chunk, so that select_related and prefetch_related of
+    the queryset are applied to each chunk.
+    """
+    pks = queryset.prefetch_related(None).values_list(
+        "pk", flat=True
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(pks, chunk_size))
+        if not chunk:
+            return
+
+        objects = dict(
+            (obj.pk, obj) for obj in queryset.filter(pk__in=chunk)
+        )
+        yield [objects[pk] for pk in chunk if pk in objects]
+
+
+def iterate_in_chunks(queryset, chunk_size=CHUNK_SIZE):
+    return itertools.chain.from_iterable(
+        queryset_chunks(queryset, chunk_size)
+    )
+
+
+def _dumps(data):
+    # same output as DRF JSONRenderer
+    ret = json.dumps(
+        data, cls=encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(",", ":") if api_settings.COMPACT_JSON else (", ", ": ")
+    )
+    ret = ret.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+    return ret.encode()
+
+
+def _separator():
+    return b"," if api_settings.COMPACT_JSON else b", "
+
+
+def stream_json_list(items):
+    yield b"["
+    for i, item in enumerate(items):
+        if i:
+            yield _separator()
+
+        yield _dumps(item)
+
+    yield b"]"
+
+
+def stream_json_object(pairs):
+    key_separator = b":" if api_settings.COMPACT_JSON else b": "
+    yield b"{"
+    for i, (key, value) in enumerate(pairs):
+        if i:
+            yield _separator()
+
+        yield _dumps(key) + key_separator + _dumps(value)
+
+    yield b"}"
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Response rendering JSON incrementally, item by item, with the same
+    output as DRF JSONRenderer would give for the whole list (or dict).
+    """
+    def __init__(self, streaming_content, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(streaming_content, **kwargs)
+
+
+def streaming_list_response(items):
+    return StreamingJSONResponse(stream_json_list(items))
+
+
+def streaming_dict_response(pairs):
+    return StreamingJSONResponse(stream_json_object(pairs))
@@ -1,6 +1,134 @@
-import requests
+import copy
+import logging
+import threading
+import time
+
+from Poem.helpers.cache_helpers import ProcessCache
+from Poem.helpers.webapi_helpers import webapi
 from Poem.poem_super_admin.models import WebAPIKey
 from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("POEM")
+
+
+class DataFeedResolver(ProcessCache):
+    """
+    Process-wide cache of tenants combined into combined tenants, as defined
+    by their data feeds in WEB-API. Entries older than
+    WEBAPI_DATAFEEDS_CACHE_TIMEOUT seconds are still returned while they are
+    refreshed in background, and the last good value is kept if WEB-API
+    fails. Failures of WEB-API are counted per tenant.
+    """
+    counters = ("hits", "misses", "stale", "refreshes")
+
+    def __init__(self):
+        self._refreshing = set()
+        super().__init__()
+
+    def _reset(self):
+        super()._reset()
+        self._entries = dict()
+        self.failures = dict()
+
+    def _extra_stats(self):
+        return {
+            "failures": copy.deepcopy(self.failures),
+            "entries": len(self._entries)
+        }
+
+    def _fetch(self, combined_tenant):
+        try:
+            return combined_tenant._fetch_data_feed()[0]["tenants"]
+
+        # any error of WEB-API, missing token or unexpected data feed
+        except Exception as e:
+            with self._lock:
+                name = combined_tenant.tenant.name
+                if name not in self.failures:
+                    self.failures[name] = {"count": 0, "last_error": ""}
+
+                self.failures[name]["count"] += 1
+                self.failures[name]["last_error"] = str(e)
+
+            logger.warning(
+                "Data feed of combined tenant %s not fetched: %s" % (
+                    combined_tenant.tenant.name, str(e)
+                )
+            )
+            return None
+
+    def _store(self, name, tenants):
+        with self._lock:
+            self._entries[name] = {
+                "tenants": copy.deepcopy(tenants),
+                "timestamp": time.monotonic()
+            }
+
+    def _refresh(self, combined_tenant):
+        name = combined_tenant.tenant.name
+        try:
+            tenants = self._fetch(combined_tenant)
+            if tenants is not None:
+                self._store(name, tenants)
+
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def _refresh_in_background(self, combined_tenant):
+        def refresh():
+            try:
+                self._refresh(combined_tenant)
+
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        thread.start()
+
+        return thread
+
+    def resolve(self, combined_tenant):
+        cache_timeout = settings.WEBAPI_DATAFEEDS_CACHE_TIMEOUT
+        if not cache_timeout:
+            tenants = self._fetch(combined_tenant)
+            return tenants if tenants is not None else []
+
+        name = combined_tenant.tenant.name
+        with self._lock:
+            entry = self._entries.get(name, None)
+            if entry:
+                tenants = copy.deepcopy(entry["tenants"])
+                if time.monotonic() - entry["timestamp"] < cache_timeout:
+                    self.hits += 1
+                    return tenants
+
+                self.stale += 1
+                refresh = name not in self._refreshing
+                if refresh:
+                    self._refreshing.add(name)
+                    self.refreshes += 1
+
+            else:
+                self.misses += 1
+
+        if entry:
+            if refresh:
+                self._refresh_in_background(combined_tenant)
+
+            return tenants
+
+        tenants = self._fetch(combined_tenant)
+        if tenants is None:
+            return []
+
+        self._store(name, tenants)
+
+        return tenants
+
+
+data_feeds = DataFeedResolver()
 
 
 class CombinedTenant:
@@ -13,7 +141,7 @@ class CombinedTenant:
         return token.token
 
     def _fetch_data_feed(self):
-        response = requests.get(
+        response = webapi.get(
             settings.WEBAPI_DATAFEEDS,
             headers={
                 "Accept": "application/json",
@@ -27,15 +155,4 @@ class CombinedTenant:
         return response.json()["data"]
 
     def tenants(self):
-        try:
-            return self._fetch_data_feed()[0]["tenants"]
-
-        except (
-            requests.exceptions.HTTPError,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.RequestException,
-            requests.exceptions.Timeout,
-            WebAPIKey.DoesNotExist,
-            Exception
-        ):
-            return []
+        return data_feeds.resolve(self)
@@ -0,0 +1,278 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from Poem.helpers.cache_helpers import ProcessCache, get_generations, \
+    invalidate_generation
+from django.conf import settings
+from django.db import connections
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class WebApiSession:
+    """
+    Process-wide pooled HTTP session used for all the requests to WEB-API, so
+    that connections are kept alive and reused between requests. Idempotent
+    requests are retried with backoff, every request gets a timeout, and
+    latency is recorded per WEB-API endpoint.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._latency = dict()
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                retries = Retry(
+                    total=settings.WEBAPI_RETRIES,
+                    backoff_factor=settings.WEBAPI_BACKOFF,
+                    status_forcelist=[502, 503, 504],
+                    allowed_methods=frozenset(["GET", "HEAD"]),
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=settings.WEBAPI_POOL_SIZE,
+                    pool_maxsize=settings.WEBAPI_POOL_SIZE,
+                    max_retries=retries
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+
+            return self._session
+
+    @staticmethod
+    def _endpoint(url):
+        split = urlsplit(url)
+        path = split.path.rstrip("/")
+        head, _, last = path.rpartition("/")
+        # resource ids (e.g. metric profile ids) are not part of endpoint
+        if "-" in last and any(char.isdigit() for char in last):
+            path = head
+
+        return f"{split.scheme}://{split.netloc}{path}"
+
+    def _record(self, url, method, elapsed):
+        key = (method, self._endpoint(url))
+        with self._lock:
+            if key not in self._latency:
+                self._latency[key] = {"count": 0, "total": 0.0, "max": 0.0}
+
+            self._latency[key]["count"] += 1
+            self._latency[key]["total"] += elapsed
+            self._latency[key]["max"] = max(
+                self._latency[key]["max"], elapsed
+            )
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout", None) is None:
+            kwargs["timeout"] = settings.WEBAPI_TIMEOUT
+
+        start = time.monotonic()
+        try:
+            return self._get_session().request(method, url, **kwargs)
+
+        finally:
+            self._record(url, method, time.monotonic() - start)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                (
+                    f"{key[0]} {key[1]}",
+                    {
+                        "count": value["count"],
+                        "avg": value["total"] / value["count"],
+                        "max": value["max"]
+                    }
+                ) for key, value in self._latency.items()
+            )
+
+
+webapi = WebApiSession()
+
+
+class WebApiCache(ProcessCache):
+    """
+    Process-wide cache of WEB-API responses, kept per tenant and per
+    endpoint. Entries older than WEBAPI_CACHE_TIMEOUT seconds, or kept from
+    before tenant's data was changed by any of the processes, are revalidated
+    with conditional request if WEB-API returned ETag or Last-Modified header.
+    """
+    counters = ("hits", "misses", "revalidated")
+
+    def _reset(self):
+        super()._reset()
+        self._entries = dict()
+
+    def _extra_stats(self):
+        return {"entries": len(self._entries)}
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key, None)
+
+    def set(
+            self, key, data, etag=None, last_modified=None, generations=None
+    ):
+        with self._lock:
+            self._entries[key] = {
+                "data": data,
+                "etag": etag,
+                "last_modified": last_modified,
+                "generations": generations,
+                "timestamp": time.monotonic()
+            }
+
+    def touch(self, key, generations=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["generations"] = generations
+                self._entries[key]["timestamp"] = time.monotonic()
+
+    def invalidate(self, tenant=None):
+        with self._lock:
+            if tenant is None:
+                self._entries.clear()
+
+            else:
+                for key in [k for k in self._entries if k[0] == tenant]:
+                    del self._entries[key]
+
+
+webapi_cache = WebApiCache()
+
+
+def _fetch(url, headers, timeout):
+    response = webapi.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+
+    return response
+
+
+def _generation_names(tenant):
+    return ["webapi", f"webapi-{tenant}"]
+
+
+def get_webapi_data(url, tenant, token, timeout=180, revalidate=False):
+    """
+    Returns data from WEB-API endpoint for the given tenant, serving it from
+    cache while it is fresh. If revalidate is True, cached data is used only
+    if WEB-API confirms it has not been changed. Data is never served
+    without revalidation if generations are not kept (e.g. dummy cache),
+    since changes done by other processes could not be noticed then.
+    """
+    headers = {"Accept": "application/json", "x-api-key": token}
+    cache_timeout = settings.WEBAPI_CACHE_TIMEOUT
+
+    if not cache_timeout:
+        return _fetch(url, headers, timeout).json()["data"]
+
+    key = (tenant, url)
+    entry = webapi_cache.get(key)
+    generations = get_generations(_generation_names(tenant))
+
+    if entry and not revalidate and None not in generations and \
+            entry["generations"] == generations and \
+            time.monotonic() - entry["timestamp"] < cache_timeout:
+        webapi_cache.count("hits")
+        return copy.deepcopy(entry["data"])
+
+    if entry:
+        conditional_headers = dict()
+        if entry["etag"]:
+            conditional_headers.update({"If-None-Match": entry["etag"]})
+
+        if entry["last_modified"]:
+            conditional_headers.update({
+                "If-Modified-Since": entry["last_modified"]
+            })
+
+        if conditional_headers:
+            response = _fetch(
+                url, {**headers, **conditional_headers}, timeout
+            )
+
+            if response.status_code == 304:
+                webapi_cache.touch(key, generations=generations)
+                webapi_cache.count("hits", "revalidated")
+                return copy.deepcopy(entry["data"])
+
+        else:
+            response = _fetch(url, headers, timeout)
+
+    else:
+        response = _fetch(url, headers, timeout)
+
+    webapi_cache.count("misses")
+    data = response.json()["data"]
+    webapi_cache.set(
+        key, copy.deepcopy(data),
+        etag=response.headers.get("ETag", None),
+        last_modified=response.headers.get("Last-Modified", None),
+        generations=generations
+    )
+
+    return data
+
+
+def invalidate_webapi_cache(tenant=None):
+    """
+    Drops cached WEB-API data of the given tenant (of all tenants if not
+    given) in this process, and starts its new generation, so that it is
+    revalidated by the other processes too.
+    """
+    webapi_cache.invalidate(tenant)
+    if tenant is None:
+        invalidate_generation("webapi")
+
+    else:
+        invalidate_generation(_generation_names(tenant)[1])
+
+
+def webapi_fan_out(func, args_list):
+    """
+    Calls func with each of the argument tuples from args_list concurrently,
+    in at most WEBAPI_MAX_WORKERS threads. Returns list of (result, exception)
+    tuples in the same order as args_list, so that the caller can aggregate
+    the errors. Worker threads close their DB connections when done.
+    """
+    def call(args):
+        try:
+            return func(*args), None
+
+        except Exception as e:
+            return None, e
+
+    def call_in_thread(args):
+        try:
+            return call(args)
+
+        finally:
+            connections.close_all()
+
+    max_workers = min(settings.WEBAPI_MAX_WORKERS, len(args_list))
+
+    if max_workers <= 1:
+        return [call(args) for args in args_list]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call_in_thread, args_list))
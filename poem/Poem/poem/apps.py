@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class PoemConfig(AppConfig):
     name = 'Poem.poem'
     verbose_name = 'POEM'
+
+    def ready(self):
+        # config file is parsed once, at startup
+        from Poem.helpers.config_helpers import poem_config
+        poem_config()
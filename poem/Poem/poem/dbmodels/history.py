@@ -1,13 +1,10 @@
 import json
 
-from Poem.poem.models import Metric
+from Poem.poem.models import Metric, package_version_changed
 from Poem.poem_super_admin import models as admin_models
-from Poem.tenants.models import Tenant
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django_tenants.utils import schema_context, get_public_schema_name
 
 
 class TenantHistoryManager(models.Manager):
@@ -33,36 +30,52 @@ class TenantHistory(models.Model):
 
     class Meta:
         app_label = 'poem'
+        indexes = [
+            models.Index(
+                fields=['content_type', 'object_id', 'date_created'],
+                name='poem_tenanthistory_obj_idx'
+            )
+        ]
 
     def natural_key(self):
         return (self.object_repr,)
 
 
-@receiver(post_save, sender=admin_models.Package)
-def update_metric_history(sender, instance, created, **kwargs):
-    if not created:
-        schemas = list(
-            Tenant.objects.all().values_list('schema_name', flat=True)
-        )
-        schemas.remove(get_public_schema_name())
-        probes = admin_models.ProbeHistory.objects.filter(
-            package=instance
-        )
-        for schema in schemas:
-            with schema_context(schema):
-                for probe in probes:
-                    metrics = Metric.objects.filter(
-                        probeversion=f"{probe.name} ({probe.package.version})"
-                    )
-                    for metric in metrics:
-                        vers = TenantHistory.objects.filter(
-                            object_id=metric.id
-                        ).order_by('-date_created')
+def update_probekey_in_metric_history(probe_names, version):
+    """
+    Sets probekey in serialized data of all the history entries of metrics
+    using given probes of given package version in the current schema.
+    Serialized data is rewritten in Python, so that the other fields are kept
+    as they are. Returns number of updated entries.
+    """
+    # history entries refer to metrics by their id stored as text
+    metric_probes = dict(
+        (str(pk), name) for pk, name in Metric.objects.filter(
+            probe_name__in=probe_names, package_version=version
+        ).values_list("id", "probe_name")
+    )
+
+    entries = []
+    for entry in TenantHistory.objects.filter(
+            content_type=ContentType.objects.get_for_model(Metric),
+            object_id__in=metric_probes.keys()
+    ).only("id", "object_id", "serialized_data").iterator():
+        serialized_data = json.loads(entry.serialized_data)
+        serialized_data[0]["fields"]["probekey"] = [
+            metric_probes[entry.object_id], version
+        ]
+        entry.serialized_data = json.dumps(serialized_data)
+        entries.append(entry)
+
+    TenantHistory.objects.bulk_update(
+        entries, ["serialized_data"], batch_size=500
+    )
+
+    return len(entries)
+
 
-                        for ver in vers:
-                            serialized_data = json.loads(ver.serialized_data)
-                            serialized_data[0]['fields']['probekey'] = [
-                                probe.name, probe.package.version
-                            ]
-                            ver.serialized_data = json.dumps(serialized_data)
-                            ver.save()
+@receiver(package_version_changed, sender=admin_models.Package)
+def update_metric_history(sender, instance, probe_names, **kwargs):
+    # probekey is only set in the current schema, where metrics have been
+    # updated to the new version of the package
+    update_probekey_in_metric_history(probe_names, instance.version)
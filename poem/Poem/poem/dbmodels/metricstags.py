@@ -1,12 +1,24 @@
+import logging
+import time
+
+from Poem.helpers.etag_helpers import invalidate_api_content
 from Poem.poem_super_admin import models as admin_models
 from Poem.tenants.models import Tenant
 from django.contrib.auth.models import GroupManager, Permission
-from django.db import models
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
+from django.db import connection, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
 from django.utils.translation import ugettext_lazy as _
 from django_tenants.utils import schema_context, get_public_schema_name
 
+logger = logging.getLogger("POEM")
+
+# sent in every tenant schema, in the same transaction in which metrics using
+# probes of the package are updated to its new version
+package_version_changed = Signal()
+
 
 class GroupOfMetrics(models.Model):
     name = models.CharField(_('name'), max_length=80, unique=True)
@@ -27,10 +39,21 @@ class GroupOfMetrics(models.Model):
         return (self.name,)
 
 
+def split_probeversion(probeversion):
+    if probeversion:
+        probeversion = probeversion.split("(")
+        return probeversion[0].strip(), probeversion[1][:-1].strip()
+
+    else:
+        return None, None
+
+
 class Metric(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=128, unique=True)
     probeversion = models.CharField(max_length=1024, null=True, blank=True)
+    probe_name = models.CharField(max_length=128, null=True, blank=True)
+    package_version = models.TextField(null=True, blank=True)
     group = models.ForeignKey(GroupOfMetrics, null=True,
                               on_delete=models.SET_NULL)
     config = models.CharField(max_length=1024)
@@ -39,10 +62,55 @@ class Metric(models.Model):
         permissions = (('metricsown', 'Read/Write/Modify'),)
         app_label = 'poem'
         verbose_name = 'Metric'
+        indexes = [
+            models.Index(
+                fields=['probe_name', 'package_version'],
+                name='poem_metric_probe_idx'
+            )
+        ]
 
     def __str__(self):
         return u'%s' % self.name
 
+    def set_probe_fields(self):
+        # probe name and package version are kept next to probeversion so
+        # that metrics can be matched with probes without parsing strings
+        self.probe_name, self.package_version = split_probeversion(
+            self.probeversion
+        )
+
+    def save(self, *args, **kwargs):
+        self.set_probe_fields()
+        update_fields = kwargs.get("update_fields", None)
+        if update_fields is not None and "probeversion" in update_fields:
+            kwargs["update_fields"] = set(update_fields).union(
+                ["probe_name", "package_version"]
+            )
+
+        super().save(*args, **kwargs)
+
+
+@receiver(pre_save, sender=Metric)
+def probe_fields_handler(sender, instance, raw=False, **kwargs):
+    # fixtures are loaded without calling save()
+    if raw:
+        instance.set_probe_fields()
+
+
+@receiver(post_save, sender=Metric)
+def index_metric(sender, instance, update_fields=None, **kwargs):
+    if update_fields and "name" not in update_fields:
+        return
+
+    admin_models.TenantMetric.objects.index(connection.schema_name, [instance])
+
+
+@receiver(post_delete, sender=Metric)
+def unindex_metric(sender, instance, **kwargs):
+    admin_models.TenantMetric.objects.unindex(
+        connection.schema_name, [instance.id]
+    )
+
 
 class MetricConfiguration(models.Model):
     id = models.AutoField(primary_key=True)
@@ -58,6 +126,14 @@ class MetricConfiguration(models.Model):
         return u"%s" % self.name
 
 
+@receiver(post_save, sender=Metric)
+@receiver(post_delete, sender=Metric)
+@receiver(post_save, sender=MetricConfiguration)
+@receiver(post_delete, sender=MetricConfiguration)
+def api_content_changed(sender, **kwargs):
+    invalidate_api_content(connection.schema_name)
+
+
 class ProbeCandidateStatus(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=128, unique=True)
@@ -101,18 +177,49 @@ class ProbeCandidate(models.Model):
 
 @receiver(pre_save, sender=admin_models.Package)
 def update_metrics(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+
+    old_version = admin_models.Package.objects.filter(
+        pk=instance.pk
+    ).values_list("version", flat=True).first()
+
+    if old_version is None or old_version == instance.version:
+        return
+
+    probe_names = list(
+        admin_models.ProbeHistory.objects.filter(
+            package=instance
+        ).values_list("name", flat=True).distinct()
+    )
+
+    if not probe_names:
+        return
+
     schemas = list(
         Tenant.objects.all().values_list('schema_name', flat=True)
     )
     schemas.remove(get_public_schema_name())
-    probes = admin_models.ProbeHistory.objects.filter(package=instance)
 
+    start = time.monotonic()
+    updated = 0
     for schema in schemas:
-        with schema_context(schema):
-            for probe in probes:
-                metrics = Metric.objects.filter(
-                    probeversion=f"{probe.name} ({probe.package.version})"
-                )
-                for metric in metrics:
-                    metric.probeversion = f"{probe.name} ({instance.version})"
-                    metric.save()
+        with schema_context(schema), transaction.atomic():
+            updated += Metric.objects.filter(
+                probe_name__in=probe_names, package_version=old_version
+            ).update(
+                probeversion=Concat(
+                    "probe_name", Value(f" ({instance.version})")
+                ),
+                package_version=instance.version
+            )
+            package_version_changed.send(
+                sender=admin_models.Package, instance=instance,
+                probe_names=probe_names
+            )
+
+    logger.info(
+        "Package %s: version of %d metrics updated in %d schemas in %.3f s" % (
+            instance, updated, len(schemas), time.monotonic() - start
+        )
+    )
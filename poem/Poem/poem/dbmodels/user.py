@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models, connection
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, post_save, post_delete, \
+    m2m_changed
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
@@ -10,6 +11,7 @@ from Poem.poem.dbmodels.metricprofiles import GroupOfMetricProfiles
 from Poem.poem.dbmodels.thresholdsprofiles import GroupOfThresholdsProfiles
 from Poem.poem.dbmodels.reports import GroupOfReports
 
+from Poem.helpers.session_helpers import invalidate_session_payloads
 from django_tenants.utils import get_public_schema_name
 
 
@@ -88,3 +90,39 @@ class UserProfile(models.Model):
 def on_delete_user(sender, instance, **kwargs):
     if connection.schema_name != get_public_schema_name():
         userprofile = UserProfile.objects.get(user=instance).delete()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_session_payloads_user(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields", None)
+    # last_login is updated on each login and it is not part of the payload
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+
+    invalidate_session_payloads(connection.schema_name)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=GroupOfAggregations)
+@receiver(post_delete, sender=GroupOfAggregations)
+@receiver(post_save, sender=GroupOfMetrics)
+@receiver(post_delete, sender=GroupOfMetrics)
+@receiver(post_save, sender=GroupOfMetricProfiles)
+@receiver(post_delete, sender=GroupOfMetricProfiles)
+@receiver(post_save, sender=GroupOfThresholdsProfiles)
+@receiver(post_delete, sender=GroupOfThresholdsProfiles)
+@receiver(post_save, sender=GroupOfReports)
+@receiver(post_delete, sender=GroupOfReports)
+@receiver(m2m_changed, sender=UserProfile.groupsofmetricprofiles.through)
+@receiver(m2m_changed, sender=UserProfile.groupsofmetrics.through)
+@receiver(m2m_changed, sender=UserProfile.groupsofaggregations.through)
+@receiver(m2m_changed, sender=UserProfile.groupsofthresholdsprofiles.through)
+@receiver(m2m_changed, sender=UserProfile.groupsofreports.through)
+def invalidate_session_payloads_groups(sender, **kwargs):
+    action = kwargs.get("action", None)
+    if action and not action.startswith("post_"):
+        return
+
+    invalidate_session_payloads(connection.schema_name)
@@ -1,8 +1,7 @@
-from configparser import ConfigParser
-
+from Poem.helpers.config_helpers import poem_config
+from Poem.helpers.domain_helpers import invalidate_tenant_domains
 from Poem.poem import models as poem_models
 from Poem.tenants.models import Tenant
-from django.conf import settings
 from django.core.management.base import BaseCommand
 from django_tenants.utils import schema_context, get_public_schema_name, \
     get_tenant_domain_model
@@ -35,16 +34,14 @@ def create_tenant(name, hostname, combined=False):
     domain.tenant = tenant
     domain.is_primary = True
     domain.save()
+    invalidate_tenant_domains()
 
     if schema != get_public_schema_name():
         create_groups_of_resources(name)
 
 
 def get_public_schema_hostname():
-    config = ConfigParser()
-    config.read(settings.CONFIG_FILE)
-
-    hostname = config.get('GENERAL_ALL', 'publicpage')
+    hostname = poem_config().get('GENERAL_ALL', 'publicpage')
 
     return hostname
 
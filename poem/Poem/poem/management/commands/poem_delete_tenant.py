@@ -1,3 +1,4 @@
+from Poem.helpers.domain_helpers import invalidate_tenant_domains
 from Poem.tenants.models import Tenant
 from django.core.management.base import BaseCommand
 from django_tenants.utils import get_public_schema_name
@@ -21,6 +22,7 @@ class Command(BaseCommand):
             try:
                 tenant = Tenant.objects.get(schema_name=schema)
                 tenant.delete(force_drop=True)
+                invalidate_tenant_domains()
 
             except Tenant.DoesNotExist:
                 raise Exception(
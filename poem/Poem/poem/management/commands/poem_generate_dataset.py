@@ -0,0 +1,111 @@
+import random
+
+from Poem.helpers.dataset_helpers import generate_catalogue, \
+    generate_tenant_data
+from Poem.poem.management.commands.poem_create_tenant import create_tenant, \
+    get_public_schema_hostname
+from Poem.poem_super_admin import models as admin_models
+from Poem.tenants.models import Tenant
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django_tenants.utils import schema_context, get_public_schema_name
+
+
+class Command(BaseCommand):
+    help = """Generate synthetic dataset (probes, metric templates and tenants
+    with metrics) for benchmarks and load testing; the same seed always
+    generates the same dataset"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", type=str, default="dataset",
+            help="Prefix of names of generated objects"
+        )
+        parser.add_argument("--probes", type=int, default=200)
+        parser.add_argument(
+            "--versions", type=int, default=5,
+            help="Number of versions of every probe and metric template"
+        )
+        parser.add_argument("--templates", type=int, default=1000)
+        parser.add_argument("--tenants", type=int, default=20)
+        parser.add_argument(
+            "--metrics", type=int, default=300,
+            help="Number of metrics of every tenant"
+        )
+        parser.add_argument(
+            "--groups", type=int, default=3,
+            help="Number of groups of metrics of every tenant"
+        )
+        parser.add_argument(
+            "--profiles", type=int, default=10,
+            help="Number of metric profiles of every tenant"
+        )
+        parser.add_argument(
+            "--hostname", type=str,
+            help="Domain under which tenants' hostnames are created (public "
+                 "schema hostname if not given)"
+        )
+
+    def handle(self, *args, **kwargs):
+        prefix = kwargs["prefix"]
+        # prefix is also used for names of tenant schemas
+        if not prefix.isidentifier():
+            raise CommandError(f"Prefix {prefix} is not valid identifier")
+
+        if kwargs["probes"] < 1 or kwargs["versions"] < 1:
+            raise CommandError("At least one probe version must be generated")
+
+        with schema_context(get_public_schema_name()):
+            if admin_models.Probe.objects.filter(
+                name__startswith=f"{prefix}-probe-"
+            ).exists():
+                raise CommandError(
+                    f"Dataset with prefix {prefix} already exists"
+                )
+
+        if kwargs["tenants"] > 0 and not kwargs["hostname"]:
+            kwargs["hostname"] = get_public_schema_hostname()
+
+        # the whole dataset, including tenants' schemas, is generated in a
+        # single transaction, so that failed run does not leave half-created
+        # tenants or catalogue behind, and can simply be run again
+        with transaction.atomic():
+            self._generate(**kwargs)
+
+    def _generate(self, **kwargs):
+        prefix = kwargs["prefix"]
+        hostname = kwargs["hostname"]
+
+        with schema_context(get_public_schema_name()):
+            templates = generate_catalogue(
+                random.Random(kwargs["seed"]), prefix,
+                probes=kwargs["probes"], versions=kwargs["versions"],
+                templates=kwargs["templates"]
+            )
+
+        self.stdout.write(
+            f"Generated {kwargs['probes']} probes and "
+            f"{kwargs['templates']} metric templates with "
+            f"{kwargs['versions']} versions each"
+        )
+
+        for i in range(kwargs["tenants"]):
+            name = f"{prefix.upper()}{i}"
+            if Tenant.objects.filter(name=name).exists():
+                raise CommandError(f"Tenant {name} already exists")
+
+            create_tenant(name, f"{name.lower()}.{hostname}")
+
+            # every tenant gets its own random generator, so that tenants
+            # do not depend on how many tenants are generated
+            with schema_context(name.lower()):
+                metrics = generate_tenant_data(
+                    random.Random(f"{kwargs['seed']}-{name}"), prefix,
+                    templates, metrics=kwargs["metrics"],
+                    groups=kwargs["groups"], profiles=kwargs["profiles"]
+                )
+
+            self.stdout.write(
+                f"Tenant {name}: generated {len(metrics)} metrics"
+            )
@@ -0,0 +1,36 @@
+from Poem.poem import models as poem_models
+from Poem.poem_super_admin import models as admin_models
+from Poem.tenants.models import Tenant
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context, get_public_schema_name
+
+
+class Command(BaseCommand):
+    help = """Rebuilds index of tenants' metrics kept in public schema."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tenant", type=str,
+            help="Name of the tenant whose metrics are indexed (all tenants "
+                 "if not given)"
+        )
+
+    def handle(self, *args, **kwargs):
+        tenants = Tenant.objects.exclude(
+            schema_name=get_public_schema_name()
+        )
+        if kwargs["tenant"]:
+            tenants = tenants.filter(name=kwargs["tenant"])
+            if not tenants.exists():
+                raise CommandError(
+                    f"Tenant with name {kwargs['tenant']} does not exist"
+                )
+
+        for tenant in tenants.order_by("name"):
+            with schema_context(tenant.schema_name):
+                metrics = list(poem_models.Metric.objects.all().only("name"))
+
+            count = admin_models.TenantMetric.objects.rebuild(
+                tenant.schema_name, metrics
+            )
+            self.stdout.write(f"Tenant {tenant.name}: {count} metrics indexed")
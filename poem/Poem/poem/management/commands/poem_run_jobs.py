@@ -0,0 +1,35 @@
+import time
+
+from Poem.helpers.jobs_helpers import claim_next_job, run_job
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class Command(BaseCommand):
+    help = """Runs background jobs queued by superadmin operations."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Run queued jobs and exit instead of waiting for new ones"
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=2.,
+            help="Seconds to wait before checking for new jobs"
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job:
+                job = run_job(job)
+                self.stdout.write(
+                    f"Job {job.id} {job.name}: {job.status}"
+                )
+
+            elif kwargs["once"]:
+                break
+
+            else:
+                time.sleep(kwargs["sleep"])
@@ -1,7 +1,7 @@
-from configparser import ConfigParser, NoSectionError, NoOptionError
+from configparser import NoSectionError, NoOptionError
 
+from Poem.helpers.config_helpers import poem_config
 from Poem.poem.models import UserProfile
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.db import DEFAULT_DB_ALIAS, connection
@@ -12,8 +12,7 @@ from django_tenants.utils import get_public_schema_name
 def tenant_superuser():
     tenant = connection.tenant.name
 
-    config = ConfigParser()
-    config.read(settings.CONFIG_FILE)
+    config = poem_config()
 
     superuser_name = config.get('SUPERUSER_' + tenant.upper(), 'name')
     superuser_pass = config.get('SUPERUSER_' + tenant.upper(), 'password')
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.19 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def populate_probe_fields(apps, schema_editor):
+    Metric = apps.get_model('poem', 'Metric')
+
+    for metric in Metric.objects.exclude(probeversion__isnull=True).exclude(
+            probeversion=''
+    ):
+        probeversion = metric.probeversion.split('(')
+        metric.probe_name = probeversion[0].strip()
+        metric.package_version = probeversion[1][:-1].strip()
+        metric.save(update_fields=['probe_name', 'package_version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poem', '0036_probecandidate_script'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metric',
+            name='probe_name',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.AddField(
+            model_name='metric',
+            name='package_version',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='metric',
+            index=models.Index(
+                fields=['probe_name', 'package_version'],
+                name='poem_metric_probe_idx'
+            ),
+        ),
+        migrations.RunPython(
+            populate_probe_fields, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.19 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('poem', '0037_metric_probe_name_package_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tenanthistory',
+            index=models.Index(
+                fields=['content_type', 'object_id', 'date_created'],
+                name='poem_tenanthistory_obj_idx'
+            ),
+        ),
+    ]
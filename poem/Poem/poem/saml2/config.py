@@ -1,9 +1,10 @@
 from distutils.sysconfig import get_python_lib
-from configparser import ConfigParser
 
 import saml2
 from saml2.config import SPConfig
 
+from Poem.helpers.config_helpers import poem_config
+from Poem.helpers.saml_helpers import sp_configs
 from django.conf import settings
 from django.db import connection
 
@@ -23,23 +24,14 @@ def get_hostname(request):
 
 
 def service_name_conf(tenant):
-    config = ConfigParser()
-    config.read(settings.CONFIG_FILE)
-
-    return config.get('GENERAL_' + tenant.upper(), 'samlservicename')
+    return poem_config().get('GENERAL_' + tenant.upper(), 'samlservicename')
 
 
 def saml_login_string(tenant):
-    config = ConfigParser()
-    config.read(settings.CONFIG_FILE)
-
-    return config.get('GENERAL_' + tenant.upper(), 'samlloginstring')
-
+    return poem_config().get('GENERAL_' + tenant.upper(), 'samlloginstring')
 
-def get_saml_config(request):
-    tenant = tenant_from_request(request)
-    hostname = get_hostname(request)
 
+def load_saml_config(tenant, hostname):
     config = {
         'xmlsec_binary': '/usr/bin/xmlsec1',
         'entityid': 'https://%s/saml2/metadata/' % hostname,
@@ -72,3 +64,12 @@ def get_saml_config(request):
     }
 
     return SPConfig().load(config)
+
+
+def get_saml_config(request):
+    tenant = tenant_from_request(request)
+    hostname = get_hostname(request)
+
+    return sp_configs.get(
+        (tenant, hostname), lambda: load_saml_config(tenant, hostname)
+    )
@@ -0,0 +1,27 @@
+from Poem.helpers.catalogue_helpers import invalidate_catalogue_cache
+from Poem.poem_super_admin.dbmodels.metrictemplates import MetricTemplate, \
+    MetricTemplateHistory, MetricTags, MetricTemplateType, DefaultPort
+from Poem.poem_super_admin.dbmodels.probes import Probe, ProbeHistory
+from Poem.poem_super_admin.dbmodels.yumrepos import OSTag, Package, YumRepo
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+catalogue_models = [
+    MetricTemplate, MetricTemplateHistory, MetricTags, MetricTemplateType,
+    Probe, ProbeHistory, Package, YumRepo, OSTag, DefaultPort
+]
+
+
+@receiver(post_save, dispatch_uid="catalogue_saved")
+@receiver(post_delete, dispatch_uid="catalogue_deleted")
+def catalogue_changed(sender, **kwargs):
+    if sender in catalogue_models:
+        invalidate_catalogue_cache()
+
+
+@receiver(m2m_changed, sender=MetricTemplate.tags.through)
+@receiver(m2m_changed, sender=MetricTemplateHistory.tags.through)
+@receiver(m2m_changed, sender=Package.repos.through)
+def catalogue_relations_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate_catalogue_cache()
@@ -0,0 +1,49 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUSES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed")
+    )
+
+    view = models.CharField(max_length=256)
+    method = models.CharField(max_length=16)
+    kwargs = models.JSONField(default=dict)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    form_data = models.BooleanField(default=False)
+    schema_name = models.CharField(max_length=63)
+    user = models.CharField(max_length=150)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    status_code = models.IntegerField(null=True)
+    result = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True)
+    date_finished = models.DateTimeField(null=True)
+
+    class Meta:
+        app_label = 'poem_super_admin'
+        indexes = [
+            models.Index(
+                fields=["status", "date_created"],
+                name="poem_super_admin_job_idx"
+            )
+        ]
+
+    def __str__(self):
+        return u'%s.%s (%s)' % (
+            self.view.split(".")[-1], self.method, self.status
+        )
+
+    @property
+    def name(self):
+        return "{}.{}".format(self.view.split(".")[-1], self.method)
@@ -0,0 +1,77 @@
+from Poem.tenants.models import Tenant
+from django.db import models, transaction
+from django_tenants.utils import schema_context, get_public_schema_name
+
+
+class TenantMetricManager(models.Manager):
+    def index(self, schema_name, metrics):
+        """
+        Stores names of the given metrics of the tenant with the given schema
+        name, replacing the names stored before.
+        """
+        if schema_name == get_public_schema_name() or not metrics:
+            return
+
+        with schema_context(get_public_schema_name()):
+            tenant = Tenant.objects.filter(schema_name=schema_name).first()
+            if not tenant:
+                return
+
+            with transaction.atomic():
+                self.filter(
+                    tenant=tenant, metric_id__in=[m.id for m in metrics]
+                ).delete()
+                self.bulk_create([
+                    self.model(tenant=tenant, metric_id=m.id, name=m.name)
+                    for m in metrics
+                ])
+
+    def unindex(self, schema_name, metric_ids):
+        with schema_context(get_public_schema_name()):
+            self.filter(
+                tenant__schema_name=schema_name, metric_id__in=metric_ids
+            ).delete()
+
+    def rebuild(self, schema_name, metrics):
+        """
+        Replaces all the names stored for the tenant with the given schema
+        name with the names of the given metrics.
+        """
+        with schema_context(get_public_schema_name()):
+            tenant = Tenant.objects.filter(schema_name=schema_name).first()
+            if not tenant:
+                return 0
+
+            with transaction.atomic():
+                self.filter(tenant=tenant).delete()
+                self.bulk_create([
+                    self.model(tenant=tenant, metric_id=m.id, name=m.name)
+                    for m in metrics
+                ])
+
+        return len(metrics)
+
+
+class TenantMetric(models.Model):
+    """
+    Index of metrics of all the tenants kept in public schema, so that it is
+    possible to find which tenants are using metric template without
+    entering every tenant schema.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+    metric_id = models.IntegerField()
+    name = models.CharField(max_length=128)
+
+    objects = TenantMetricManager()
+
+    class Meta:
+        app_label = 'poem_super_admin'
+        unique_together = [['tenant', 'metric_id']]
+        indexes = [
+            models.Index(
+                fields=['name'], name='poem_super_admin_tm_name_idx'
+            )
+        ]
+
+    def __str__(self):
+        return u'%s (%s)' % (self.name, self.tenant)
@@ -18,8 +18,16 @@ class YumRepoManager(models.Manager):
         return self.get(name=name, tag__name=tag)
 
 
+def normalize_tag(name):
+    return name.lower().replace(" ", "")
+
+
 class OSTag(models.Model):
     name = models.CharField(max_length=128, unique=True)
+    # name as used in repos API URLs (e.g. centos7 for CentOS 7)
+    normalized_name = models.CharField(
+        max_length=128, db_index=True, default='', editable=False
+    )
 
     objects = TagManager()
 
@@ -32,6 +40,10 @@ class OSTag(models.Model):
     def natural_key(self):
         return (self.name,)
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_tag(self.name)
+        super().save(*args, **kwargs)
+
 
 class YumRepo(models.Model):
     name = models.TextField(max_length=128)
@@ -72,3 +84,10 @@ class Package(models.Model):
 def version_handler(sender, instance, **kwargs):
     if instance.use_present_version:
         instance.version = 'present'
+
+
+@receiver(pre_save, sender=OSTag)
+def normalized_name_handler(sender, instance, raw=False, **kwargs):
+    # save() is not called when fixtures are loaded
+    if raw:
+        instance.normalized_name = normalize_tag(instance.name)
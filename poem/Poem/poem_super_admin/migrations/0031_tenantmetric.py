@@ -0,0 +1,58 @@
+# Generated by Django 3.2.19 on 2026-10-18 14:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django_tenants.utils import get_public_schema_name
+
+
+def index_tenant_metrics(apps, schema_editor):
+    Tenant = apps.get_model('tenants', 'Tenant')
+    TenantMetric = apps.get_model('poem_super_admin', 'TenantMetric')
+
+    for tenant in Tenant.objects.exclude(
+            schema_name=get_public_schema_name()
+    ):
+        with schema_editor.connection.cursor() as cursor:
+            # schema might not have been migrated yet
+            table = f'"{tenant.schema_name}".poem_metric'
+            cursor.execute('SELECT to_regclass(%s)', [table])
+            if cursor.fetchone()[0] is None:
+                continue
+
+            cursor.execute(f'SELECT id, name FROM {table}')
+            metrics = cursor.fetchall()
+
+        TenantMetric.objects.bulk_create([
+            TenantMetric(tenant=tenant, metric_id=metric_id, name=name)
+            for metric_id, name in metrics
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_tenant_combined'),
+        ('poem_super_admin', '0030_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantMetric',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_id', models.IntegerField()),
+                ('name', models.CharField(max_length=128)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'unique_together': {('tenant', 'metric_id')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tenantmetric',
+            index=models.Index(fields=['name'], name='poem_super_admin_tm_name_idx'),
+        ),
+        migrations.RunPython(
+            index_tenant_metrics, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.19 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+def normalize_names(apps, schema_editor):
+    OSTag = apps.get_model('poem_super_admin', 'OSTag')
+    for tag in OSTag.objects.all():
+        tag.normalized_name = tag.name.lower().replace(' ', '')
+        tag.save(update_fields=['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('poem_super_admin', '0031_tenantmetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ostag',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=128),
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+    ]
@@ -3,3 +3,6 @@ from Poem.poem_super_admin.dbmodels.yumrepos import *
 from Poem.poem_super_admin.dbmodels.probes import *
 from Poem.poem_super_admin.dbmodels.metrictemplates import *
 from Poem.poem_super_admin.dbmodels.apikey import *
+from Poem.poem_super_admin.dbmodels.jobs import *
+from Poem.poem_super_admin.dbmodels.tenantmetrics import *
+from Poem.poem_super_admin.dbmodels.catalogue import *
@@ -44,6 +44,9 @@ try:
     HOST_CERT = config.get('SECURITY', 'HostCert')
     HOST_KEY = config.get('SECURITY', 'HostKey')
     SECRETKEY_PATH = config.get('SECURITY', 'SecretKeyPath')
+    SAML_METADATA_REFRESH = config.getint(
+        "SECURITY", "SAMLMetadataRefresh", fallback=3600
+    )
     EMAILFROM = config.get("EMAIL", "From")
     EMAILUS = config.get("EMAIL", "Us")
     EMAIL_HOST = config.get("EMAIL", "Host")
@@ -64,6 +67,42 @@ try:
     WEBAPI_METRICSTAGS = config.get("WEBAPI", "Metrics")
     WEBAPI_SERVICETYPES = config.get("WEBAPI", "ServiceTypes")
     WEBAPI_DATAFEEDS = config.get("WEBAPI", "DataFeeds")
+    WEBAPI_CACHE_TIMEOUT = config.getint(
+        "WEBAPI", "CacheTimeout", fallback=60
+    )
+    WEBAPI_TIMEOUT = config.getint("WEBAPI", "Timeout", fallback=180)
+    WEBAPI_RETRIES = config.getint("WEBAPI", "Retries", fallback=3)
+    WEBAPI_BACKOFF = config.getfloat("WEBAPI", "Backoff", fallback=0.5)
+    WEBAPI_POOL_SIZE = config.getint("WEBAPI", "PoolSize", fallback=10)
+    WEBAPI_MAX_WORKERS = config.getint("WEBAPI", "MaxWorkers", fallback=8)
+    WEBAPI_DATAFEEDS_CACHE_TIMEOUT = config.getint(
+        "WEBAPI", "DataFeedsCacheTimeout", fallback=300
+    )
+    WEBAPI_SYNC_INTERVAL = config.getint(
+        "WEBAPI", "SyncInterval", fallback=60
+    )
+
+    CACHES = {
+        "default": {
+            "BACKEND": config.get(
+                "CACHE", "Backend",
+                fallback="django.core.cache.backends.filebased.FileBasedCache"
+            ),
+            "LOCATION": config.get(
+                "CACHE", "Location",
+                fallback="{}/var/cache/poem".format(VENV)
+            )
+        }
+    }
+    APIKEY_CACHE_TIMEOUT = config.getint(
+        "CACHE", "APIKeyTimeout", fallback=60
+    )
+    APIKEY_CACHE_SIZE = config.getint("CACHE", "APIKeySize", fallback=1000)
+    SESSION_CACHE_TIMEOUT = config.getint(
+        "CACHE", "SessionTimeout", fallback=300
+    )
+    API_CACHE_MAX_AGE = config.getint("CACHE", "APIMaxAge", fallback=0)
+    JOBS_TIMEOUT = config.getint("JOBS", "Timeout", fallback=3600)
 
     LINKS_TERMS_PRIVACY = dict()
     all_sections = config.sections()
@@ -147,7 +186,7 @@ TENANT_MODEL = 'tenants.Tenant'
 TENANT_DOMAIN_MODEL = 'tenants.Domain'
 
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',
+    'Poem.tenants.middleware.PoemTenantMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
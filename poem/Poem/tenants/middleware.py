@@ -0,0 +1,16 @@
+import functools
+
+from Poem.helpers.domain_helpers import tenant_domains
+from django_tenants.middleware.main import TenantMainMiddleware
+
+
+class PoemTenantMiddleware(TenantMainMiddleware):
+    """
+    TenantMainMiddleware resolving tenants of requests through in-process
+    cache, so that Domain and Tenant are not looked up on every request.
+    """
+    def get_tenant(self, domain_model, hostname):
+        return tenant_domains.get(
+            hostname,
+            functools.partial(super().get_tenant, domain_model, hostname)
+        )
@@ -1,4 +1,7 @@
+from Poem.helpers.domain_helpers import invalidate_tenant_domains
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django_tenants.models import TenantMixin, DomainMixin
 
 
@@ -16,3 +19,11 @@ class Tenant(TenantMixin):
 
 class Domain(DomainMixin):
     pass
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def tenant_domains_changed(sender, **kwargs):
+    invalidate_tenant_domains()